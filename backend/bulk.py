@@ -0,0 +1,214 @@
+# backend/bulk.py
+
+import datetime
+import json
+from itertools import islice
+from typing import Iterable, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import models, numerotation, rollups, schemas, stock
+
+# Nombre de factures insérées par lot : borne la mémoire et la taille des
+# requêtes IN (...), tout en restant dans une seule transaction.
+BULK_CHUNK_SIZE = 1000
+
+
+def parse_json_array(body: bytes) -> List:
+    """
+    Décode un tableau JSON de factures. Lève ValueError si le corps n'est pas un tableau.
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, list):
+        raise ValueError("Le corps doit être un tableau JSON de factures")
+    return payload
+
+
+def parse_ndjson_line(line: bytes):
+    """
+    Décode une ligne NDJSON ; renvoie None pour une ligne vide.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def validate_rows(raw_rows: Iterable, start: int = 0) -> Tuple[List[Tuple[int, schemas.FactureCreate]], List[dict]]:
+    """
+    Valide chaque élément comme FactureCreate. Renvoie les factures valides
+    (avec leur position dans le lot, à partir de `start`) et les erreurs
+    ligne par ligne.
+    """
+    valid, errors = [], []
+    for index, raw in enumerate(raw_rows, start):
+        if isinstance(raw, Exception):
+            errors.append(_error(index, None, f"JSON invalide : {raw}"))
+            continue
+        try:
+            valid.append((index, schemas.FactureCreate.parse_obj(raw)))
+        except ValidationError as exc:
+            numero = raw.get("numero_facture") if isinstance(raw, dict) else None
+            errors.append(_error(index, numero, str(exc)))
+    return valid, errors
+
+
+class BulkImport:
+    """
+    Import en masse alimenté au fil de la lecture du corps : add() valide
+    et insère les factures par lots de BULK_CHUNK_SIZE, finish() valide la
+    transaction. Seul le lot en cours est gardé en mémoire ; une erreur
+    avant finish() annule tout l'import (rollback de la session).
+
+    Les clients sont vérifiés par une requête IN par lot, les factures et
+    les lignes sont insérées par executemany. Les lignes invalides (schéma,
+    client ou pièce inconnus, numéro déjà utilisé) sont écartées et
+    signalées, les autres sont créées. Les factures sans numéro reçoivent
+    un bloc de numéros consécutifs de la séquence de l'année.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+        self.now = datetime.datetime.utcnow()
+        self.count = 0
+        self.created = 0
+        self.errors = []
+        self.seen = set()
+
+    def add(self, raw_rows: Iterable):
+        """
+        Valide et insère des éléments bruts (dict ou exception de décodage),
+        numérotés à la suite des précédents.
+        """
+        rows = iter(raw_rows)
+        while True:
+            batch = list(islice(rows, BULK_CHUNK_SIZE))
+            if not batch:
+                return
+            valid, errors = validate_rows(batch, self.count)
+            self.count += len(batch)
+            self.errors.extend(errors)
+            self._insert(valid)
+
+    def finish(self) -> dict:
+        """
+        Valide la transaction et renvoie le résultat de l'import.
+        """
+        self.db.commit()
+        self.errors.sort(key=lambda e: e["index"])
+        return {"created": self.created, "errors": self.errors}
+
+    def _insert(self, valid):
+        client_ids = {f.client_id for _, f in valid}
+        known_clients = set(
+            self.db.execute(select(models.Client.id).where(models.Client.id.in_(client_ids))).scalars()
+        ) if client_ids else set()
+
+        accepted = []
+        for index, facture in valid:
+            if facture.client_id not in known_clients:
+                self.errors.append(_error(index, facture.numero_facture, "Client non trouvé"))
+            elif facture.numero_facture is None:
+                accepted.append((index, facture))
+            elif numerotation.is_reserved(facture.numero_facture):
+                self.errors.append(_error(
+                    index, facture.numero_facture, "Format de numéro réservé à la numérotation automatique"
+                ))
+            elif facture.numero_facture in self.seen:
+                self.errors.append(_error(index, facture.numero_facture, "Numéro de facture en double dans le lot"))
+            else:
+                self.seen.add(facture.numero_facture)
+                accepted.append((index, facture))
+        if accepted:
+            self.created += _insert_chunk(self.db, accepted, self.now, self.errors)
+
+
+def import_factures(db: Session, raw_rows: Iterable) -> dict:
+    """
+    Crée en masse des factures et leurs lignes dans une seule transaction
+    (voir BulkImport).
+    """
+    importer = BulkImport(db)
+    try:
+        importer.add(raw_rows)
+        return importer.finish()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def _insert_chunk(db: Session, chunk, now, errors) -> int:
+    numeros = [f.numero_facture for _, f in chunk if f.numero_facture is not None]
+    existing = set(
+        db.execute(
+            select(models.Facture.numero_facture)
+            .where(models.Facture.numero_facture.in_(numeros))
+        ).scalars()
+    ) if numeros else set()
+    scopes = rollups.piece_scopes(db, [ligne.piece_id for _, f in chunk for ligne in f.lignes])
+    rows = []
+    for index, facture in chunk:
+        if facture.numero_facture in existing:
+            errors.append(_error(index, facture.numero_facture, "Numéro de facture déjà utilisé"))
+        elif any(l.piece_id is not None and l.piece_id not in scopes for l in facture.lignes):
+            errors.append(_error(index, facture.numero_facture, "Pièce non trouvée"))
+        else:
+            rows.append(facture)
+    if not rows:
+        return 0
+
+    # Un seul bloc de numéros pour toutes les factures du lot sans numéro
+    nb_auto = sum(1 for f in rows if f.numero_facture is None)
+    sequence = numerotation.allocate(db, now.year, nb_auto) if nb_auto else None
+    values = []
+    for f in rows:
+        value = {
+            "numero_facture": f.numero_facture,
+            "client_id": f.client_id,
+            "informations_complementaires": f.informations_complementaires,
+            "date_creation": now,
+            "annee": None,
+            "sequence": None,
+        }
+        if f.numero_facture is None:
+            value.update(
+                numero_facture=numerotation.format_numero(now.year, sequence),
+                annee=now.year,
+                sequence=sequence
+            )
+            sequence += 1
+        values.append(value)
+    db.execute(insert(models.Facture), values)
+    ids = dict(
+        db.execute(
+            select(models.Facture.numero_facture, models.Facture.id)
+            .where(models.Facture.numero_facture.in_([v["numero_facture"] for v in values]))
+        ).all()
+    )
+    lignes = [
+        {
+            "facture_id": ids[v["numero_facture"]],
+            "description": ligne.description,
+            "quantite": ligne.quantite,
+            "prix_unitaire_ht": ligne.prix_unitaire_ht,
+            "piece_id": ligne.piece_id,
+            "categorie": scopes.get(ligne.piece_id, (None, None))[0],
+            "fournisseur_id": scopes.get(ligne.piece_id, (None, None))[1],
+        }
+        for f, v in zip(rows, values)
+        for ligne in f.lignes
+    ]
+    if lignes:
+        db.execute(insert(models.FactureLigne), lignes)
+        rollups.record_lignes(
+            db, now.date(),
+            [(l["quantite"], l["prix_unitaire_ht"], l["categorie"], l["fournisseur_id"]) for l in lignes]
+        )
+        if any(l["piece_id"] is not None for l in lignes):
+            stock.record_factures(db, ids.values())
+    return len(rows)
+
+
+def _error(index, numero, detail):
+    return {"index": index, "numero_facture": numero, "detail": detail}
@@ -0,0 +1,188 @@
+# backend/cache.py
+"""
+Cache en mémoire des données de référence (fournisseurs, remises,
+main-d'œuvre, techniciens) : elles changent quelques fois par mois mais
+sont lues sur presque tous les écrans.
+
+- Lecture à travers le cache : les réponses JSON des endpoints de liste et
+  de détail sont gardées sérialisées, avec leur ETag (304 si inchangé).
+- TTL et éviction LRU au-delà de REFERENCE_CACHE_SIZE entrées.
+- Invalidation à l'écriture : Repository.commit() incrémente la génération
+  des modèles modifiés, ce qui rend caduques toutes leurs entrées.
+- Compteurs hits/misses par modèle (GET /api/cache).
+
+Le cache est propre à chaque processus : avec plusieurs workers uvicorn,
+une écriture n'invalide que le cache du worker qui l'a reçue, les autres
+se mettent à jour au plus tard après REFERENCE_CACHE_TTL secondes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from fastapi import Request, Response, status
+
+from .serialization import dumps, serialize_rows
+
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_SIZE = int(os.environ.get("REFERENCE_CACHE_SIZE", "1024"))
+
+# Les réponses servies depuis le cache restent à revalider par le client
+CACHE_CONTROL = "private, max-age=0, must-revalidate"
+# En-têtes de la réponse d'origine conservés avec l'entrée (pagination)
+KEPT_HEADERS = ("X-Next-Cursor",)
+
+
+class Entry:
+    __slots__ = ("body", "etag", "headers", "expires")
+
+    def __init__(self, body: bytes, headers: dict, expires: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.headers = headers
+        self.expires = expires
+
+
+class ReferenceCache:
+    """
+    Cache LRU à durée de vie, partitionné par modèle.
+    """
+
+    def __init__(self, maxsize: int = REFERENCE_CACHE_SIZE, ttl: float = REFERENCE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, model) -> int:
+        return self._generations.get(model.__name__, 0)
+
+    def get(self, model, key: Hashable) -> Optional[Entry]:
+        name = model.__name__
+        with self._lock:
+            full_key = (name, self.generation(model), key)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.expires <= time.monotonic():
+                del self._entries[full_key]
+                entry = None
+            if entry is None:
+                self.misses[name] = self.misses.get(name, 0) + 1
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return entry
+
+    def put(self, model, generation: int, key: Hashable, body: bytes, headers: dict) -> Entry:
+        """
+        Stocke une réponse calculée pendant la génération `generation` ;
+        si le modèle a été modifié entre-temps, l'entrée est déjà caduque.
+        """
+        name = model.__name__
+        expires = time.monotonic() + self.ttl
+        entry = Entry(body, headers, expires)
+        with self._lock:
+            if generation != self.generation(model):
+                return entry
+            self._entries[(name, generation, key)] = entry
+            self._entries.move_to_end((name, generation, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, *models):
+        """
+        Rend caduques toutes les entrées des modèles donnés (évincées
+        ensuite par le LRU).
+        """
+        with self._lock:
+            for model in models:
+                name = model.__name__
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in list(self._generations):
+                self._generations[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = sorted(set(self.hits) | set(self.misses))
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "par_modele": {
+                    name: {"hits": self.hits.get(name, 0), "misses": self.misses.get(name, 0)}
+                    for name in names
+                },
+            }
+
+
+REFERENCE_CACHE = ReferenceCache()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Vrai si l'en-tête If-None-Match désigne l'ETag `etag` (avec ou sans guillemets).
+    """
+    if not if_none_match:
+        return False
+    etag = etag.strip('"')
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.replace("W/", "", 1).strip('"') == etag for t in tags)
+
+
+def request_key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+
+def cached_response(
+    request: Request,
+    model,
+    schema,
+    load: Callable[[Response], object],
+    key: Optional[Hashable] = None,
+    cache: ReferenceCache = REFERENCE_CACHE
+) -> Response:
+    """
+    Sert la réponse JSON d'un endpoint de lecture depuis le cache.
+
+    En cas d'absence, `load(response)` renvoie un objet ORM ou une liste
+    d'objets, sérialisés avec `schema` ; les en-têtes de pagination qu'il
+    pose sur `response` sont conservés avec l'entrée. La clé par défaut est
+    le chemin et les paramètres de la requête.
+    """
+    key = key if key is not None else request_key(request)
+    entry = cache.get(model, key)
+    if entry is None:
+        generation = cache.generation(model)
+        scratch = Response()
+        result = load(scratch)
+        rows = result if isinstance(result, list) else [result]
+        data = serialize_rows(rows, schema)
+        body = dumps(data if isinstance(result, list) else data[0])
+        headers = {h: scratch.headers[h] for h in KEPT_HEADERS if h in scratch.headers}
+        entry = cache.put(model, generation, key, body, headers)
+
+    headers = dict(entry.headers, ETag=entry.etag)
+    headers["Cache-Control"] = CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
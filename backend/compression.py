@@ -0,0 +1,185 @@
+# backend/compression.py
+"""
+Compression des réponses négociée sur Accept-Encoding (brotli si le
+module est installé, sinon gzip).
+
+Seuls les types texte (JSON, NDJSON, HTML...) sont compressés, et
+seulement au-delà de COMPRESS_MIN_SIZE octets : en dessous, l'en-tête et
+le temps CPU coûtent plus que ce qu'ils font gagner. Les réponses en flux
+(NDJSON) sont compressées morceau par morceau, chaque morceau étant vidé
+aussitôt pour ne pas retarder le client. Le flux SSE (text/event-stream)
+n'est jamais compressé : chaque événement doit partir immédiatement.
+
+Middleware ASGI pur (pas BaseHTTPMiddleware) : les StreamingResponse ne
+sont pas mises en mémoire.
+"""
+
+import gzip
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+# Qualité 4 : l'essentiel du gain de brotli pour un coût CPU proche de gzip 6
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+}
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Encodage à utiliser ("br", "gzip") d'après l'en-tête Accept-Encoding,
+    ou None.
+    """
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda c: accepted.get(c, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            # wbits 31 : en-tête et somme de contrôle gzip
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _Responder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    """
+    Intercepte les messages http.response.* d'une réponse.
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        # Créé au premier morceau d'une réponse en flux
+        self.compressor = None
+        # Type non compressible ou déjà encodé : transmis tel quel
+        self.passthrough = False
+
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+            self.passthrough = (
+                media_type not in COMPRESSIBLE_TYPES
+                or "content-encoding" in headers
+                or message["status"] in (204, 304)
+            )
+            if self.passthrough:
+                await self._send(message)
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            if not more_body:
+                # Réponse complète en un seul message
+                if len(body) < self.minimum_size:
+                    self._vary()
+                    await self._send(self.start)
+                    await self._send(message)
+                    return
+                body = compress(body, self.encoding)
+                self._encoded(len(body))
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            # Flux : compressé au fil de l'eau, longueur inconnue
+            self.compressor = _Compressor(self.encoding)
+            self._encoded(None)
+            await self._send(self.start)
+
+        data = self.compressor.chunk(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _vary(self):
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+
+    def _encoded(self, length: Optional[int]):
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            if "content-length" in headers:
+                del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(length)
+        # La représentation compressée n'est plus identique octet pour octet
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
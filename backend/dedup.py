@@ -0,0 +1,510 @@
+# backend/dedup.py
+"""
+Détection et fusion des clients en double.
+
+Normalisation :
+- téléphone : chiffres seuls, indicatif +33 / 0033 et 0 initial retirés
+  (« 06 12 34 56 78 » et « +33 6 12 34 56 78 » donnent 612345678) ;
+- e-mail : minuscules, sans « +étiquette », points ignorés pour Gmail ;
+- nom : sans accents ni ponctuation, mots triés (nom et prénom inversés
+  se retrouvent), et clé phonétique du nom (Dupont, Dupond -> DPN).
+
+Ces clés sont stockées sur chaque client (telephone_cle, email_cle,
+nom_cle), indexées, calculées à la création du client et, pour les
+clients existants, au démarrage (ensure_keys).
+
+Comparer tous les clients deux à deux est hors de portée (500 000 clients :
+10^11 paires). Seuls sont comparés les clients qui partagent une clé de
+blocage : même téléphone, même e-mail, ou même nom (ou prénom, s'ils sont
+inversés) phonétique dans le même code postal ; à défaut de code postal,
+mêmes nom et prénom phonétiques. Un bloc de plus de DEDUP_MAX_BLOCK
+clients (nom très courant) n'est pas parcouru.
+
+Score d'une paire : similarité des trigrammes du nom complet (indice de
+Jaccard, comme pg_trgm), relevée par une même prononciation et par un
+téléphone ou un e-mail commun, abaissée par des coordonnées qui se
+contredisent ou quand rien d'autre que le nom ne concorde. Au-delà de
+DEDUP_SEUIL, la paire est un doublon. Les doublons sont regroupés
+(union-find), les paires les plus sûres d'abord, sans jamais réunir des
+fiches aux téléphones, e-mails ou codes postaux différents ; la fiche la
+plus complète de chaque groupe est proposée comme fiche principale.
+
+- rapport() : tous les groupes de doublons (python -m backend.dedup rapport) ;
+- candidates() : doublons probables d'un client à créer, en une requête
+  sur les index (vérification à la création) ;
+- merge() : fusionne des doublons dans la fiche principale (factures,
+  interventions et photos rattachées à celle-ci, champs vides complétés).
+"""
+
+import os
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+DEDUP_SEUIL = float(os.environ.get("DEDUP_SEUIL", "0.8"))
+DEDUP_MAX_BLOCK = int(os.environ.get("DEDUP_MAX_BLOCK", "200"))
+# Facteur appliqué au score par coordonnée contradictoire
+DEDUP_PENALITE = 0.7
+# Facteur appliqué quand seul le nom concorde (homonymes possibles)
+DEDUP_NOM_SEUL = 0.85
+# Candidats lus au plus par vérification à la création
+DEDUP_MAX_CANDIDATES = 50
+KEYS_BATCH_SIZE = 5000
+
+# Champs complétés depuis les doublons lors d'une fusion
+FIELDS = ("nom", "prenom", "telephone", "email", "adresse", "code_postal", "ville", "pays")
+
+
+# -- normalisation -------------------------------------------------------------
+
+def fold(text: Optional[str]) -> str:
+    """
+    Minuscules sans accents ; tout ce qui n'est pas lettre ou chiffre
+    devient une espace.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.split(r"[^a-z0-9]+", text)).strip()
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("33") and len(digits) >= 11:
+        digits = digits[2:]
+    digits = digits.lstrip("0")
+    return digits if len(digits) >= 6 else None
+
+
+def normalize_code_postal(code_postal: Optional[str]) -> Optional[str]:
+    return (code_postal or "").replace(" ", "") or None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    local, at, domain = email.rpartition("@")
+    if not at or not local or not domain:
+        return None
+    local = local.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+_PHONETIC_RULES = [(re.compile(pattern), repl) for pattern, repl in (
+    (r"PH", "F"), (r"QU", "K"), (r"Q", "K"), (r"CK", "K"),
+    (r"SC(?=[EIY])", "S"), (r"C(?=[EIY])", "S"), (r"CH", "§"), (r"C", "K"),
+    (r"GU(?=[EIY])", "G"), (r"G(?=[EIY])", "J"), (r"SH", "§"),
+    (r"EAU", "O"), (r"AU", "O"), (r"OU", "U"), (r"[AE]I", "E"),
+    (r"Y", "I"), (r"W", "V"), (r"Z", "S"), (r"H", ""),
+    # Consonnes finales muettes
+    (r"(?<=.)[STXDP]+$", ""),
+)]
+
+
+@lru_cache(maxsize=65536)
+def phonetic(text: Optional[str]) -> str:
+    """
+    Clé phonétique (français simplifié) : règles de prononciation, puis
+    première lettre et consonnes suivantes, sans répétition, 6 caractères.
+    Mise en cache : les mêmes noms et prénoms reviennent sans cesse.
+    """
+    word = fold(text).replace(" ", "").upper()
+    word = re.sub(r"[0-9]", "", word)
+    if not word:
+        return ""
+    for pattern, repl in _PHONETIC_RULES:
+        word = pattern.sub(repl, word)
+    if not word:
+        return ""
+    key = word[0] + re.sub(r"[AEIOU]", "", word[1:])
+    key = re.sub(r"(.)\1+", r"\1", key)
+    return key[:6]
+
+
+def full_name(nom: Optional[str], prenom: Optional[str]) -> str:
+    return " ".join(sorted(fold(f"{prenom or ''} {nom or ''}").split()))
+
+
+def trigrams(name: str) -> frozenset:
+    """
+    Trigrammes de chaque mot complété de deux espaces avant et une après
+    (découpage de pg_trgm).
+    """
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def client_keys(data: dict) -> dict:
+    """
+    Clés de rapprochement d'un client (dictionnaire de champs), à stocker
+    avec lui.
+    """
+    return {
+        "telephone_cle": normalize_phone(data.get("telephone")),
+        "email_cle": normalize_email(data.get("email")),
+        "nom_cle": phonetic(data.get("nom")) or None,
+    }
+
+
+# -- comparaison ---------------------------------------------------------------
+
+class Fiche:
+    """
+    Client réduit à ce qui sert à la comparaison. Les trigrammes du nom ne
+    sont calculés que pour les fiches effectivement comparées.
+    """
+
+    __slots__ = ("id", "telephone", "email", "code_postal", "nom_cle", "prenom_cle", "nom", "remplis", "_grams")
+
+    def __init__(self, id, nom, prenom, telephone, email, code_postal, remplis=0, keys=None):
+        keys = keys or client_keys({"nom": nom, "telephone": telephone, "email": email})
+        self.id = id
+        self.telephone = keys["telephone_cle"]
+        self.email = keys["email_cle"]
+        self.code_postal = normalize_code_postal(code_postal)
+        self.nom_cle = keys["nom_cle"]
+        self.prenom_cle = phonetic(prenom) or None
+        self.nom = full_name(nom, prenom)
+        self.remplis = remplis
+        self._grams = None
+
+    @property
+    def grams(self) -> frozenset:
+        if self._grams is None:
+            self._grams = trigrams(self.nom)
+        return self._grams
+
+    def blocks(self):
+        if self.telephone:
+            yield "t:" + self.telephone
+        if self.email:
+            yield "e:" + self.email
+        if self.code_postal:
+            # Nom et prénom : retrouve aussi les fiches où ils sont inversés
+            for key in {self.nom_cle, self.prenom_cle} - {None}:
+                yield f"n:{key}:{self.code_postal}"
+        elif self.nom_cle:
+            yield "p:" + ":".join(sorted({self.nom_cle, self.prenom_cle or ""}))
+
+
+def score(a: Fiche, b: Fiche) -> Tuple[float, List[str]]:
+    """
+    Probabilité (0 à 1) que deux fiches désignent le même client, et les
+    éléments qui concordent.
+    """
+    value = similarity(a.grams, b.grams)
+    motifs = ["nom"] if value >= DEDUP_SEUIL else []
+    if a.nom_cle and a.nom_cle == b.nom_cle:
+        # Même prononciation : faute de frappe ou d'orthographe (Dupont, Dupond)
+        value = 0.5 + 0.5 * value
+        motifs.append("phonetique")
+    shared = []
+    for field in ("telephone", "email", "code_postal"):
+        mine, theirs = getattr(a, field), getattr(b, field)
+        if not mine or not theirs:
+            continue
+        if mine == theirs:
+            shared.append(field)
+        else:
+            # Coordonnées contradictoires : homonymes probables
+            value *= DEDUP_PENALITE
+    if not shared:
+        value *= DEDUP_NOM_SEUL
+    for field in shared:
+        if field != "code_postal":
+            # Téléphone ou e-mail commun : un nom approchant suffit
+            value = 0.5 + 0.5 * value
+    return value, motifs + shared
+
+
+class _Groups:
+    """
+    Union-find des fiches, qui refuse de réunir deux groupes dont les
+    coordonnées se contredisent : une fiche sans téléphone ne relie pas
+    deux homonymes aux téléphones différents.
+    """
+
+    def __init__(self, fiches):
+        self.fiches = fiches
+        self.parent = {}
+        self.coords = {}
+
+    def find(self, x):
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def _coords(self, root):
+        if root not in self.coords:
+            fiche = self.fiches[root]
+            self.coords[root] = tuple(
+                {value} if value else set() for value in (fiche.telephone, fiche.email, fiche.code_postal)
+            )
+        return self.coords[root]
+
+    def union(self, a, b) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return True
+        mine, theirs = self._coords(ra), self._coords(rb)
+        if any(x and y and not x & y for x, y in zip(mine, theirs)):
+            return False
+        root, child = min(ra, rb), max(ra, rb)
+        self.parent[child] = root
+        self.coords[root] = tuple(x | y for x, y in zip(mine, theirs))
+        del self.coords[child]
+        return True
+
+
+def find_groups(fiches: Iterable[Fiche], seuil: float = DEDUP_SEUIL, max_block: int = DEDUP_MAX_BLOCK) -> dict:
+    """
+    Groupes de doublons parmi `fiches`, par blocage puis comparaison des
+    paires de chaque bloc ; les paires les plus sûres sont regroupées
+    d'abord.
+    """
+    fiches = list(fiches)
+    blocks: Dict[str, List[int]] = {}
+    for index, fiche in enumerate(fiches):
+        for key in fiche.blocks():
+            blocks.setdefault(key, []).append(index)
+
+    matches = []
+    compared = set()
+    skipped = 0
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block:
+            skipped += 1
+            continue
+        for i, left in enumerate(members):
+            for right in members[i + 1:]:
+                pair = (left, right)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                value, motifs = score(fiches[left], fiches[right])
+                if value >= seuil:
+                    matches.append((value, left, right, motifs))
+
+    groups = _Groups(fiches)
+    by_root: Dict[int, dict] = {}
+    for value, left, right, motifs in sorted(matches, key=lambda m: -m[0]):
+        groups.union(left, right)
+    for value, left, right, motifs in matches:
+        root = groups.find(left)
+        if root != groups.find(right):
+            continue
+        group = by_root.setdefault(root, {"membres": set(), "score": 1.0, "motifs": set()})
+        group["membres"].update((left, right))
+        group["score"] = min(group["score"], value)
+        group["motifs"].update(motifs)
+    result = []
+    for group in by_root.values():
+        indexes = sorted(group["membres"], key=lambda i: (-fiches[i].remplis, fiches[i].id))
+        result.append({
+            "principal_id": fiches[indexes[0]].id,
+            "doublon_ids": sorted(fiches[i].id for i in indexes[1:]),
+            "score": round(group["score"], 3),
+            "motifs": sorted(group["motifs"]),
+        })
+    result.sort(key=lambda g: g["principal_id"])
+    return {"groupes": result, "comparaisons": len(compared), "blocs_ignores": skipped, "clients": len(fiches)}
+
+
+# -- accès base ----------------------------------------------------------------
+
+_COLUMNS = [getattr(models.Client, f) for f in ("id",) + FIELDS] + [
+    models.Client.telephone_cle, models.Client.email_cle, models.Client.nom_cle,
+]
+
+
+def _fiche(row) -> Fiche:
+    remplis = sum(1 for f in FIELDS if getattr(row, f))
+    # Clés stockées, sauf client pas encore indexé (fill_keys)
+    keys = None if row.nom_cle is None else {
+        "telephone_cle": row.telephone_cle, "email_cle": row.email_cle, "nom_cle": row.nom_cle,
+    }
+    return Fiche(row.id, row.nom, row.prenom, row.telephone, row.email, row.code_postal, remplis, keys)
+
+
+def rapport(db: Session, seuil: float = DEDUP_SEUIL) -> dict:
+    """
+    Tous les groupes de doublons de la base.
+    """
+    rows = db.execute(select(*_COLUMNS).execution_options(yield_per=KEYS_BATCH_SIZE))
+    return find_groups((_fiche(row) for row in rows), seuil)
+
+
+def candidates(db: Session, data: dict, seuil: float = DEDUP_SEUIL, exclude: Optional[int] = None) -> List[dict]:
+    """
+    Clients existants probablement identiques à `data` (champs d'un
+    client), du plus probable au moins probable, avec de quoi les
+    reconnaître (nom, prénom, téléphone). Une requête, servie par les
+    index des clés.
+    """
+    keys = client_keys(data)
+    fiche = Fiche(None, data.get("nom"), data.get("prenom"), data.get("telephone"), data.get("email"),
+                  data.get("code_postal"), keys=keys)
+    client = models.Client
+    conditions = []
+    if fiche.telephone:
+        conditions.append(client.telephone_cle == fiche.telephone)
+    if fiche.email:
+        conditions.append(client.email_cle == fiche.email)
+    names = {fiche.nom_cle, fiche.prenom_cle} - {None}
+    if fiche.code_postal and names:
+        # Mêmes blocs que rapport() : nom ou prénom (inversés) dans le code postal
+        conditions.append(and_(
+            client.nom_cle.in_(names),
+            client.code_postal.in_({data.get("code_postal"), fiche.code_postal})
+        ))
+    elif fiche.nom_cle:
+        conditions.append(and_(client.nom_cle.in_(names), client.code_postal.is_(None)))
+    if not conditions:
+        return []
+    stmt = select(*_COLUMNS).where(or_(*conditions)).limit(DEDUP_MAX_CANDIDATES)
+    if exclude is not None:
+        stmt = stmt.where(client.id != exclude)
+    found = []
+    for row in db.execute(stmt):
+        value, motifs = score(fiche, _fiche(row))
+        if value >= seuil:
+            found.append({
+                "client_id": row.id, "nom": row.nom, "prenom": row.prenom, "telephone": row.telephone,
+                "score": round(value, 3), "motifs": motifs,
+            })
+    found.sort(key=lambda c: -c["score"])
+    return found
+
+
+def merge(db: Session, principal_id: int, doublon_ids: List[int]) -> dict:
+    """
+    Rattache à `principal_id` les factures, interventions et photos des
+    doublons, complète ses champs vides avec les leurs (le plus ancien
+    d'abord), puis supprime les doublons. Dans la transaction en cours.
+    Renvoie le nombre de lignes rattachées par table, ou None si un des
+    clients n'existe pas.
+    """
+    client = models.Client
+    ids = [principal_id] + sorted(set(doublon_ids))
+    rows = {c.id: c for c in db.scalars(select(client).where(client.id.in_(ids)))}
+    if len(rows) != len(ids):
+        return None
+    principal = rows[principal_id]
+    for doublon_id in ids[1:]:
+        for field in FIELDS:
+            if not getattr(principal, field) and getattr(rows[doublon_id], field):
+                setattr(principal, field, getattr(rows[doublon_id], field))
+    for key, value in client_keys({f: getattr(principal, f) for f in FIELDS}).items():
+        setattr(principal, key, value)
+
+    moved = {}
+    for label, model in (("factures", models.Facture), ("interventions", models.PlanningEvent),
+                         ("photos", models.Photo)):
+        moved[label] = db.execute(
+            update(model)
+            .where(model.client_id.in_(ids[1:]))
+            .values(client_id=principal_id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    for doublon_id in ids[1:]:
+        db.expunge(rows[doublon_id])
+    db.execute(delete(client).where(client.id.in_(ids[1:])))
+    db.flush()
+    return moved
+
+
+def fill_keys(db: Session) -> int:
+    """
+    Calcule les clés des clients qui n'en ont pas (base antérieure à la
+    déduplication, insertions directes). Renvoie le nombre de clients mis
+    à jour.
+    """
+    client = models.Client
+    total, last_id = 0, 0
+    while True:
+        rows = db.execute(
+            select(client.id, client.nom, client.telephone, client.email)
+            .where(client.nom_cle.is_(None), client.id > last_id)
+            .order_by(client.id)
+            .limit(KEYS_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        # Un nom sans lettre n'a pas de clé phonétique : ligne laissée telle quelle
+        values = [
+            {"id": r.id, **keys}
+            for r in rows
+            for keys in [client_keys({"nom": r.nom, "telephone": r.telephone, "email": r.email})]
+            if keys["nom_cle"]
+        ]
+        if values:
+            db.execute(update(client), values)
+            db.commit()
+        total += len(values)
+    return total
+
+
+def ensure_keys(engine):
+    """
+    Au démarrage : complète les clés manquantes.
+    """
+    with Session(engine) as db:
+        fill_keys(db)
+
+
+def main(argv=None):
+    import json
+
+    from .database import SessionLocal, engine, sync_schema
+
+    args = sys.argv[1:] if argv is None else argv
+    command = args[0] if args else "rapport"
+    sync_schema(engine)
+    db = SessionLocal()
+    try:
+        if command == "cles":
+            print(f"{fill_keys(db)} client(s) mis à jour")
+        elif command == "rapport":
+            fill_keys(db)
+            result = rapport(db)
+            for groupe in result["groupes"]:
+                print(json.dumps(groupe, ensure_ascii=False))
+            print(f"{len(result['groupes'])} groupe(s) de doublons, {result['comparaisons']} comparaisons, "
+                  f"{result['blocs_ignores']} bloc(s) trop grand(s) ignoré(s)", file=sys.stderr)
+        else:
+            print("usage : python -m backend.dedup [rapport|cles]")
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# backend/events.py
+"""
+Bus d'événements en mémoire, diffusé aux postes par Server-Sent Events
+(GET /api/events).
+
+Les routeurs publient après commit des événements métier :
+
+    facture.created   {id, numero_facture, client_id, date}
+    facture.deleted   {id, date}
+    facture.imported  {created}              (import en masse ; sans ID, regroupé)
+    planning.changed  {id, action, date}     (ou {action: "optimise", ...})
+    piece.updated     {id, action}
+    photo.analysee    {id, job, statut, degats}
+    client.fusionne   {id, doublons}
+
+Chaque abonné a sa propre file, bornée :
+- regroupement : un événement remplace celui de même type et même ID
+  encore en attente (dix modifications d'une pièce = un seul envoi) ;
+- contre-pression : le publieur n'attend jamais ; si un abonné lent
+  dépasse EVENTS_QUEUE_SIZE événements en attente, sa file est vidée et il
+  reçoit un unique événement « resync » (tout recharger).
+
+Les derniers événements sont gardés pour rejouer ceux manqués lors d'une
+reconnexion (en-tête Last-Event-ID) ; au-delà, « resync ».
+
+Le bus est propre à chaque processus : avec plusieurs workers uvicorn,
+un poste ne reçoit que les événements publiés par son worker.
+"""
+
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Iterable, Optional
+
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "256"))
+EVENTS_HISTORY_SIZE = int(os.environ.get("EVENTS_HISTORY_SIZE", "1000"))
+# Commentaire SSE envoyé en l'absence d'événement (proxies, détection de déconnexion)
+EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", "15"))
+
+RESYNC = "resync"
+
+
+class Event:
+    __slots__ = ("id", "type", "data", "key")
+
+    def __init__(self, id: int, type: str, data: dict):
+        self.id = id
+        self.type = type
+        self.data = data
+        # Clé de regroupement : même type, même objet
+        self.key = (type, data.get("id"))
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, ensure_ascii=False, default=_json_default)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscription:
+    """
+    File d'un abonné, manipulée uniquement depuis la boucle d'événements.
+    """
+
+    def __init__(self, types: Optional[Iterable[str]], maxsize: int):
+        self.types = frozenset(types) if types else None
+        self.maxsize = maxsize
+        self.pending = OrderedDict()
+        self.overflow = False
+        self.ready = asyncio.Event()
+        # Dernier ID connu de l'abonné : point de reprise en cas de reconnexion
+        self.start_id = 0
+
+    def wants(self, event: Event) -> bool:
+        return self.types is None or event.type.split(".", 1)[0] in self.types \
+            or event.type in self.types
+
+    def offer(self, event: Event) -> str:
+        """
+        Ajoute un événement ; renvoie "queued", "coalesced" ou "dropped".
+        """
+        outcome = "queued"
+        if event.key in self.pending:
+            del self.pending[event.key]
+            outcome = "coalesced"
+        self.pending[event.key] = event
+        if len(self.pending) > self.maxsize:
+            self.pending.clear()
+            self.overflow = True
+            outcome = "dropped"
+        self.ready.set()
+        return outcome
+
+    def drain(self):
+        """
+        Événements en attente, ou None si l'abonné doit tout recharger.
+        """
+        self.ready.clear()
+        if self.overflow:
+            self.overflow = False
+            self.pending.clear()
+            return None
+        events = list(self.pending.values())
+        self.pending.clear()
+        return events
+
+
+class EventBus:
+    def __init__(self, maxsize: int = EVENTS_QUEUE_SIZE, history: int = EVENTS_HISTORY_SIZE):
+        self.maxsize = maxsize
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def publish(self, type: str, **data):
+        """
+        Publie un événement ; appelable depuis la boucle comme depuis un
+        thread du pool (routeurs synchrones). Ne bloque jamais.
+        """
+        with self._lock:
+            event = Event(next(self._ids), type, data)
+            self._history.append(event)
+            self.published += 1
+            loop = self._loop
+        if loop is None or not self._subscribers:
+            return event
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(self._dispatch, event)
+        return event
+
+    def _dispatch(self, event: Event):
+        for subscription in self._subscribers:
+            if subscription.wants(event):
+                outcome = subscription.offer(event)
+                if outcome == "coalesced":
+                    self.coalesced += 1
+                elif outcome == "dropped":
+                    self.dropped += 1
+
+    def subscribe(self, types=None, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Nouvel abonné (à appeler depuis la boucle). Avec `last_event_id`,
+        les événements manqués encore en mémoire sont remis en file.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(types, self.maxsize)
+        with self._lock:
+            subscription.start_id = self._history[-1].id if self._history else 0
+        if last_event_id is not None:
+            subscription.start_id = last_event_id
+            with self._lock:
+                missed = [e for e in self._history if e.id > last_event_id]
+                complete = not self._history or self._history[0].id <= last_event_id + 1
+                # ID d'un processus précédent (redémarrage) : rien n'est fiable
+                complete = complete and last_event_id <= (self._history[-1].id if self._history else 0)
+            if not complete:
+                subscription.overflow = True
+                subscription.ready.set()
+            for event in missed:
+                if subscription.wants(event):
+                    subscription.offer(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def last_id(self) -> int:
+        with self._lock:
+            return self._history[-1].id if self._history else 0
+
+    def stats(self) -> dict:
+        return {
+            "abonnes": len(self._subscribers),
+            "publies": self.published,
+            "envoyes": self.delivered,
+            "regroupes": self.coalesced,
+            "resync": self.dropped,
+            "dernier_id": self.last_id(),
+        }
+
+    async def stream(self, subscription: Subscription, is_disconnected, heartbeat: float = EVENTS_HEARTBEAT):
+        """
+        Flux SSE d'un abonné, jusqu'à la déconnexion du client.
+        """
+        try:
+            yield f"retry: 3000\nid: {subscription.start_id}\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.ready.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                events = subscription.drain()
+                if events is None:
+                    yield Event(self.last_id(), RESYNC, {}).encode()
+                    continue
+                self.delivered += len(events)
+                yield "".join(event.encode() for event in events)
+        finally:
+            self.unsubscribe(subscription)
+
+
+EVENT_BUS = EventBus()
+
+
+def publish(type: str, **data):
+    return EVENT_BUS.publish(type, **data)
@@ -0,0 +1,289 @@
+# backend/export.py
+"""
+Export colonnaire des lignes de facture pour l'analyse hors ligne (BI).
+
+Chaque ligne de facture est exportée avec sa facture, sa pièce, et la
+catégorie et le fournisseur figés sur la ligne au moment de la vente (ceux
+des agrégats comptables, pas ceux de la pièce aujourd'hui), en fichiers
+Parquet ou Arrow IPC partitionnés par mois de facturation (partitionnement « Hive », lisible tel quel par
+pyarrow.dataset, DuckDB, Spark...) :
+
+    exports/mois=2024-01/part-0000000000.parquet
+    exports/mois=2024-02/part-0000000000.parquet
+    exports/mois=2024-02/part-0000012345.parquet   <- export incrémental suivant
+
+L'export est incrémental : le filigrane (ID et date de création les plus
+grands des factures exportées) est gardé dans exports/_watermark.json et
+seules les factures d'ID supérieur ou créées après cette date sont lues.
+La date rattrape les ID réutilisés : SQLite réattribue l'ID de la dernière
+facture supprimée, inférieur ou égal au filigrane. Les factures sont lues
+par lots de `chunk` (keyset sur l'ID) et chaque lot est écrit comme un
+groupe de lignes : la mémoire reste bornée quelle que soit la taille de la
+base.
+
+Les fichiers d'un export sont nommés d'après le filigrane de départ et ne
+sont publiés (renommés) qu'une fois complets, avant la mise à jour du
+filigrane : relancer un export interrompu réécrit les mêmes fichiers au
+lieu de dupliquer les lignes. Les factures modifiées ou supprimées après
+leur export ne sont pas répercutées.
+
+    python -m backend.export [--format parquet|arrow] [--dest exports] [--chunk 5000]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DEFAULT_CHUNK = 5000
+WATERMARK_FILE = "_watermark.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+# Partition des factures sans date
+UNKNOWN_MONTH = "inconnu"
+
+COLUMNS = (
+    models.Facture.id.label("facture_id"),
+    models.Facture.numero_facture,
+    models.Facture.date_creation,
+    models.Facture.client_id,
+    models.FactureLigne.id.label("ligne_id"),
+    models.FactureLigne.description,
+    models.FactureLigne.quantite,
+    models.FactureLigne.prix_unitaire_ht,
+    models.FactureLigne.piece_id,
+    models.Piece.ref.label("piece_ref"),
+    models.Piece.designation.label("piece_designation"),
+    # '' et 0 signifient « aucun » sur la ligne (rollups.py) : exportés en null
+    func.nullif(models.FactureLigne.categorie, '').label("piece_category"),
+    models.Piece.prix_achat.label("piece_prix_achat"),
+    func.nullif(models.FactureLigne.fournisseur_id, 0).label("fournisseur_id"),
+    models.Fournisseur.nom.label("fournisseur_nom"),
+)
+
+
+def arrow_schema():
+    return pa.schema([
+        ("facture_id", pa.int64()),
+        ("numero_facture", pa.string()),
+        ("date_creation", pa.timestamp("us")),
+        ("client_id", pa.int64()),
+        ("ligne_id", pa.int64()),
+        ("description", pa.string()),
+        ("quantite", pa.float64()),
+        ("prix_unitaire_ht", pa.float64()),
+        ("montant_ht", pa.float64()),
+        ("piece_id", pa.int64()),
+        ("piece_ref", pa.string()),
+        ("piece_designation", pa.string()),
+        ("piece_category", pa.string()),
+        ("piece_prix_achat", pa.float64()),
+        ("fournisseur_id", pa.int64()),
+        ("fournisseur_nom", pa.string()),
+    ])
+
+
+def read_watermark(dest: str) -> Tuple[int, Optional[datetime.datetime]]:
+    """
+    (ID, date de création) les plus grands déjà exportés ; date absente
+    avant le premier export ou dans un filigrane d'une version antérieure.
+    """
+    try:
+        with open(os.path.join(dest, WATERMARK_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0, None
+    date_creation = data.get("date_creation")
+    return int(data["facture_id"]), date_creation and datetime.datetime.fromisoformat(date_creation)
+
+
+def write_watermark(dest: str, facture_id: int, date_creation, rows: int):
+    path = os.path.join(dest, WATERMARK_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "facture_id": facture_id,
+            "date_creation": date_creation and date_creation.isoformat(),
+            "lignes": rows,
+            "date": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+        }, f)
+    os.replace(path + ".tmp", path)
+
+
+class _PartitionWriters:
+    """
+    Un fichier ouvert par mois rencontré pendant l'export, écrit sous un
+    nom temporaire puis publié par commit().
+    """
+
+    def __init__(self, dest: str, fmt: str, start: int, start_date, schema):
+        self.dest = dest
+        self.fmt = fmt
+        stamp = f"-{start_date:%Y%m%d%H%M%S%f}" if start_date else ""
+        self.name = f"part-{start:010d}{stamp}{FORMATS[fmt]}"
+        self.schema = schema
+        self._writers: Dict[str, object] = {}
+
+    def _path(self, month: str) -> str:
+        return os.path.join(self.dest, f"mois={month}", self.name)
+
+    def write(self, month: str, table):
+        writer = self._writers.get(month)
+        if writer is None:
+            path = self._path(month)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.fmt == "parquet":
+                writer = pq.ParquetWriter(path + ".tmp", self.schema)
+            else:
+                writer = pa.ipc.new_file(path + ".tmp", self.schema)
+            self._writers[month] = writer
+        writer.write_table(table)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def commit(self):
+        self.close()
+        for month in self._writers:
+            path = self._path(month)
+            os.replace(path + ".tmp", path)
+
+    def abort(self):
+        self.close()
+        for month in self._writers:
+            try:
+                os.remove(self._path(month) + ".tmp")
+            except FileNotFoundError:
+                pass
+
+
+def _chunk_table(rows, schema):
+    """
+    Lignes SQL d'un lot -> {mois: table Arrow}.
+    """
+    data = dict(zip((c.key for c in COLUMNS), map(list, zip(*rows))))
+    data["montant_ht"] = [
+        (q or 0.0) * (p or 0.0) for q, p in zip(data["quantite"], data["prix_unitaire_ht"])
+    ]
+    table = pa.Table.from_pydict(data, schema=schema)
+    # Mois calculé en colonne (année * 100 + mois), puis un filtre par mois du lot
+    dates = table.column("date_creation")
+    months = pc.add(pc.multiply(pc.year(dates), 100), pc.month(dates))
+    parts = {}
+    for month in pc.unique(months).to_pylist():
+        if month is None:
+            parts[UNKNOWN_MONTH] = table.filter(pc.is_null(months))
+        else:
+            parts[f"{month // 100:04d}-{month % 100:02d}"] = table.filter(pc.equal(months, month))
+    return parts
+
+
+def export_lignes(db: Session, dest: str, fmt: str = "parquet", chunk: int = DEFAULT_CHUNK) -> dict:
+    """
+    Exporte les lignes des factures postérieures au filigrane de `dest`.
+    Renvoie le nombre de factures et de lignes exportées et le nouveau filigrane.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow n'est pas installé : pip install pyarrow")
+    if fmt not in FORMATS:
+        raise ValueError(f"format inconnu : {fmt}")
+
+    os.makedirs(dest, exist_ok=True)
+    start, start_date = read_watermark(dest)
+    # Bornes hautes figées au départ : les factures créées pendant l'export
+    # iront dans le suivant
+    upper, upper_date = db.execute(
+        select(func.max(models.Facture.id), func.max(models.Facture.date_creation))
+    ).one()
+    upper = upper or 0
+    new = models.Facture.id > start
+    cursor = start
+    if start_date is not None and upper_date is not None:
+        # ID réutilisés (<= start) : factures créées après le filigrane
+        created = and_(
+            models.Facture.date_creation > start_date, models.Facture.date_creation <= upper_date
+        )
+        new = or_(new, created)
+        reused = db.scalar(select(func.min(models.Facture.id)).where(created))
+        if reused is not None:
+            cursor = min(cursor, reused - 1)
+    schema = arrow_schema()
+    writers = _PartitionWriters(dest, fmt, start, start_date, schema)
+    nb_factures, nb_lignes = 0, 0
+    try:
+        while cursor < upper:
+            ids = db.scalars(
+                select(models.Facture.id)
+                .where(models.Facture.id > cursor, models.Facture.id <= upper, new)
+                .order_by(models.Facture.id)
+                .limit(chunk)
+            ).all()
+            if not ids:
+                break
+            # Requête Core (pas d'objets ORM) : seules les colonnes sont lues
+            rows = db.connection().execute(
+                select(*COLUMNS)
+                .join(models.Facture, models.Facture.id == models.FactureLigne.facture_id)
+                .outerjoin(models.Piece, models.Piece.id == models.FactureLigne.piece_id)
+                .outerjoin(models.Fournisseur, models.Fournisseur.id == models.FactureLigne.fournisseur_id)
+                .where(
+                    models.FactureLigne.facture_id > cursor, models.FactureLigne.facture_id <= ids[-1], new
+                )
+                .order_by(models.Facture.id, models.FactureLigne.id)
+            ).all()
+            if rows:
+                for month, table in _chunk_table(rows, schema).items():
+                    writers.write(month, table)
+            cursor = ids[-1]
+            nb_factures += len(ids)
+            nb_lignes += len(rows)
+    except BaseException:
+        writers.abort()
+        raise
+    writers.commit()
+    if nb_factures:
+        dates = [d for d in (start_date, upper_date) if d is not None]
+        write_watermark(dest, max(start, upper), max(dates, default=None), nb_lignes)
+    return {"factures": nb_factures, "lignes": nb_lignes, "filigrane": max(start, upper)}
+
+
+def main(argv=None):
+    from .database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Export incrémental des lignes de facture (Parquet / Arrow IPC)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--dest", default=os.environ.get("EXPORT_DIR", "./exports"))
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="factures par lot")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        result = export_lignes(db, args.dest, args.format, args.chunk)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(
+        f"{result['factures']} factures, {result['lignes']} lignes exportées en {elapsed:.1f} s "
+        f"(filigrane : facture {result['filigrane']})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
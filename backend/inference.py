@@ -0,0 +1,399 @@
+# backend/inference.py
+"""
+Analyse des dégâts sur les photos de véhicules (« analyse d'image par IA »).
+
+Le modèle n'est jamais appelé par requête HTTP : les demandes passent par
+une file qui les regroupe en lots (micro-batching) avant inférence.
+- Un lot part dès qu'il atteint INFERENCE_MAX_BATCH images, ou
+  INFERENCE_MAX_WAIT_MS après sa première image.
+- INFERENCE_WORKERS lots au plus sont traités en même temps (pool de
+  threads : décodage Pillow et calcul NumPy libèrent le GIL). Tant que
+  tous les workers sont occupés, les demandes s'accumulent dans la file :
+  plus le serveur est chargé, plus les lots sont gros.
+- Les résultats sont enregistrés par empreinte du fichier et version du
+  modèle (analyses_photo) : une photo déjà analysée, ou son doublon, ne
+  repasse pas dans le modèle. Deux demandes simultanées pour le même
+  fichier partagent une seule inférence.
+
+Le modèle est interchangeable : toute classe qui suit DamageModel,
+désignée par INFERENCE_MODEL (« module:Classe »). Par défaut StubModel,
+un modèle local déterministe (sans poids à télécharger) dont le coût de
+calcul ressemble à celui d'un petit réseau : il sert aux tests et aux
+mesures, pas à détecter de vrais dégâts.
+
+Les analyses sont des tâches asynchrones (POST /api/analyses/, puis
+GET /api/analyses/jobs/{id}) ; l'événement « photo.analysee » est publié
+à la fin de chacune. Les tâches sont gardées en mémoire, les résultats en
+base.
+"""
+
+import asyncio
+import datetime
+import importlib
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import models
+from .events import publish
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODEL = os.environ.get("INFERENCE_MODEL", "backend.inference:StubModel")
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "20"))
+# NumPy utilise déjà plusieurs cœurs pour un produit matriciel : peu de
+# workers suffisent
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+# Tâches terminées gardées en mémoire pour GET /api/analyses/jobs/{id}
+INFERENCE_JOBS_RETENTION = int(os.environ.get("INFERENCE_JOBS_RETENTION", "10000"))
+# Score au-delà duquel un dégât est signalé
+SEUIL_DEGATS = 0.5
+
+LABELS = ("rayure", "bosse", "bris_de_glace", "phare", "pare_choc")
+
+
+# -- modèles -------------------------------------------------------------------
+
+class DamageModel:
+    """
+    Interface d'un modèle d'analyse. `predict` reçoit un lot d'images
+    (N, hauteur, largeur, 3) en float32 dans [0, 1], à la taille
+    `input_size`, et renvoie les probabilités (N, len(labels)).
+    Elle est appelée depuis plusieurs threads à la fois.
+    """
+
+    name = "modele"
+    version = "1"
+    input_size: Tuple[int, int] = (224, 224)
+    labels: Sequence[str] = LABELS
+
+    @property
+    def key(self) -> str:
+        # Clé de cache des résultats : changer de version invalide le cache
+        return f"{self.name}:{self.version}"
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class StubModel(DamageModel):
+    """
+    Modèle local déterministe : réduction 4x4 de l'image, couche cachée
+    ReLU, sortie sigmoïde, poids aléatoires à graine fixe. Le coût est
+    dominé par le produit avec la première matrice (~19 Mo), lue une fois
+    par lot : comme pour un vrai réseau, un lot de 32 images coûte bien
+    moins que 32 appels d'une image.
+    """
+
+    name = "stub"
+    version = "1"
+
+    def __init__(self, seed: int = 0, hidden: int = 512):
+        rng = np.random.default_rng(seed)
+        height, width = self.input_size
+        features = (height // 4) * (width // 4) * 3
+        self.w1 = (rng.standard_normal((features, hidden)) / np.sqrt(features)).astype(np.float32)
+        self.b1 = np.zeros(hidden, dtype=np.float32)
+        self.w2 = (rng.standard_normal((hidden, len(self.labels))) * 3 / np.sqrt(hidden)).astype(np.float32)
+        self.b2 = np.full(len(self.labels), -1.5, dtype=np.float32)
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        n, height, width, channels = images.shape
+        pooled = images.reshape(n, height // 4, 4, width // 4, 4, channels).mean(axis=(2, 4))
+        # Centré réduit par image : une image uniforme ne donne pas de dégât
+        x = pooled.reshape(n, -1)
+        x = (x - x.mean(axis=1, keepdims=True)) / (x.std(axis=1, keepdims=True) + 1e-3)
+        hidden = np.maximum(x @ self.w1 + self.b1, 0.0)
+        return 1.0 / (1.0 + np.exp(-(hidden @ self.w2 + self.b2)))
+
+
+def load_model(spec: str = INFERENCE_MODEL) -> DamageModel:
+    """
+    Instancie le modèle désigné par « module:Classe ».
+    """
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+def load_image(path: str, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Image RGB redimensionnée à `size` (hauteur, largeur), en float32 [0, 1].
+    """
+    if Image is None:
+        raise ValueError("Pillow n'est pas installé sur ce serveur")
+    height, width = size
+    with Image.open(path) as image:
+        # JPEG : décodage directement à une échelle réduite
+        image.draft("RGB", (width * 2, height * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB").resize((width, height), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def to_result(model: DamageModel, scores: np.ndarray) -> dict:
+    return {
+        "modele": model.key,
+        "scores": {label: round(float(score), 4) for label, score in zip(model.labels, scores)},
+        "degats": bool(scores.max() >= SEUIL_DEGATS),
+    }
+
+
+# -- file de micro-batching ----------------------------------------------------
+
+class InferenceQueue:
+    """
+    Regroupe les demandes d'inférence (clé, chemin) en lots exécutés dans
+    un pool de threads. `store`, s'il est donné, reçoit les résultats de
+    chaque lot [(clé, résultat)] dans le thread du worker.
+    """
+
+    def __init__(
+        self,
+        model: DamageModel,
+        max_batch: int = INFERENCE_MAX_BATCH,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        workers: int = INFERENCE_WORKERS,
+        store=None
+    ):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = set()
+        self.batches = 0
+        self.images = 0
+
+    def _start(self):
+        # La file et ses primitives appartiennent à la boucle qui les utilise
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._spawn(self._batcher())
+
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def submit(self, key: str, path: str) -> dict:
+        """
+        Résultat de l'inférence du fichier `path` ; une seule inférence pour
+        des demandes simultanées de même clé.
+        """
+        self._start()
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._loop.create_future()
+            self._inflight[key] = future
+            self._queue.put_nowait((key, path, future))
+        return await asyncio.shield(future)
+
+    async def _batcher(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Attend un worker libre : pendant ce temps la file se remplit
+            await self._slots.acquire()
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._execute(batch))
+
+    async def _execute(self, batch):
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor, self.run_batch, [(key, path) for key, path, _ in batch]
+            )
+        except Exception as exc:
+            logger.exception("Échec d'un lot d'inférence")
+            results = [exc] * len(batch)
+        finally:
+            self._slots.release()
+        for (key, _, future), result in zip(batch, results):
+            self._inflight.pop(key, None)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def run_batch(self, items: List[Tuple[str, str]]) -> list:
+        """
+        Inférence d'un lot (dans un thread du pool). Une image illisible
+        n'empêche pas l'analyse des autres : son résultat est l'exception.
+        """
+        results: list = [None] * len(items)
+        images, positions = [], []
+        for i, (_, path) in enumerate(items):
+            try:
+                images.append(load_image(path, self.model.input_size))
+                positions.append(i)
+            except (OSError, ValueError) as exc:
+                results[i] = ValueError(f"Image illisible : {exc}")
+        if images:
+            scores = self.model.predict(np.stack(images))
+            for i, row in zip(positions, scores):
+                results[i] = to_result(self.model, row)
+            self.batches += 1
+            self.images += len(images)
+            if self.store is not None:
+                try:
+                    self.store([(items[i][0], results[i]) for i in positions])
+                except Exception:
+                    # Les résultats restent valables : seul le cache manque
+                    logger.exception("Résultats d'inférence non enregistrés")
+        return results
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# -- résultats et tâches -------------------------------------------------------
+
+def store_results(results: List[Tuple[str, dict]]):
+    """
+    Enregistre les résultats d'un lot (un INSERT pour tout le lot) ; un
+    résultat déjà présent pour le même fichier et le même modèle est gardé.
+    """
+    from .database import SessionLocal
+
+    rows = [
+        {"sha256": sha256, "modele": result["modele"], "scores": json.dumps(result["scores"]),
+         "degats": result["degats"], "date_creation": datetime.datetime.utcnow()}
+        for sha256, result in results
+    ]
+    table = models.AnalysePhoto.__table__
+    with SessionLocal() as db:
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table).on_conflict_do_nothing()
+        else:
+            stmt = insert(table)
+        db.execute(stmt, rows)
+        db.commit()
+
+
+async def cached_result(db, sha256: str, model: DamageModel) -> Optional[dict]:
+    row = (await db.execute(
+        select(models.AnalysePhoto.scores, models.AnalysePhoto.degats)
+        .where(models.AnalysePhoto.sha256 == sha256, models.AnalysePhoto.modele == model.key)
+    )).first()
+    if row is None:
+        return None
+    return {"modele": model.key, "scores": json.loads(row.scores), "degats": row.degats}
+
+
+class Job:
+    __slots__ = ("id", "photo_id", "statut", "date_creation", "resultat", "erreur")
+
+    def __init__(self, photo_id: int):
+        self.id = uuid.uuid4().hex
+        self.photo_id = photo_id
+        self.statut = "en_attente"
+        self.date_creation = datetime.datetime.utcnow()
+        self.resultat = None
+        self.erreur = None
+
+    def finish(self, resultat: Optional[dict] = None, erreur: Optional[str] = None):
+        self.statut = "erreur" if erreur is not None else "termine"
+        self.resultat = resultat
+        self.erreur = erreur
+
+
+class InferenceService:
+    """
+    File d'inférence du processus, créée à la première analyse (le modèle
+    n'est chargé qu'à ce moment), et tâches d'analyse en mémoire.
+    """
+
+    def __init__(self):
+        self._queue: Optional[InferenceQueue] = None
+        self._tasks = set()
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    @property
+    def queue(self) -> InferenceQueue:
+        if self._queue is None:
+            self._queue = InferenceQueue(load_model(), store=store_results)
+        return self._queue
+
+    @property
+    def model(self) -> DamageModel:
+        return self.queue.model
+
+    async def analyse(self, db, photo_id: int, sha256: str, path: str) -> Job:
+        """
+        Nouvelle tâche d'analyse d'une photo : terminée aussitôt si le
+        fichier a déjà été analysé, sinon mise en file.
+        """
+        job = Job(photo_id)
+        self._remember(job)
+        resultat = await cached_result(db, sha256, self.model)
+        if resultat is not None:
+            job.finish(resultat)
+            return job
+        task = asyncio.get_running_loop().create_task(self._run(job, sha256, path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, sha256: str, path: str):
+        try:
+            job.finish(await self.queue.submit(sha256, path))
+        except Exception as exc:
+            job.finish(erreur=str(exc))
+        publish("photo.analysee", id=job.photo_id, job=job.id, statut=job.statut,
+                degats=job.resultat["degats"] if job.resultat else None)
+
+    def _remember(self, job: Job):
+        self.jobs[job.id] = job
+        while len(self.jobs) > INFERENCE_JOBS_RETENTION:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.statut == "en_attente":
+                break
+            self.jobs.popitem(last=False)
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._queue is not None:
+            self._queue.shutdown()
+            self._queue = None
+
+
+INFERENCE = InferenceService()
+
+
+def shutdown():
+    INFERENCE.shutdown()
@@ -0,0 +1,73 @@
+# backend/intervals.py
+
+from bisect import bisect_left, bisect_right
+from typing import Hashable, Iterable, List, Tuple
+
+
+class IntervalTree:
+    """
+    Arbre d'intervalles centré, statique, sur des intervalles semi-ouverts
+    [début, fin). Construction O(n log n), requête O(log n + k).
+    Les bornes peuvent être de n'importe quel type ordonné (datetime, int...).
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "starts", "ends", "left", "right")
+
+    def __init__(self, intervals: Iterable[Tuple[object, object, Hashable]]):
+        intervals = list(intervals)
+        self.left = self.right = None
+        if not intervals:
+            self.center = None
+            self.by_start = self.by_end = self.starts = self.ends = []
+            return
+        # Centre = début médian : l'intervalle qui le porte reste dans ce
+        # nœud, chaque sous-arbre est donc strictement plus petit.
+        starts = sorted(start for start, _, _ in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= self.center:
+                left.append(interval)
+            elif start > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        # Intervalles contenant le centre, triés par début et par fin
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1])
+        self.starts = [i[0] for i in self.by_start]
+        self.ends = [i[1] for i in self.by_end]
+        if left:
+            self.left = IntervalTree(left)
+        if right:
+            self.right = IntervalTree(right)
+
+    def overlapping(self, start, end) -> List[Hashable]:
+        """
+        Identifiants des intervalles qui chevauchent [start, end).
+        """
+        found = []
+        self._collect(start, end, found)
+        return found
+
+    def _collect(self, start, end, found):
+        if self.center is None:
+            return
+        if end <= self.center:
+            # Seuls les intervalles du nœud qui commencent avant `end`
+            found.extend(i[2] for i in self.by_start[:bisect_left(self.starts, end)])
+            if self.left:
+                self.left._collect(start, end, found)
+        elif start > self.center:
+            # Seuls les intervalles du nœud qui finissent après `start`
+            found.extend(i[2] for i in self.by_end[bisect_right(self.ends, start):])
+            if self.right:
+                self.right._collect(start, end, found)
+        else:
+            # [start, end) contient le centre : tout le nœud chevauche
+            found.extend(i[2] for i in self.by_start)
+            if self.left:
+                self.left._collect(start, end, found)
+            if self.right:
+                self.right._collect(start, end, found)
@@ -0,0 +1,77 @@
+# backend/loading.py
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+
+from . import models
+
+# Stratégies de chargement par endpoint : chaque relation lue pendant la
+# sérialisation est chargée d'avance, en une requête pour tout le lot.
+# - selectinload pour les collections (une requête IN (...) pour N factures)
+# - joinedload pour les relations many-to-one (jointure dans la requête principale)
+FACTURE_READ = (
+    selectinload(models.Facture.lignes),
+)
+FACTURE_PDF = (
+    joinedload(models.Facture.client),
+    selectinload(models.Facture.lignes),
+)
+
+# Nombre maximum de requêtes SQL autorisées par endpoint, indépendamment du
+# nombre de lignes renvoyées. Vérifié avec query_budget().
+QUERY_BUDGETS = {
+    "get_facture": 2,
+    "search_factures": 2,
+    "facture_pdf": 2,
+    # Écritures CRUD de repository.py : une requête (RETURNING), clés
+    # étrangères vérifiées dans la même requête
+    "create_piece": 1,
+    "update_piece": 1,
+    # Détachement des lignes de facture, puis DELETE ... RETURNING
+    "delete_piece": 2,
+}
+
+
+class QueryCounter:
+    """
+    Compte les requêtes SQL exécutées sur un engine.
+    """
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Compte les requêtes exécutées sur `engine` à l'intérieur du bloc.
+    Pour les routeurs asynchrones, passer async_engine.sync_engine.
+    """
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def query_budget(engine, endpoint: str):
+    """
+    Échoue (AssertionError) si le bloc exécute plus de requêtes que le budget
+    de `endpoint` : protège les tests contre le retour des N+1.
+    """
+    budget = QUERY_BUDGETS[endpoint]
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        raise AssertionError(
+            f"{endpoint} : {counter.count} requêtes pour un budget de {budget}\n"
+            + "\n".join(counter.statements)
+        )
@@ -1,8 +1,21 @@
 # backend/main.py
 from fastapi import FastAPI
-from .database import engine, Base
+from .compression import CompressionMiddleware
+from .database import async_engine, engine, sync_schema
+from .metrics import MetricsMiddleware, instrument
+from . import inference, pdf, photos
+from .dedup import ensure_keys
+from .rollups import ensure_rollups
+from .search import init_search
+from .serialization import FastJSONResponse
 from .routers import (
+    analyses,
+    cache,
     clients,
+    events,
+    metrics,
+    stock,
+    photos as photos_router,
     fournisseurs, 
     remises_fournisseurs,
     assureurs, 
@@ -12,12 +25,24 @@ from .routers import (
     maindoeuvre, 
     planning,
     factures, 
-    comptabilite, 
-    factures
+    comptabilite
 )
 
-app = FastAPI(title="IA Gestion API")
-Base.metadata.create_all(bind=engine)
+app = FastAPI(title="IA Gestion API", default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware)
+# Ajouté en dernier : englobe la compression dans les temps mesurés
+app.add_middleware(MetricsMiddleware)
+app.add_event_handler("shutdown", pdf.shutdown)
+app.add_event_handler("shutdown", photos.shutdown)
+app.add_event_handler("shutdown", inference.shutdown)
+app.add_event_handler("shutdown", async_engine.dispose)
+instrument(engine)
+instrument(async_engine.sync_engine)
+sync_schema(engine)
+init_search(engine)
+ensure_rollups(engine)
+ensure_keys(engine)
+pdf.init_templates()
 
 app.include_router(clients.router,              prefix="/api/clients",       tags=["clients"])
 app.include_router(fournisseurs.router,         prefix="/api/fournisseurs",  tags=["fournisseurs"])
@@ -30,128 +55,9 @@ app.include_router(maindoeuvre.router,          prefix="/api/maindoeuvre",   tag
 app.include_router(planning.router,             prefix="/api/planning",      tags=["planning"])
 app.include_router(factures.router,             prefix="/api/factures",      tags=["factures"])
 app.include_router(comptabilite.router,         prefix="/api/comptabilite",  tags=["comptabilite"])
-
-class Config: orm_mode = True
-
-class FournisseurBase(BaseModel):
-    nom: str
-    contact_person: Optional[str]
-    telephone: Optional[str]
-    email: Optional[str]
-    adresse: Optional[str]
-    delai_livraison_moyen: Optional[int]
-
-class FournisseurCreate(FournisseurBase): pass
-class FournisseurRead(FournisseurBase):
-    id: int
-    class Config: orm_mode = True
-
-class RemiseFournisseurBase(BaseModel):
-    piece_category: str
-    remise_pourcentage: float
-
-class RemiseFournisseurCreate(RemiseFournisseurBase): pass
-class RemiseFournisseurRead(RemiseFournisseurBase):
-    id: int
-    fournisseur_id: int
-    class Config: orm_mode = True
-
-class AssureurBase(BaseModel):
-    nom: str
-    contact_person: Optional[str]
-    telephone: Optional[str]
-    email: Optional[str]
-    adresse: Optional[str]
-    delai_paiement_moyen: Optional[int]
-
-class AssureurCreate(AssureurBase): pass
-class AssureurRead(AssureurBase):
-    id: int
-    class Config: orm_mode = True
-
-class ExpertBase(BaseModel):
-    nom: str
-    contact_person: Optional[str]
-    telephone: Optional[str]
-    email: Optional[str]
-    adresse: Optional[str]
-    delai_reponse_moyen: Optional[int]
-
-class ExpertCreate(ExpertBase): pass
-class ExpertRead(ExpertBase):
-    id: int
-    class Config: orm_mode = True
-
-class TechnicienBase(BaseModel):
-    nom: str
-    prenom: str
-    adresse: str
-    code_postal: str
-    ville: str
-    date_naissance: datetime.datetime
-    email: str
-    telephone: str
-    numero_technicien: str
-
-class TechnicienCreate(TechnicienBase): pass
-class TechnicienRead(TechnicienBase):
-    id: int
-    class Config: orm_mode = True
-
-class PieceBase(BaseModel):
-    designation: str
-    ref: Optional[str]
-    prix_achat: Optional[float]
-    prix_vente: float
-    category: Optional[str]
-    fournisseur_id: int
-
-class PieceCreate(PieceBase): pass
-class PieceRead(PieceBase):
-    id: int
-    class Config: orm_mode = True
-
-class MainDoeuvreBase(BaseModel):
-    description: str
-    taux_horaire: float
-
-class MainDoeuvreCreate(MainDoeuvreBase): pass
-class MainDoeuvreRead(MainDoeuvreBase):
-    id: int
-    class Config: orm_mode = True
-
-class PlanningEventBase(BaseModel):
-    client_id: int
-    start_datetime: datetime.datetime
-    work_description: str
-    technician_name: str
-    car_registration: str
-
-class PlanningEventCreate(PlanningEventBase): pass
-class PlanningEventRead(PlanningEventBase):
-    id: int
-    class Config: orm_mode = True
-
-class FactureLigneBase(BaseModel):
-    description: str
-    quantite: float
-    prix_unitaire_ht: float
-    piece_id: Optional[int]
-
-class FactureLigneCreate(FactureLigneBase): pass
-class FactureLigneRead(FactureLigneBase):
-    id: int
-    class Config: orm_mode = True
-
-class FactureBase(BaseModel):
-    numero_facture: str
-    client_id: int
-    informations_complementaires: Optional[str]
-    lignes: List[FactureLigneCreate]
-
-class FactureCreate(FactureBase): pass
-class FactureRead(FactureBase):
-    id: int
-    date_creation: datetime.datetime
-    lignes: List[FactureLigneRead]
-    class Config: orm_mode = True
\ No newline at end of file
+app.include_router(cache.router,                prefix="/api/cache",         tags=["cache"])
+app.include_router(events.router,               prefix="/api/events",        tags=["events"])
+app.include_router(metrics.router,              prefix="/metrics",           tags=["metrics"])
+app.include_router(stock.router,                prefix="/api/stock",         tags=["stock"])
+app.include_router(photos_router.router,        prefix="/api/photos",        tags=["photos"])
+app.include_router(analyses.router,             prefix="/api/analyses",      tags=["analyses"])
@@ -0,0 +1,410 @@
+# backend/metrics.py
+"""
+Mesures de performance par requête HTTP : latence, requêtes SQL (nombre,
+durée, lignes lues) et journal des requêtes SQL lentes.
+
+- MetricsMiddleware ouvre pour chaque requête HTTP un RequestStats, porté
+  par une ContextVar : les événements SQLAlchemy (instrument()) y
+  ajoutent chaque requête SQL exécutée, y compris depuis le pool de
+  threads (routeurs synchrones) et depuis aiosqlite.
+- À la fin de la requête, les compteurs sont agrégés par route (gabarit du
+  chemin et nom de l'endpoint, ex. /api/factures/search, search_factures)
+  et exposés au format Prometheus par GET /metrics.
+- L'en-tête Server-Timing de chaque réponse donne le temps passé en base
+  et le temps total (onglet Réseau des outils de développement).
+- Une requête SQL de plus de SLOW_QUERY_MS ms est journalisée (logger
+  backend.slow_queries) avec son plan (EXPLAIN QUERY PLAN sous SQLite,
+  EXPLAIN sous Postgres) et gardée dans GET /metrics/slow-queries ;
+  « scan » signale un parcours complet de table. Les valeurs des
+  paramètres (noms, téléphones, e-mails...) ne sont ni journalisées ni
+  exposées : seuls leurs types le sont.
+
+Les compteurs sont propres à chaque processus, comme le cache et le bus
+d'événements.
+"""
+
+import datetime
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .database import Base
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", "200"))
+
+# Bornes des histogrammes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Starlette complète avec "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+# Requêtes hors routage (404 sur un chemin inconnu) : regroupées pour
+# borner le nombre de séries
+UNMATCHED = "non_route"
+
+logger = logging.getLogger("backend.slow_queries")
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_time", "rows")
+
+    def __init__(self, scope):
+        # Complété par le routage (route de la requête)
+        self.scope = scope
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _RouteMetrics:
+    __slots__ = ("latency", "statements", "db_time", "rows", "status", "slow", "scans")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = 0.0
+        self.rows = 0
+        self.status: Dict[int, int] = {}
+        self.slow = 0
+        self.scans = 0
+
+
+class MetricsRegistry:
+    def __init__(self, slow_log_size: int = SLOW_QUERY_LOG_SIZE):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str, str], _RouteMetrics] = {}
+        self._slow_log = deque(maxlen=slow_log_size)
+        # Plans déjà calculés, par texte de requête
+        self._plans: Dict[str, List[str]] = {}
+
+    def _route(self, key) -> _RouteMetrics:
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = _RouteMetrics()
+        return metrics
+
+    def observe_request(self, key, status: int, duration: float, stats: RequestStats):
+        with self._lock:
+            metrics = self._route(key)
+            metrics.latency.observe(duration)
+            metrics.statements.observe(stats.statements)
+            metrics.db_time += stats.db_time
+            metrics.rows += stats.rows
+            metrics.status[status] = metrics.status.get(status, 0) + 1
+
+    def observe_slow(self, key, entry: dict):
+        with self._lock:
+            if key is not None:
+                metrics = self._route(key)
+                metrics.slow += 1
+                metrics.scans += entry["scan"]
+            self._slow_log.append(entry)
+
+    def plan(self, statement: str) -> Optional[List[str]]:
+        with self._lock:
+            return self._plans.get(statement)
+
+    def remember_plan(self, statement: str, plan: List[str]):
+        with self._lock:
+            if len(self._plans) >= 1000:
+                self._plans.clear()
+            self._plans[statement] = plan
+
+    def slow_queries(self) -> List[dict]:
+        with self._lock:
+            return list(reversed(self._slow_log))
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._slow_log.clear()
+            self._plans.clear()
+
+    def render(self) -> str:
+        """
+        Compteurs au format texte d'exposition Prometheus.
+        """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+
+            def family(name, kind, help):
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            family("http_requests_total", "counter", "Requêtes HTTP traitées, par statut")
+            for key, metrics in routes:
+                for status, count in sorted(metrics.status.items()):
+                    lines.append(f"http_requests_total{{{_labels(key, status=status)}}} {count}")
+
+            family("http_request_duration_seconds", "histogram", "Durée des requêtes HTTP")
+            for key, metrics in routes:
+                _histogram(lines, "http_request_duration_seconds", key, metrics.latency)
+
+            family("http_request_sql_statements", "histogram", "Requêtes SQL exécutées par requête HTTP")
+            for key, metrics in routes:
+                _histogram(lines, "http_request_sql_statements", key, metrics.statements)
+
+            family("db_statement_duration_seconds_total", "counter", "Temps passé en base")
+            for key, metrics in routes:
+                lines.append(f"db_statement_duration_seconds_total{{{_labels(key)}}} {metrics.db_time:.6f}")
+
+            family("db_rows_fetched_total", "counter", "Lignes lues depuis la base")
+            for key, metrics in routes:
+                lines.append(f"db_rows_fetched_total{{{_labels(key)}}} {metrics.rows}")
+
+            family("db_slow_statements_total", "counter", f"Requêtes SQL de plus de {SLOW_QUERY_MS:g} ms")
+            for key, metrics in routes:
+                lines.append(f"db_slow_statements_total{{{_labels(key)}}} {metrics.slow}")
+
+            family("db_slow_statements_scan_total", "counter", "Requêtes SQL lentes avec parcours complet de table")
+            for key, metrics in routes:
+                lines.append(f"db_slow_statements_scan_total{{{_labels(key)}}} {metrics.scans}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key, **extra) -> str:
+    method, route, handler = key
+    labels = {"method": method, "route": route, "handler": handler, **extra}
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _histogram(lines, name, key, histogram: Histogram):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{{{_labels(key, le=f'{bound:g}')}}} {cumulative}")
+    lines.append(f"{name}_bucket{{{_labels(key, le='+Inf')}}} {histogram.count}")
+    lines.append(f"{name}_sum{{{_labels(key)}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{_labels(key)}}} {histogram.count}")
+
+
+METRICS = MetricsRegistry()
+
+
+# -- événements SQLAlchemy -----------------------------------------------------
+
+class _CountingCursor:
+    """
+    Curseur DBAPI qui compte les lignes lues par SQLAlchemy.
+    """
+
+    __slots__ = ("_cursor", "_stats")
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("metrics_start", time.perf_counter())
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+        if context is not None and cursor.description is not None:
+            # Le résultat SQLAlchemy est construit ensuite sur context.cursor
+            context.cursor = _CountingCursor(cursor, stats)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _slow_query(conn, statement, None if executemany else parameters, elapsed, stats)
+
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """
+    Plan d'exécution de `statement`, lu sur la connexion DBAPI de `conn`
+    (sans repasser par les événements). Sous Postgres, seules les lectures
+    sont expliquées : une erreur y annulerait la transaction en cours.
+    """
+    dialect = conn.dialect.name
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if parameters is None or verb not in EXPLAINABLE:
+        return []
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql" and verb in ("SELECT", "WITH"):
+        prefix = "EXPLAIN "
+    else:
+        return []
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    except Exception as exc:
+        return [f"EXPLAIN impossible : {exc}"]
+    finally:
+        cursor.close()
+    # SQLite : (id, parent, notused, detail) ; Postgres : (ligne du plan,)
+    return [str(row[-1]) for row in rows]
+
+
+def is_scan(plan: List[str]) -> bool:
+    """
+    Vrai si le plan parcourt une table entière. Sous SQLite, les SCAN de
+    sous-requêtes matérialisées et de tables virtuelles (FTS5) ne comptent
+    pas : seules les tables du schéma sont retenues.
+    """
+    for line in plan:
+        if "Seq Scan on " in line:
+            return True
+        words = line.split()
+        if len(words) > 1 and words[0] == "SCAN" and words[1] in Base.metadata.tables \
+                and "VIRTUAL TABLE" not in line:
+            return True
+    return False
+
+
+def mask_parameters(parameters):
+    """
+    Types des paramètres liés, sans leurs valeurs (données personnelles).
+    """
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+
+def _slow_query(conn, statement: str, parameters, elapsed: float, stats: Optional[RequestStats]):
+    plan = METRICS.plan(statement)
+    if plan is None:
+        plan = explain(conn, statement, parameters)
+        METRICS.remember_plan(statement, plan)
+    key = route_key(stats.scope) if stats is not None else None
+    entry = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "route": key[1] if key else None,
+        "handler": key[2] if key else None,
+        "duree_ms": round(elapsed * 1000, 2),
+        "requete": statement,
+        "parametres": mask_parameters(parameters),
+        "plan": plan,
+        "scan": is_scan(plan),
+    }
+    METRICS.observe_slow(key, entry)
+    logger.warning(
+        "requête SQL lente (%.1f ms, %s)%s\n%s\n%s",
+        entry["duree_ms"], entry["handler"] or "hors requête HTTP",
+        " : parcours complet" if entry["scan"] else "",
+        statement, "\n".join(plan)
+    )
+
+
+def instrument(engine):
+    """
+    Branche les mesures sur un engine (pour un engine asynchrone, passer
+    async_engine.sync_engine).
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -- middleware -----------------------------------------------------------------
+
+def route_key(scope) -> Tuple[str, str, str]:
+    route = scope.get("route")
+    if route is None:
+        return scope["method"], UNMATCHED, UNMATCHED
+    return scope["method"], getattr(route, "path", UNMATCHED), getattr(route, "name", None) or UNMATCHED
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    db = stats.db_time * 1000
+    return (
+        f'db;dur={db:.1f};desc="{stats.statements} req. SQL, {stats.rows} lignes", '
+        f"app;dur={total * 1000 - db:.1f}, total;dur={total * 1000:.1f}"
+    )
+
+
+class MetricsMiddleware:
+    """
+    Mesure chaque requête HTTP (middleware ASGI pur : les réponses en flux
+    ne sont pas mises en mémoire) et ajoute l'en-tête Server-Timing.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = METRICS):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(scope)
+        stats_token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(stats_token)
+            self.registry.observe_request(route_key(scope), status_code, time.perf_counter() - start, stats)
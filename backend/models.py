@@ -1,10 +1,14 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Time, Boolean, ForeignKey, Index, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
 class Client(Base):
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Blocage de la déduplication : nom phonétique dans un code postal
+        Index('ix_clients_nom_cle_code_postal', 'nom_cle', 'code_postal'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String, index=True)
     prenom = Column(String, nullable=True)
@@ -14,5 +18,233 @@ class Client(Base):
     code_postal = Column(String, nullable=True)
     ville = Column(String, nullable=True)
     pays = Column(String, nullable=True)
+    # Clés de rapprochement des doublons (dedup.py)
+    telephone_cle = Column(String, nullable=True, index=True)
+    email_cle = Column(String, nullable=True, index=True)
+    nom_cle = Column(String, nullable=True)
     factures = relationship('Facture', back_populates='client')
-    planning_events = relationship('PlanningEvent', back_populates='client')
\ No newline at end of file
+    planning_events = relationship('PlanningEvent', back_populates='client')
+
+class Fournisseur(Base):
+    __tablename__ = 'fournisseurs'
+    id = Column(Integer, primary_key=True, index=True)
+    nom = Column(String, index=True)
+    contact_person = Column(String, nullable=True)
+    telephone = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    adresse = Column(String, nullable=True)
+    delai_livraison_moyen = Column(Integer, nullable=True)
+    pieces = relationship('Piece', back_populates='fournisseur')
+    remises = relationship('RemiseFournisseur', back_populates='fournisseur')
+
+class RemiseFournisseur(Base):
+    __tablename__ = 'remises_fournisseur'
+    id = Column(Integer, primary_key=True, index=True)
+    fournisseur_id = Column(Integer, ForeignKey('fournisseurs.id'))
+    piece_category = Column(String, nullable=False)
+    remise_pourcentage = Column(Float, nullable=False)
+    fournisseur = relationship('Fournisseur', back_populates='remises')
+
+class Assureur(Base):
+    __tablename__ = 'assureurs'
+    id = Column(Integer, primary_key=True, index=True)
+    nom = Column(String, index=True)
+    contact_person = Column(String, nullable=True)
+    telephone = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    adresse = Column(String, nullable=True)
+    delai_paiement_moyen = Column(Integer, nullable=True)
+
+class Expert(Base):
+    __tablename__ = 'experts'
+    id = Column(Integer, primary_key=True, index=True)
+    nom = Column(String, index=True)
+    contact_person = Column(String, nullable=True)
+    telephone = Column(String, nullable=True)
+    email = Column(String, nullable=True)
+    adresse = Column(String, nullable=True)
+    delai_reponse_moyen = Column(Integer, nullable=True)
+
+class Technicien(Base):
+    __tablename__ = 'techniciens'
+    id = Column(Integer, primary_key=True, index=True)
+    nom = Column(String, index=True)
+    prenom = Column(String)
+    adresse = Column(String)
+    code_postal = Column(String)
+    ville = Column(String)
+    date_naissance = Column(DateTime)
+    email = Column(String)
+    telephone = Column(String)
+    numero_technicien = Column(String, unique=True, index=True)
+    # Compétences séparées par des virgules (ex. "carrosserie, diagnostic")
+    competences = Column(String, nullable=True)
+    heure_debut = Column(Time, nullable=False, default=datetime.time(8, 0), server_default='08:00:00')
+    heure_fin = Column(Time, nullable=False, default=datetime.time(18, 0), server_default='18:00:00')
+
+class Piece(Base):
+    __tablename__ = 'pieces'
+    id = Column(Integer, primary_key=True, index=True)
+    designation = Column(String, index=True)
+    ref = Column(String, nullable=True, index=True)
+    prix_achat = Column(Float, nullable=True)
+    prix_vente = Column(Float, nullable=False)
+    category = Column(String, nullable=True)
+    fournisseur_id = Column(Integer, ForeignKey('fournisseurs.id'))
+    # Quantité en stock, tenue à jour avec le journal des mouvements
+    # (stock.py) dans la même transaction ; seuil d'alerte facultatif
+    stock_disponible = Column(Float, nullable=False, default=0.0, server_default='0')
+    stock_minimum = Column(Float, nullable=True)
+    fournisseur = relationship('Fournisseur', back_populates='pieces')
+
+# Pièces en alerte (stock_disponible - stock_minimum <= 0), les plus en
+# manque d'abord : parcours de l'index, sans lire le catalogue. Sans seuil,
+# l'expression est NULL et la pièce n'y figure pas.
+STOCK_ECART = Piece.stock_disponible - Piece.stock_minimum
+Index('ix_pieces_stock_ecart', STOCK_ECART)
+
+class MainDoeuvre(Base):
+    __tablename__ = 'maindoeuvre'
+    id = Column(Integer, primary_key=True, index=True)
+    description = Column(String, index=True)
+    taux_horaire = Column(Float, nullable=False)
+
+class PlanningEvent(Base):
+    __tablename__ = 'planning'
+    __table_args__ = (
+        # Vues semaine/jour : plage sur start_datetime, technicien en second critère
+        Index('ix_planning_start_technicien', 'start_datetime', 'technician_name'),
+        # Détection de conflits : événements d'un technicien autour d'une date
+        Index('ix_planning_technicien_start', 'technician_name', 'start_datetime'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey('clients.id'), index=True)
+    start_datetime = Column(DateTime, default=datetime.datetime.utcnow)
+    duree_minutes = Column(Integer, nullable=False, default=60, server_default='60')
+    work_description = Column(Text)
+    technician_name = Column(String)
+    competence_requise = Column(String, nullable=True)
+    car_registration = Column(String)
+    client = relationship('Client', back_populates='planning_events')
+
+class Facture(Base):
+    __tablename__ = 'factures'
+    __table_args__ = (
+        Index('ux_factures_annee_sequence', 'annee', 'sequence', unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    numero_facture = Column(String, unique=True, index=True)
+    # Numérotation automatique (backend/numerotation.py) ; NULL pour un
+    # numéro saisi manuellement
+    annee = Column(Integer, nullable=True)
+    sequence = Column(Integer, nullable=True)
+    client_id = Column(Integer, ForeignKey('clients.id'), index=True)
+    date_creation = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    informations_complementaires = Column(Text, nullable=True)
+    client = relationship('Client', back_populates='factures')
+    lignes = relationship('FactureLigne', back_populates='facture', cascade='all, delete')
+
+# Dernier numéro de facture attribué, par année
+class SequenceFacture(Base):
+    __tablename__ = 'sequences_facture'
+    annee = Column(Integer, primary_key=True)
+    dernier = Column(Integer, nullable=False, default=0)
+
+class FactureLigne(Base):
+    __tablename__ = 'facture_lignes'
+    id = Column(Integer, primary_key=True, index=True)
+    facture_id = Column(Integer, ForeignKey('factures.id'), index=True)
+    description = Column(Text)
+    quantite = Column(Float)
+    prix_unitaire_ht = Column(Float)
+    piece_id = Column(Integer, ForeignKey('pieces.id'), nullable=True)
+    # Catégorie et fournisseur de la pièce au moment de la vente, figés sur
+    # la ligne : compartiment comptable de la ligne (rollups.py) même si la
+    # pièce est recatégorisée ensuite. NULL sans pièce ; '' et 0 pour
+    # « aucun », comme dans compta_rollup.
+    categorie = Column(String, nullable=True)
+    fournisseur_id = Column(Integer, nullable=True)
+    facture = relationship('Facture', back_populates='lignes')
+
+# Agrégat comptable maintenu à chaque création/suppression de facture :
+# un compartiment par jour x catégorie x fournisseur (voir backend/rollups.py).
+# categorie '' et fournisseur_id 0 signifient « aucun » ; avec_piece est
+# faux pour les lignes sans pièce (main-d'œuvre, divers).
+class ComptaRollup(Base):
+    __tablename__ = 'compta_rollup'
+    __table_args__ = (
+        UniqueConstraint('jour', 'avec_piece', 'categorie', 'fournisseur_id', name='uq_compta_rollup_bucket'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    jour = Column(Date, nullable=False)
+    avec_piece = Column(Boolean, nullable=False)
+    categorie = Column(String, nullable=False, default='')
+    fournisseur_id = Column(Integer, nullable=False, default=0)
+    total_ht = Column(Float, nullable=False, default=0.0)
+    nb_lignes = Column(Integer, nullable=False, default=0)
+
+# Objectif de chiffre d'affaires HT sur une période (bornes incluses),
+# global ou limité à une catégorie de pièce et/ou un fournisseur.
+# `realise` est tenu à jour avec les agrégats comptables (rollups.py) :
+# lire la progression ne re-somme jamais les lignes de facture.
+class ObjectifCA(Base):
+    __tablename__ = 'objectifs_ca'
+    __table_args__ = (
+        # Objectifs couvrant un jour donné : date_fin >= jour écarte les
+        # objectifs passés, qui sont la majorité
+        Index('ix_objectifs_ca_periode', 'date_fin', 'date_debut'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    libelle = Column(String, nullable=True)
+    date_debut = Column(Date, nullable=False)
+    date_fin = Column(Date, nullable=False)
+    montant = Column(Float, nullable=False)
+    categorie = Column(String, nullable=True)
+    fournisseur_id = Column(Integer, ForeignKey('fournisseurs.id'), nullable=True)
+    realise = Column(Float, nullable=False, default=0.0, server_default='0')
+
+# Journal des mouvements de stock, en ajout seul : jamais modifié ni
+# supprimé. `quantite` est signée (entrée > 0, sortie < 0, ajustement des
+# deux signes) ; la somme par pièce est son stock_disponible.
+class MouvementStock(Base):
+    __tablename__ = 'mouvements_stock'
+    __table_args__ = (
+        Index('ix_mouvements_stock_piece', 'piece_id', 'id'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    piece_id = Column(Integer, ForeignKey('pieces.id', ondelete='CASCADE'), nullable=False)
+    type = Column(String, nullable=False)
+    quantite = Column(Float, nullable=False)
+    date = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    facture_ligne_id = Column(Integer, ForeignKey('facture_lignes.id', ondelete='SET NULL'), nullable=True, index=True)
+    commentaire = Column(String, nullable=True)
+
+class Photo(Base):
+    __tablename__ = 'photos'
+    id = Column(Integer, primary_key=True, index=True)
+    # Empreinte du contenu : nom du fichier dans le stockage (plusieurs
+    # photos peuvent partager un même fichier)
+    sha256 = Column(String(64), nullable=False, index=True)
+    media_type = Column(String, nullable=False)
+    taille = Column(Integer, nullable=False)
+    largeur = Column(Integer, nullable=True)
+    hauteur = Column(Integer, nullable=True)
+    nom_fichier = Column(String, nullable=True)
+    date_creation = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    client_id = Column(Integer, ForeignKey('clients.id', ondelete='CASCADE'), nullable=True, index=True)
+    facture_id = Column(Integer, ForeignKey('factures.id', ondelete='CASCADE'), nullable=True, index=True)
+    planning_event_id = Column(Integer, ForeignKey('planning.id', ondelete='CASCADE'), nullable=True, index=True)
+
+class AnalysePhoto(Base):
+    __tablename__ = 'analyses_photo'
+    __table_args__ = (
+        UniqueConstraint('sha256', 'modele', name='uq_analyses_photo_sha256_modele'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    # Résultat attaché au contenu, pas à la photo : un même fichier n'est
+    # analysé qu'une fois par version de modèle
+    sha256 = Column(String(64), nullable=False)
+    modele = Column(String, nullable=False)
+    scores = Column(Text, nullable=False)
+    degats = Column(Boolean, nullable=False)
+    date_creation = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
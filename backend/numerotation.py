@@ -0,0 +1,163 @@
+# backend/numerotation.py
+"""
+Numérotation des factures : une séquence par année, sans trou ni doublon
+(FA-2026-000001, FA-2026-000002...).
+
+Le compteur de l'année (sequences_facture) est incrémenté par une seule
+requête atomique (upsert ... RETURNING) dans la transaction qui crée la
+facture : si la création échoue, l'incrément est annulé avec elle et le
+numéro n'est jamais perdu. Deux créations simultanées se succèdent sur le
+verrou du compteur (ligne sous Postgres, base sous SQLite), le temps d'une
+transaction courte ; il n'y a plus de conflit d'unicité à rejouer.
+Un import en masse réserve tout un bloc de numéros en une requête.
+
+Les transactions qui touchent à la séquence (création, import,
+suppression de factures) prennent SEQUENCE_LOCK avant leur première
+écriture et le gardent jusqu'au commit : dans un processus, elles passent
+l'une après l'autre dans l'ordre d'arrivée. Sans lui, sous SQLite, elles
+se disputent le verrou de la base par le busy handler, qui n'est pas
+équitable : sous charge, une attente dépassait busy_timeout (« database
+is locked ») alors que d'autres passaient aussitôt. Le verrou est propre
+au processus : avec plusieurs workers uvicorn, l'ordre d'arrivée n'est
+garanti qu'à l'intérieur d'un worker. Entre workers, les numéros restent
+uniques et sans trou (verrou du compteur en base), mais l'attente revient
+au busy handler, sans équité.
+
+Une facture numérotée ne peut être supprimée que si elle porte le dernier
+numéro de son année (le compteur recule d'un cran) : sinon il faut émettre
+un avoir. Les numéros saisis manuellement (reprise d'historique) restent
+acceptés hors séquence, mais pas au format de la numérotation automatique.
+
+audit() vérifie les séquences avec une fonction de fenêtre (LAG) : trous,
+doublons, et écart avec le compteur.
+"""
+
+import asyncio
+import os
+import re
+from typing import Dict, List
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+FACTURE_PREFIX = os.environ.get("FACTURE_PREFIX", "FA")
+
+# File d'attente équitable (FIFO) des transactions de numérotation, par processus
+SEQUENCE_LOCK = asyncio.Lock()
+
+_AUTO = re.compile(rf"^{re.escape(FACTURE_PREFIX)}-\d{{4}}-\d+$")
+
+
+def format_numero(annee: int, sequence: int) -> str:
+    return f"{FACTURE_PREFIX}-{annee}-{sequence:06d}"
+
+
+def is_reserved(numero: str) -> bool:
+    """
+    Vrai si `numero` a le format de la numérotation automatique (il ne
+    peut pas être saisi manuellement).
+    """
+    return bool(_AUTO.match(numero))
+
+
+def allocate(db: Session, annee: int, count: int = 1) -> int:
+    """
+    Réserve `count` numéros consécutifs de l'année dans la transaction en
+    cours et renvoie le premier.
+    """
+    table = models.SequenceFacture.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(annee=annee, dernier=count)
+        last = db.execute(
+            upsert.on_conflict_do_update(
+                index_elements=["annee"],
+                set_={"dernier": table.c.dernier + count}
+            ).returning(table.c.dernier)
+        ).scalar_one()
+    else:
+        result = db.execute(
+            update(table).where(table.c.annee == annee).values(dernier=table.c.dernier + count)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(annee=annee, dernier=count))
+        last = db.scalar(select(table.c.dernier).where(table.c.annee == annee))
+    return last - count + 1
+
+
+def release(db: Session, annee: int, sequence: int) -> bool:
+    """
+    Rend le numéro `sequence` s'il est le dernier attribué de l'année
+    (suppression de la dernière facture). Faux sinon : le supprimer
+    laisserait un trou.
+    """
+    table = models.SequenceFacture.__table__
+    result = db.execute(
+        update(table)
+        .where(table.c.annee == annee, table.c.dernier == sequence)
+        .values(dernier=table.c.dernier - 1)
+    )
+    return result.rowcount == 1
+
+
+def audit(db: Session) -> List[dict]:
+    """
+    État de chaque séquence annuelle : factures, premier et dernier numéro,
+    trous (intervalles manquants) et doublons.
+    """
+    facture = models.Facture
+    numbered = facture.sequence.isnot(None)
+    ordered = (
+        select(
+            facture.annee,
+            facture.sequence,
+            func.lag(facture.sequence).over(
+                partition_by=facture.annee, order_by=facture.sequence
+            ).label("precedent")
+        )
+        .where(numbered)
+        .subquery()
+    )
+    # Seules les ruptures de la suite 1, 2, 3... remontent de la base
+    anomalies = db.execute(
+        select(ordered.c.annee, ordered.c.sequence, ordered.c.precedent)
+        .where(or_(
+            and_(ordered.c.precedent.is_(None), ordered.c.sequence != 1),
+            ordered.c.sequence - ordered.c.precedent != 1
+        ))
+        .order_by(ordered.c.annee, ordered.c.sequence)
+    ).all()
+
+    years: Dict[int, dict] = {}
+
+    def year(annee):
+        return years.setdefault(annee, {
+            "annee": annee, "compteur": 0, "factures": 0, "premier": None, "dernier": None,
+            "trous": [], "doublons": [],
+        })
+
+    for annee, count, first, last in db.execute(
+        select(facture.annee, func.count(), func.min(facture.sequence), func.max(facture.sequence))
+        .where(numbered)
+        .group_by(facture.annee)
+    ):
+        year(annee).update(factures=count, premier=first, dernier=last)
+    for annee, dernier in db.execute(select(models.SequenceFacture.annee, models.SequenceFacture.dernier)):
+        year(annee)["compteur"] = dernier
+
+    for annee, sequence, precedent in anomalies:
+        entry = year(annee)
+        if precedent == sequence:
+            entry["doublons"].append(sequence)
+        elif sequence > (precedent or 0) + 1:
+            entry["trous"].append({"debut": (precedent or 0) + 1, "fin": sequence - 1})
+    for entry in years.values():
+        # Numéros attribués après la dernière facture présente
+        if entry["compteur"] > (entry["dernier"] or 0):
+            entry["trous"].append({"debut": (entry["dernier"] or 0) + 1, "fin": entry["compteur"]})
+        entry["conforme"] = not entry["trous"] and not entry["doublons"] \
+            and entry["compteur"] == (entry["dernier"] or 0)
+    return [years[annee] for annee in sorted(years)]
@@ -0,0 +1,130 @@
+# backend/pagination.py
+
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from .serialization import dumps, row_serializer, rows_response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+class PageParams:
+    """
+    Paramètres communs de pagination par curseur (keyset sur l'ID).
+    """
+    def __init__(
+        self,
+        after: Optional[int] = Query(None, ge=0, description="Curseur : ID de la dernière ligne déjà reçue"),
+        limit: Optional[int] = Query(
+            None, ge=1, le=MAX_PAGE_SIZE,
+            description=f"Nombre maximum de lignes par page (json : {DEFAULT_PAGE_SIZE} par défaut)"
+        ),
+        format: str = Query("json", regex="^(json|ndjson)$", description="json (page) ou ndjson (flux complet)")
+    ):
+        self.after = after
+        self.limit = limit
+        self.format = format
+
+    @property
+    def size(self) -> int:
+        """
+        Taille de la page en mode json : `limit`, ou DEFAULT_PAGE_SIZE.
+        """
+        return DEFAULT_PAGE_SIZE if self.limit is None else self.limit
+
+
+def paginate(query, id_column, schema, page: PageParams, response: Response):
+    """
+    Applique la pagination keyset à une requête SQLAlchemy.
+
+    En mode json, renvoie une page de `limit` lignes, sérialisée sans
+    validation pydantic (serialization.py), et place le curseur suivant
+    dans l'en-tête X-Next-Cursor (absent sur la dernière page). Sans
+    `limit`, la page fait DEFAULT_PAGE_SIZE lignes : index.html suit le
+    curseur pour lire une liste complète (fetchToutesPages).
+    En mode ndjson, renvoie un flux d'une ligne JSON par enregistrement
+    (toutes les lignes après `after` si `limit` est absent),
+    lu par lots depuis un curseur serveur : la mémoire reste constante
+    quelle que soit la taille de la table.
+    """
+    if page.format == "ndjson":
+        query = _keyset(query, id_column, page)
+        if page.limit is not None:
+            query = query.limit(page.limit)
+        return StreamingResponse(
+            _stream_ndjson(query, schema),
+            media_type="application/x-ndjson"
+        )
+    return _page_response(page_rows(query, id_column, page, response), schema, response)
+
+
+def page_rows(query, id_column, page: PageParams, response: Response):
+    """
+    Lignes ORM de la page demandée (mode json), curseur suivant posé sur
+    `response`.
+    """
+    query = _keyset(query, id_column, page)
+    rows = query.limit(page.size + 1).all()
+    return _cut(rows, page.size, response)
+
+
+def _keyset(query, id_column, page: PageParams):
+    if page.after is not None:
+        query = query.filter(id_column > page.after)
+    return query.order_by(id_column)
+
+
+def _cut(rows, limit: int, response: Response):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR] = str(rows[-1].id)
+    return rows
+
+
+def _page_response(rows, schema, response: Response):
+    # Une Response renvoyée telle quelle ne reprend pas les en-têtes posés
+    # sur la réponse injectée : le curseur est recopié
+    headers = {NEXT_CURSOR: response.headers[NEXT_CURSOR]} if NEXT_CURSOR in response.headers else None
+    return rows_response(rows, schema, headers=headers)
+
+
+def _stream_ndjson(query, schema):
+    serialize = row_serializer(schema)
+    rows = (
+        query
+        .execution_options(stream_results=True)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+    for row in rows:
+        yield dumps(serialize(row)) + b"\n"
+
+
+async def paginate_async(db, stmt, id_column, schema, page: PageParams, response: Response):
+    """
+    Équivalent de paginate() pour une requête select() sur une AsyncSession.
+    """
+    if page.after is not None:
+        stmt = stmt.where(id_column > page.after)
+    stmt = stmt.order_by(id_column)
+
+    if page.format == "ndjson":
+        if page.limit is not None:
+            stmt = stmt.limit(page.limit)
+        return StreamingResponse(
+            _stream_ndjson_async(db, stmt, schema),
+            media_type="application/x-ndjson"
+        )
+
+    rows = (await db.scalars(stmt.limit(page.size + 1))).all()
+    return _page_response(_cut(rows, page.size, response), schema, response)
+
+
+async def _stream_ndjson_async(db, stmt, schema):
+    serialize = row_serializer(schema)
+    rows = await db.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for row in rows:
+        yield dumps(serialize(row)) + b"\n"
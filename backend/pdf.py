@@ -0,0 +1,356 @@
+# backend/pdf.py
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from reportlab.pdfgen import canvas
+
+try:
+    import jinja2
+    from markupsafe import Markup, escape
+except ImportError:
+    jinja2 = None
+
+try:
+    import weasyprint
+    from weasyprint.text.fonts import FontConfiguration
+    from weasyprint.urls import default_url_fetcher
+except (ImportError, OSError):
+    # OSError : bibliothèques système (Pango) absentes
+    weasyprint = None
+
+logger = logging.getLogger(__name__)
+
+# Répertoire du cache PDF : un fichier par empreinte de contenu.
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", "./pdf_cache")
+# Limites du cache appliquées par `python -m backend.pdf gc` : les PDF non
+# servis depuis PDF_CACHE_MAX_AGE_DAYS jours sont supprimés, puis les plus
+# anciens jusqu'à repasser sous PDF_CACHE_MAX_BYTES.
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PDF_CACHE_MAX_AGE_DAYS = float(os.environ.get("PDF_CACHE_MAX_AGE_DAYS", "30"))
+# Incrémenter quand le rendu change, pour invalider tout le cache.
+RENDER_VERSION = 1
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+FACTURE_TEMPLATE = "facture_template.html"
+TAUX_TVA = 0.20
+# Champs du client repris sur le PDF
+CLIENT_FIELDS = ("nom", "prenom", "adresse", "code_postal", "ville")
+
+_executor = None
+_template = None
+_font_config = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé pour le rendu (créé à la première utilisation).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            initializer=_init_worker
+        )
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def facture_snapshot(facture) -> dict:
+    """
+    Copie en données simples (sérialisables vers un processus de rendu)
+    de tout ce qui apparaît sur le PDF d'une facture. Une facture dont le
+    client a été supprimé est rendue avec un bloc client vide.
+    """
+    client = facture.client
+    return {
+        "numero_facture": facture.numero_facture,
+        "date_creation": facture.date_creation.isoformat(),
+        "informations_complementaires": facture.informations_complementaires,
+        "client": {
+            field: getattr(client, field) if client is not None else None
+            for field in CLIENT_FIELDS
+        },
+        "lignes": [
+            {
+                "description": l.description,
+                "quantite": l.quantite,
+                "prix_unitaire_ht": l.prix_unitaire_ht,
+            }
+            for l in facture.lignes
+        ],
+    }
+
+
+def content_hash(snapshot: dict, engine: str = "canvas") -> str:
+    """
+    Empreinte SHA-256 du contenu rendu : une facture modifiée change d'empreinte.
+    """
+    payload = json.dumps(
+        {"engine": engine, "version": RENDER_VERSION, "facture": snapshot},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_path(digest: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, digest[:2], f"{digest}.pdf")
+
+
+def render_canvas(snapshot: dict) -> bytes:
+    """
+    Dessine la facture avec reportlab. Exécuté dans un processus du pool.
+    """
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    c.setFont("Helvetica", 12)
+    y = 800
+    client = snapshot["client"]
+    date_creation = datetime.fromisoformat(snapshot["date_creation"])
+    c.drawString(50, y, f"Facture : {snapshot['numero_facture']}")
+    y -= 30
+    c.drawString(50, y, f"Client : {client['nom'] or ''} {client['prenom'] or ''}")
+    y -= 30
+    c.drawString(50, y, f"Date : {date_creation.strftime('%Y-%m-%d %H:%M:%S')}")
+    y -= 40
+
+    # Lignes de facture
+    total = 0.0
+    for ligne in snapshot["lignes"]:
+        line_text = f"{ligne['description']} x{ligne['quantite']} @ {ligne['prix_unitaire_ht']:.2f}€"
+        c.drawString(50, y, line_text)
+        total += ligne["quantite"] * ligne["prix_unitaire_ht"]
+        y -= 20
+        if y < 50:
+            c.showPage()
+            c.setFont("Helvetica", 12)
+            y = 800
+
+    # Total
+    y -= 20
+    c.drawString(50, y, f"Total HT : {total:.2f}€")
+
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def get_template():
+    """
+    Gabarit facture_template.html compilé une seule fois par processus.
+    """
+    global _template
+    if _template is None:
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+            autoescape=jinja2.select_autoescape(["html"]),
+            auto_reload=False
+        )
+        env.filters["nl2br"] = nl2br
+        _template = env.get_template(FACTURE_TEMPLATE)
+    return _template
+
+
+def nl2br(value) -> "Markup":
+    """
+    Échappe le texte saisi puis remplace les retours à la ligne par <br>.
+    """
+    return Markup(escape(value).replace("\n", Markup("<br>")))
+
+
+def _url_fetcher(url: str, *args, **kwargs):
+    # WeasyPrint ne charge que les fichiers du répertoire des gabarits : pas
+    # de fichier local arbitraire ni d'URL distante venant du contenu saisi.
+    prefix = "file://" + TEMPLATES_DIR.rstrip(os.sep) + os.sep
+    if not url.startswith(prefix) or ".." in url[len(prefix):].split("/"):
+        raise ValueError(f"Ressource externe refusée : {url}")
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def _font_configuration():
+    global _font_config
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def init_templates():
+    """
+    Compile le gabarit HTML au démarrage (processus principal).
+    """
+    if jinja2 is None:
+        logger.warning("jinja2 non installé : moteur de rendu HTML désactivé")
+        return
+    get_template()
+
+
+def _init_worker():
+    # Chaque processus du pool compile le gabarit et charge les polices
+    # une fois pour toutes, et non à chaque facture.
+    if jinja2 is not None:
+        get_template()
+    if weasyprint is not None:
+        _font_configuration()
+
+
+def render_html(snapshot: dict) -> str:
+    """
+    Rend la facture en HTML avec le gabarit compilé.
+    """
+    total_ht = sum(l["quantite"] * l["prix_unitaire_ht"] for l in snapshot["lignes"])
+    facture = dict(
+        snapshot,
+        date_creation=datetime.fromisoformat(snapshot["date_creation"]),
+        total_ht=total_ht,
+        total_ttc=total_ht * (1 + TAUX_TVA)
+    )
+    return get_template().render(facture=facture)
+
+
+def render_template_pdf(snapshot: dict) -> bytes:
+    """
+    Rend la facture en HTML puis la convertit en PDF avec WeasyPrint.
+    Exécuté dans un processus du pool.
+    """
+    document = weasyprint.HTML(
+        string=render_html(snapshot), base_url=TEMPLATES_DIR, url_fetcher=_url_fetcher
+    )
+    font_config = _font_configuration()
+    return document.write_pdf(font_config=font_config)
+
+
+RENDERERS = {
+    "canvas": render_canvas,
+    "template": render_template_pdf,
+}
+
+
+def engine_available(engine: str) -> bool:
+    """
+    Vrai si le moteur est utilisable : "canvas", "template" (PDF via
+    WeasyPrint) ou "html" (gabarit seul).
+    """
+    if engine == "html":
+        return jinja2 is not None
+    if engine == "template":
+        return jinja2 is not None and weasyprint is not None
+    return engine in RENDERERS
+
+
+def _store(digest: str, data: bytes) -> str:
+    path = cache_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def ensure_pdf(snapshot: dict, engine: str = "canvas") -> Tuple[str, str]:
+    """
+    Renvoie (chemin, empreinte) du PDF de la facture, rendu dans le pool de
+    processus s'il n'est pas déjà en cache.
+    """
+    digest = content_hash(snapshot, engine)
+    path = cache_path(digest)
+    try:
+        # Date de dernière utilisation, lue par collect_garbage()
+        os.utime(path)
+    except FileNotFoundError:
+        data = get_executor().submit(RENDERERS[engine], snapshot).result()
+        _store(digest, data)
+    return path, digest
+
+
+def prerender(snapshots: Iterable[dict], engine: str = "canvas") -> Tuple[int, int]:
+    """
+    Rend en parallèle toutes les factures absentes du cache.
+    Renvoie (nombre rendu, nombre déjà en cache).
+    """
+    pending: List = []
+    cached = 0
+    seen = set()
+    for snapshot in snapshots:
+        digest = content_hash(snapshot, engine)
+        if digest in seen or os.path.exists(cache_path(digest)):
+            cached += 1
+            continue
+        seen.add(digest)
+        pending.append((digest, get_executor().submit(RENDERERS[engine], snapshot)))
+    for digest, future in pending:
+        _store(digest, future.result())
+    return len(pending), cached
+
+
+# -- nettoyage -----------------------------------------------------------------
+
+def collect_garbage(
+    root: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    max_age_days: Optional[float] = None
+) -> int:
+    """
+    Supprime les PDF non servis depuis `max_age_days` jours, puis les moins
+    récemment servis tant que le cache dépasse `max_bytes`. Un PDF supprimé
+    est simplement rendu à nouveau à la demande suivante.
+    Renvoie le nombre de fichiers supprimés.
+    """
+    root = root or PDF_CACHE_DIR
+    max_bytes = PDF_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age_days = PDF_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    expired = time.time() - max_age_days * 86400
+
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            # Fichier temporaire récent : écriture en cours (_store)
+            if name.endswith(".tmp") and stat.st_mtime >= expired:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= expired and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] != ["gc"]:
+        print("usage : python -m backend.pdf gc")
+        return 2
+    print(f"{collect_garbage()} PDF supprimé(s) du cache")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
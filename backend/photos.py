@@ -0,0 +1,445 @@
+# backend/photos.py
+"""
+Stockage des photos (dossiers clients, factures, interventions).
+
+- Réception en flux : le corps multipart est analysé au fil des morceaux
+  reçus (python-multipart) et chaque fichier écrit sur disque par blocs
+  de WRITE_BUFFER octets ; la mémoire ne dépend pas de la taille des
+  fichiers. L'empreinte SHA-256 est calculée pendant l'écriture.
+- Stockage adressé par contenu : objets/ab/abcdef... ; une photo déjà
+  présente n'est pas réécrite, seule une nouvelle ligne Photo la référence.
+- Variantes (miniature, web) en JPEG, calculées dans un pool de processus
+  juste après l'envoi, ou à la première demande si elles manquent.
+- Fichiers servis avec Range (reprise, lecture partielle) et un ETag fort :
+  le contenu d'une photo ne change jamais (Cache-Control immutable).
+
+Supprimer une photo ne supprime que sa ligne : un même fichier peut être
+référencé par plusieurs photos. Les fichiers orphelins sont retirés hors
+ligne :
+    python -m backend.photos gc
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import uuid
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from .cache import etag_matches
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    try:
+        from multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:
+        MultipartParser = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PHOTOS_DIR = os.environ.get("PHOTOS_DIR", "./photos")
+PHOTO_MAX_BYTES = int(os.environ.get("PHOTO_MAX_BYTES", str(30 * 1024 * 1024)))
+PHOTO_WORKERS = int(os.environ.get("PHOTO_WORKERS", str(os.cpu_count() or 1)))
+# Données accumulées avant une écriture disque (dans le pool de threads)
+WRITE_BUFFER = 1024 * 1024
+READ_CHUNK = 256 * 1024
+
+# Côté le plus long de chaque variante, de la plus grande à la plus petite
+VARIANTES = {"web": 1600, "miniature": 320}
+VARIANT_QUALITY = 82
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_executor = None
+# Variantes en cours de calcul, par empreinte
+_pending: Dict[str, asyncio.Future] = {}
+
+
+class PhotoError(HTTPException):
+    """
+    Envoi refusé (taille, format, corps invalide) : renvoyé tel quel au client.
+    """
+
+
+def object_path(sha256: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or PHOTOS_DIR, "objets", sha256[:2], sha256)
+
+
+def variant_path(sha256: str, variante: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or PHOTOS_DIR, "variantes", sha256[:2], f"{sha256}-{variante}.jpg")
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Pool de processus des variantes (créé à la première utilisation).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PHOTO_WORKERS)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# -- réception -----------------------------------------------------------------
+
+class StoredPhoto:
+    __slots__ = ("sha256", "taille", "media_type", "largeur", "hauteur", "nom_fichier", "nouveau")
+
+    def __init__(self, sha256, taille, media_type, largeur, hauteur, nom_fichier, nouveau):
+        self.sha256 = sha256
+        self.taille = taille
+        self.media_type = media_type
+        self.largeur = largeur
+        self.hauteur = hauteur
+        self.nom_fichier = nom_fichier
+        # Faux si le contenu était déjà stocké
+        self.nouveau = nouveau
+
+
+class _Sink:
+    """
+    Fichier temporaire d'une partie du corps multipart.
+    """
+
+    def __init__(self, filename: Optional[str], max_bytes: int):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        tmp_dir = os.path.join(PHOTOS_DIR, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        self.path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        self.file = open(self.path, "wb")
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise PhotoError(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"Photo trop volumineuse (maximum {self.max_bytes // (1024 * 1024)} Mo)"
+            )
+        self.hash.update(data)
+        self.buffer.append(data)
+        self.buffered += len(data)
+
+    async def flush(self):
+        if self.buffer:
+            data = b"".join(self.buffer)
+            self.buffer.clear()
+            self.buffered = 0
+            await run_in_threadpool(self.file.write, data)
+
+    async def finish(self) -> StoredPhoto:
+        await self.flush()
+        self.file.close()
+        return await run_in_threadpool(_publish, self.path, self.hash.hexdigest(), self.size, self.filename)
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def probe(path: str) -> Tuple[str, int, int]:
+    """
+    (type MIME, largeur, hauteur) d'une image ; seul l'en-tête est lu.
+    """
+    if Image is None:
+        raise PhotoError(status.HTTP_501_NOT_IMPLEMENTED, "Pillow n'est pas installé sur ce serveur")
+    try:
+        with Image.open(path) as image:
+            media_type = Image.MIME.get(image.format)
+            width, height = image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        media_type = None
+    if media_type is None:
+        raise PhotoError(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "Le fichier n'est pas une image reconnue")
+    return media_type, width, height
+
+
+def _publish(tmp_path: str, sha256: str, size: int, filename: Optional[str]) -> StoredPhoto:
+    try:
+        media_type, width, height = probe(tmp_path)
+    except PhotoError:
+        os.remove(tmp_path)
+        raise
+    path = object_path(sha256)
+    nouveau = not os.path.exists(path)
+    if nouveau:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return StoredPhoto(sha256, size, media_type, width, height, filename, nouveau)
+
+
+async def receive_multipart(
+    chunks: AsyncIterator[bytes],
+    content_type: Optional[str],
+    max_bytes: int = PHOTO_MAX_BYTES
+) -> List[StoredPhoto]:
+    """
+    Lit un corps multipart/form-data morceau par morceau et stocke chaque
+    partie fichier. Les champs simples sont ignorés.
+    """
+    if MultipartParser is None:
+        raise PhotoError(status.HTTP_501_NOT_IMPLEMENTED, "python-multipart n'est pas installé sur ce serveur")
+    media_type, options = parse_options_header(content_type or "")
+    boundary = options.get(b"boundary")
+    if media_type != b"multipart/form-data" or not boundary:
+        raise PhotoError(status.HTTP_400_BAD_REQUEST, "Corps multipart/form-data attendu")
+
+    state = {"field": b"", "value": b"", "headers": {}, "sink": None}
+    finished: List[_Sink] = []
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"], state["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        filename = disposition.get(b"filename")
+        if filename is not None:
+            state["sink"] = _Sink(os.path.basename(filename.decode("utf-8", "replace")) or None, max_bytes)
+
+    def on_part_data(data, start, end):
+        if state["sink"] is not None:
+            state["sink"].write(data[start:end])
+
+    def on_part_end():
+        if state["sink"] is not None:
+            finished.append(state["sink"])
+            state["sink"] = None
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    stored: List[StoredPhoto] = []
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            parser.write(chunk)
+            # Écritures disque hors de l'analyse (qui est synchrone)
+            sink = state["sink"]
+            if sink is not None and sink.buffered >= WRITE_BUFFER:
+                await sink.flush()
+            while finished:
+                stored.append(await finished.pop(0).finish())
+        parser.finalize()
+        if state["sink"] is not None:
+            raise PhotoError(status.HTTP_400_BAD_REQUEST, "Corps multipart incomplet")
+    except Exception:
+        for sink in finished + ([state["sink"]] if state["sink"] is not None else []):
+            sink.abort()
+        raise
+    if not stored:
+        raise PhotoError(status.HTTP_400_BAD_REQUEST, "Aucun fichier dans la requête")
+    return stored
+
+
+# -- variantes -----------------------------------------------------------------
+
+def render_variants(source: str, targets: Dict[str, str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Calcule les variantes JPEG de `source` ({variante: chemin}), de la plus
+    grande à la plus petite, chacune réduite depuis la précédente.
+    Exécutée dans le pool de processus. Renvoie {variante: (largeur, hauteur)}.
+    """
+    sizes = {}
+    with Image.open(source) as image:
+        # JPEG : décodage directement à l'échelle réduite (DCT)
+        largest = max(VARIANTES[name] for name in targets)
+        image.draft("RGB", (largest, largest))
+        current = ImageOps.exif_transpose(image)
+        if current.mode != "RGB":
+            current = current.convert("RGB")
+        for name in sorted(targets, key=VARIANTES.get, reverse=True):
+            current = current.copy()
+            current.thumbnail((VARIANTES[name], VARIANTES[name]), Image.LANCZOS)
+            path = targets[name]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            current.save(tmp, "JPEG", quality=VARIANT_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp, path)
+            sizes[name] = current.size
+    return sizes
+
+
+def _missing_variants(sha256: str) -> Dict[str, str]:
+    return {
+        name: variant_path(sha256, name)
+        for name in VARIANTES
+        if not os.path.exists(variant_path(sha256, name))
+    }
+
+
+async def ensure_variants(sha256: str):
+    """
+    Calcule dans le pool de processus les variantes manquantes d'une photo ;
+    une seule fois pour des demandes simultanées.
+    """
+    future = _pending.get(sha256)
+    if future is None:
+        targets = _missing_variants(sha256)
+        if not targets:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(get_executor(), render_variants, object_path(sha256), targets)
+        _pending[sha256] = future
+        future.add_done_callback(lambda _: _pending.pop(sha256, None))
+    await asyncio.shield(future)
+
+
+# -- envoi des fichiers --------------------------------------------------------
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Intervalle (début, fin inclus) d'un en-tête Range à un seul intervalle,
+    ou None pour renvoyer le fichier entier (absent, plusieurs intervalles,
+    unité inconnue). PhotoError 416 si l'intervalle est hors du fichier.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if start:
+            first = int(start)
+            last = int(end) if end else size - 1
+        else:
+            # Suffixe : les N derniers octets
+            first, last = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+    if first >= size or first > last:
+        raise PhotoError(status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, f"bytes */{size}")
+    return first, min(last, size - 1)
+
+
+def _read_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(READ_CHUNK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def file_response(request: Request, path: str, media_type: str, etag: str, filename: Optional[str] = None) -> Response:
+    """
+    Réponse fichier avec ETag, cache long, 304 et requêtes Range (206).
+    """
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(filename)}"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    size = os.path.getsize(path)
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip('"') == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except PhotoError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_read_file(path, 0, size), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_file(path, start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+# -- nettoyage -----------------------------------------------------------------
+
+def collect_garbage(db, root: Optional[str] = None) -> int:
+    """
+    Supprime les fichiers (et variantes) qu'aucune photo ne référence.
+    Renvoie le nombre de fichiers supprimés.
+    """
+    from sqlalchemy import select
+
+    from . import models
+
+    root = root or PHOTOS_DIR
+    referenced = set(db.scalars(select(models.Photo.sha256).distinct()))
+    removed = 0
+    for kind in ("objets", "variantes"):
+        base = os.path.join(root, kind)
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                if name[:64] not in referenced:
+                    os.remove(os.path.join(dirpath, name))
+                    removed += 1
+    return removed
+
+
+def main(argv=None):
+    from .database import SessionLocal, engine, sync_schema
+
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] != ["gc"]:
+        print("usage : python -m backend.photos gc")
+        return 2
+    sync_schema(engine)
+    db = SessionLocal()
+    try:
+        print(f"{collect_garbage(db)} fichier(s) orphelin(s) supprimé(s)")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# backend/pricing.py
+"""
+Prix d'achat nets et marges du catalogue de pièces, remises fournisseur
+appliquées.
+
+Les remises (RemiseFournisseur) sont compilées en une table
+(fournisseur_id, catégorie) -> pourcentage, puis appliquées en une passe
+NumPy à tout le catalogue :
+
+    prix_achat_net = prix_achat * (1 - remise / 100)
+    marge          = prix_vente - prix_achat_net
+    taux_marge     = marge / prix_vente
+
+La catégorie est comparée sans tenir compte de la casse ni des espaces.
+Si plusieurs remises visent le même couple, la plus récente (ID le plus
+grand) l'emporte.
+
+La table, le catalogue et le résultat sont gardés en mémoire et
+reconstruits quand la génération de RemiseFournisseur ou de Piece change
+dans le cache de référence (Repository.commit() l'incrémente à chaque
+écriture). Ces générations sont propres au processus : une écriture reçue
+par un autre worker n'est vue qu'à l'expiration de PRICING_TTL, au-delà
+de laquelle table et catalogue sont rechargés quoi qu'il arrive.
+"""
+
+import os
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from . import models
+from .cache import REFERENCE_CACHE
+
+# Durée de vie (s) de la table de remises et du catalogue en mémoire
+PRICING_TTL = float(os.environ.get("PRICING_TTL", "60"))
+
+
+def normalize_category(category: Optional[str]) -> Optional[str]:
+    if category is None:
+        return None
+    category = category.strip().lower()
+    return category or None
+
+
+class Catalogue:
+    """
+    Colonnes du catalogue sous forme de tableaux, triées par ID.
+    """
+
+    def __init__(self, rows: Iterable[Tuple]):
+        # rows : (id, designation, ref, category, fournisseur_id, prix_achat, prix_vente)
+        rows = sorted(rows, key=lambda row: row[0])
+        self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        self.designations = [r[1] for r in rows]
+        self.refs = [r[2] for r in rows]
+        self.categories = [r[3] for r in rows]
+        self.fournisseur_ids = np.fromiter(
+            (-1 if r[4] is None else r[4] for r in rows), dtype=np.int64, count=len(rows)
+        )
+        self.prix_achat = np.fromiter(
+            (np.nan if r[5] is None else r[5] for r in rows), dtype=np.float64, count=len(rows)
+        )
+        self.prix_vente = np.fromiter((r[6] for r in rows), dtype=np.float64, count=len(rows))
+
+        # Catégories normalisées encodées en entiers (-1 : sans catégorie)
+        self.vocabulary = {}
+        codes = []
+        for category in self.categories:
+            category = normalize_category(category)
+            if category is None:
+                codes.append(-1)
+            else:
+                codes.append(self.vocabulary.setdefault(category, len(self.vocabulary)))
+        self.category_codes = np.array(codes, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class DiscountTable:
+    """
+    Remises par (fournisseur_id, catégorie normalisée).
+    """
+
+    def __init__(self, rows: Iterable[Tuple]):
+        # rows : (id, fournisseur_id, piece_category, remise_pourcentage)
+        self.remises = {}
+        for _, fournisseur_id, category, pourcentage in sorted(rows, key=lambda row: row[0]):
+            category = normalize_category(category)
+            if fournisseur_id is not None and category is not None:
+                self.remises[(fournisseur_id, category)] = pourcentage
+
+    def __len__(self):
+        return len(self.remises)
+
+    def lookup(self, catalogue: Catalogue) -> np.ndarray:
+        """
+        Pourcentage de remise de chaque pièce du catalogue (0 si aucune).
+
+        Chaque couple est ramené à une clé entière fournisseur * n + code
+        catégorie ; la recherche est un searchsorted sur les clés triées.
+        """
+        width = len(catalogue.vocabulary) + 1
+        keys, values = [], []
+        for (fournisseur_id, category), pourcentage in self.remises.items():
+            code = catalogue.vocabulary.get(category)
+            if code is not None:
+                keys.append(fournisseur_id * width + code)
+                values.append(pourcentage)
+        remise = np.zeros(len(catalogue), dtype=np.float64)
+        if not keys:
+            return remise
+
+        order = np.argsort(keys)
+        keys = np.asarray(keys, dtype=np.int64)[order]
+        values = np.asarray(values, dtype=np.float64)[order]
+        piece_keys = catalogue.fournisseur_ids * width + catalogue.category_codes
+        valid = (catalogue.fournisseur_ids >= 0) & (catalogue.category_codes >= 0)
+        position = np.minimum(np.searchsorted(keys, piece_keys), len(keys) - 1)
+        hit = valid & (keys[position] == piece_keys)
+        remise[hit] = values[position[hit]]
+        return remise
+
+
+class Pricing:
+    """
+    Résultat de l'application d'une table de remises à un catalogue.
+    """
+
+    def __init__(self, catalogue: Catalogue, table: DiscountTable):
+        self.catalogue = catalogue
+        self.remise = table.lookup(catalogue)
+        self.prix_achat_net = np.round(catalogue.prix_achat * (1.0 - self.remise / 100.0), 2)
+        self.marge = np.round(catalogue.prix_vente - self.prix_achat_net, 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.taux_marge = np.round(self.marge / catalogue.prix_vente, 4)
+        self.taux_marge[~np.isfinite(self.taux_marge)] = np.nan
+
+    def select(
+        self,
+        fournisseur_id: Optional[int] = None,
+        category: Optional[str] = None,
+        remise_only: bool = False,
+        taux_marge_max: Optional[float] = None,
+        after: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Indices (par ID croissant) des pièces qui passent les filtres.
+        """
+        catalogue = self.catalogue
+        mask = np.ones(len(catalogue), dtype=bool)
+        if fournisseur_id is not None:
+            mask &= catalogue.fournisseur_ids == fournisseur_id
+        if category is not None:
+            code = catalogue.vocabulary.get(normalize_category(category), -2)
+            mask &= catalogue.category_codes == code
+        if remise_only:
+            mask &= self.remise > 0
+        if taux_marge_max is not None:
+            # NaN (prix d'achat inconnu) ne passe pas la comparaison
+            mask &= self.taux_marge <= taux_marge_max
+        if after is not None:
+            mask[:np.searchsorted(catalogue.ids, after, side="right")] = False
+        return np.flatnonzero(mask)
+
+    def row(self, i: int) -> dict:
+        catalogue = self.catalogue
+        return {
+            "id": int(catalogue.ids[i]),
+            "designation": catalogue.designations[i],
+            "ref": catalogue.refs[i],
+            "category": catalogue.categories[i],
+            "fournisseur_id": None if catalogue.fournisseur_ids[i] < 0 else int(catalogue.fournisseur_ids[i]),
+            "prix_achat": _number(catalogue.prix_achat[i]),
+            "remise_pourcentage": float(self.remise[i]),
+            "prix_achat_net": _number(self.prix_achat_net[i]),
+            "prix_vente": float(catalogue.prix_vente[i]),
+            "marge": _number(self.marge[i]),
+            "taux_marge": _number(self.taux_marge[i]),
+        }
+
+
+def _number(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+CATALOGUE_COLUMNS = (
+    models.Piece.id, models.Piece.designation, models.Piece.ref, models.Piece.category,
+    models.Piece.fournisseur_id, models.Piece.prix_achat, models.Piece.prix_vente,
+)
+REMISE_COLUMNS = (
+    models.RemiseFournisseur.id, models.RemiseFournisseur.fournisseur_id,
+    models.RemiseFournisseur.piece_category, models.RemiseFournisseur.remise_pourcentage,
+)
+
+
+class PricingEngine:
+    """
+    Garde la table de remises, le catalogue et le résultat entre deux
+    requêtes, chacun avec la génération du modèle dont il dépend et, pour
+    la table et le catalogue, l'instant de leur expiration.
+    """
+
+    def __init__(self, cache=REFERENCE_CACHE, ttl: float = PRICING_TTL):
+        self.cache = cache
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._table = (None, None, 0.0)
+        self._catalogue = (None, None, 0.0)
+        self._pricing = (None, None)
+
+    def generations(self):
+        return (
+            self.cache.generation(models.RemiseFournisseur),
+            self.cache.generation(models.Piece),
+        )
+
+    def current(self) -> Optional[Pricing]:
+        """
+        Résultat à jour, ou None s'il faut recharger quelque chose.
+        """
+        generations = self.generations()
+        now = time.monotonic()
+        with self._lock:
+            pricing_generations, pricing = self._pricing
+            if min(self._table[2], self._catalogue[2]) <= now:
+                return None
+            return pricing if pricing_generations == generations else None
+
+    def needs(self) -> Tuple[bool, bool]:
+        """
+        (table à recharger, catalogue à recharger)
+        """
+        remise_generation, piece_generation = self.generations()
+        now = time.monotonic()
+        with self._lock:
+            return (
+                self._table[0] != remise_generation or self._table[2] <= now,
+                self._catalogue[0] != piece_generation or self._catalogue[2] <= now,
+            )
+
+    def refresh(self, generations, remise_rows=None, catalogue_rows=None) -> Pricing:
+        """
+        Reconstruit ce qui a été rechargé puis réapplique les remises.
+        `generations` est la valeur de generations() lue avant le chargement :
+        si une écriture a eu lieu entre-temps, le prochain appel rechargera.
+        """
+        remise_generation, piece_generation = generations
+        # Expiration comptée depuis le début du chargement
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            table, catalogue = self._table[1], self._catalogue[1]
+        if remise_rows is not None:
+            table = DiscountTable(remise_rows)
+        if catalogue_rows is not None:
+            catalogue = Catalogue(catalogue_rows)
+        pricing = Pricing(catalogue, table)
+        with self._lock:
+            if remise_rows is not None:
+                self._table = (remise_generation, table, expires)
+            if catalogue_rows is not None:
+                self._catalogue = (piece_generation, catalogue, expires)
+            self._pricing = (generations, pricing)
+        return pricing
+
+
+PRICING = PricingEngine()
@@ -0,0 +1,363 @@
+# backend/repository.py
+"""
+Accès CRUD commun à tous les routeurs.
+
+Une instance de Repository (ou AsyncRepository) vit le temps d'une requête,
+autour de la session de la requête : les objets déjà chargés sont servis
+par la carte d'identité de la session, et les clés étrangères déjà
+vérifiées ne le sont pas une seconde fois.
+
+Quand le moteur gère RETURNING (SQLite >= 3.35, Postgres), chaque écriture
+est une seule requête SQL :
+- création : INSERT ... SELECT ... WHERE EXISTS(clés étrangères) RETURNING *
+- mise à jour : UPDATE ... WHERE id = ? AND EXISTS(clés étrangères) RETURNING *
+- suppression : DELETE ... WHERE id = ? RETURNING id
+Les requêtes de diagnostic (quelle ressource manque ?) ne sont exécutées
+que sur le chemin d'erreur.
+
+commit() invalide le cache des données de référence (cache.py) pour les
+modèles écrits pendant la requête.
+"""
+
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, exists, insert, literal, literal_column, select, union_all, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from . import models
+from .cache import REFERENCE_CACHE
+from .database import AsyncSessionLocal, SessionLocal
+
+# Message 404 par modèle, pour les ressources demandées comme pour les
+# clés étrangères absentes.
+NOT_FOUND = {
+    models.Client: "Client non trouvé",
+    models.Fournisseur: "Fournisseur non trouvé",
+    models.RemiseFournisseur: "Remise non trouvée",
+    models.Assureur: "Assureur non trouvé",
+    models.Expert: "Expert non trouvé",
+    models.Technicien: "Technicien non trouvé",
+    models.Piece: "Pièce non trouvée",
+    models.MainDoeuvre: "Main-d'œuvre non trouvée",
+    models.PlanningEvent: "Intervention non trouvée",
+    models.Facture: "Facture non trouvée",
+    models.ObjectifCA: "Objectif non trouvé",
+    models.Photo: "Photo non trouvée",
+}
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_repo():
+    db = SessionLocal()
+    try:
+        yield Repository(db)
+    finally:
+        db.close()
+
+
+async def get_async_repo():
+    async with AsyncSessionLocal() as db:
+        yield AsyncRepository(db)
+
+
+def not_found(model):
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=NOT_FOUND.get(model, "Ressource non trouvée")
+    )
+
+
+def in_use():
+    # Suppression refusée par une clé étrangère (PRAGMA foreign_keys)
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Suppression impossible : la ressource est encore référencée"
+    )
+
+
+# -- construction des requêtes (communes aux deux variantes) -------------------
+
+def _returning(db, kind: str) -> bool:
+    return getattr(db.get_bind().dialect, f"{kind}_returning", False)
+
+
+def _has_collections(model) -> bool:
+    # Une suppression SQL directe contournerait les cascades ORM
+    # (mise à NULL des enfants, suppression des lignes de facture...)
+    return any(r.uselist for r in sa_inspect(model).relationships)
+
+
+def _cascade_targets(model):
+    return {r.mapper.class_ for r in sa_inspect(model).relationships if r.uselist}
+
+
+def _ref_guards(refs):
+    return [exists().where(ref_model.id == ref_id) for ref_model, ref_id in refs.items()]
+
+
+def _insert_stmt(model, data: dict, refs):
+    columns = model.__table__.c
+    row = select(*[literal(value, columns[key].type) for key, value in data.items()])
+    guards = _ref_guards(refs)
+    if guards:
+        row = row.where(*guards)
+    return insert(model).from_select(list(data), row).returning(model)
+
+
+def _update_stmt(model, id, data: dict, refs):
+    return (
+        update(model)
+        .where(model.id == id, *_ref_guards(refs))
+        .values(**data)
+        .returning(model)
+    )
+
+
+def _delete_stmt(model, id):
+    return delete(model).where(model.id == id).returning(model.id)
+
+
+def _refs_stmt(refs):
+    return union_all(*[
+        select(literal_column(f"'{ref_model.__name__}'").label("model"), ref_model.id)
+        .where(ref_model.id == ref_id)
+        for ref_model, ref_id in refs.items()
+    ])
+
+
+class _Base:
+    def __init__(self, db):
+        self.db = db
+        # Clés étrangères vérifiées pendant la requête : (modèle, id)
+        self._known = set()
+        # Modèles écrits, à invalider dans le cache au commit
+        self._dirty = set()
+
+    @property
+    def _identity_map(self):
+        session = self.db.sync_session if isinstance(self.db, AsyncSession) else self.db
+        return session.identity_map
+
+    def _pending_refs(self, refs: Optional[Dict]):
+        """
+        Références à vérifier : ni nulles, ni déjà vues pendant la requête,
+        ni présentes dans la carte d'identité de la session. Le cache des
+        données de référence n'est pas consulté : propre à chaque worker et
+        à durée de vie, il peut encore citer une ligne supprimée ailleurs.
+        """
+        pending = {}
+        for ref_model, ref_id in (refs or {}).items():
+            if ref_id is None or (ref_model, ref_id) in self._known:
+                continue
+            if identity_key(ref_model, ref_id) in self._identity_map:
+                continue
+            pending[ref_model] = ref_id
+        return pending
+
+    def touch(self, *models):
+        """
+        Signale des modèles écrits hors des méthodes CRUD (requêtes directes) :
+        leur cache est invalidé au commit.
+        """
+        self._dirty.update(models)
+
+    def _invalidate(self):
+        if self._dirty:
+            REFERENCE_CACHE.invalidate(*self._dirty)
+            self._dirty.clear()
+
+    def _record_refs(self, refs, found_names):
+        missing = None
+        for ref_model, ref_id in refs.items():
+            if ref_model.__name__ in found_names:
+                self._known.add((ref_model, ref_id))
+            elif missing is None:
+                missing = ref_model
+        if missing is not None:
+            raise not_found(missing)
+
+    def _forget(self, model, id):
+        obj = self._identity_map.get(identity_key(model, id))
+        if obj is not None:
+            session = self.db.sync_session if isinstance(self.db, AsyncSession) else self.db
+            session.expunge(obj)
+
+
+class Repository(_Base):
+    """
+    CRUD générique sur une Session synchrone.
+    """
+
+    db: Session
+
+    def get(self, model, id, options=()):
+        return self.db.get(model, id, options=options)
+
+    def get_or_404(self, model, id, options=()):
+        obj = self.get(model, id, options)
+        if obj is None:
+            raise not_found(model)
+        return obj
+
+    def check_refs(self, refs: Dict):
+        """
+        Vérifie en une seule requête que toutes les clés étrangères `refs`
+        ({modèle: id}) existent ; 404 sur la première absente.
+        """
+        pending = self._pending_refs(refs)
+        if pending:
+            found = {name for name, _ in self.db.execute(_refs_stmt(pending))}
+            self._record_refs(pending, found)
+
+    def create(self, model, data: dict, refs: Optional[Dict] = None):
+        """
+        Insère une ligne et la renvoie, après vérification des clés étrangères.
+        """
+        self._dirty.add(model)
+        pending = self._pending_refs(refs)
+        if not _returning(self.db, "insert"):
+            self.check_refs(pending)
+            obj = model(**data)
+            self.db.add(obj)
+            self.db.flush()
+            return obj
+        obj = self.db.scalar(_insert_stmt(model, data, pending))
+        if obj is None:
+            self.check_refs(pending)
+        self._known.update(pending.items())
+        return obj
+
+    def update(self, model, id, data: dict, refs: Optional[Dict] = None):
+        """
+        Met à jour la ligne `id` et la renvoie ; 404 si elle n'existe pas ou
+        si une clé étrangère est absente.
+        """
+        self._dirty.add(model)
+        pending = self._pending_refs(refs)
+        if not _returning(self.db, "update"):
+            obj = self.get_or_404(model, id)
+            self.check_refs(pending)
+            for key, value in data.items():
+                setattr(obj, key, value)
+            self.db.flush()
+            return obj
+        obj = self.db.scalar(_update_stmt(model, id, data, pending))
+        if obj is None:
+            self.get_or_404(model, id)
+            self.check_refs(pending)
+        self._known.update(pending.items())
+        return obj
+
+    def delete(self, model, id):
+        """
+        Supprime la ligne `id` ; 404 si elle n'existe pas, 409 si une autre
+        ligne la référence encore.
+        """
+        self._dirty.add(model)
+        self._dirty.update(_cascade_targets(model))
+        try:
+            if _has_collections(model) or not _returning(self.db, "delete"):
+                self.db.delete(self.get_or_404(model, id))
+                self.db.flush()
+                return
+            deleted = self.db.scalar(_delete_stmt(model, id))
+        except IntegrityError:
+            raise in_use()
+        if deleted is None:
+            raise not_found(model)
+        self._forget(model, id)
+
+    def commit(self):
+        self.db.commit()
+        self._invalidate()
+
+
+class AsyncRepository(_Base):
+    """
+    Même interface que Repository sur une AsyncSession (méthodes à attendre).
+    """
+
+    db: AsyncSession
+
+    async def get(self, model, id, options=()):
+        return await self.db.get(model, id, options=options)
+
+    async def get_or_404(self, model, id, options=()):
+        obj = await self.get(model, id, options)
+        if obj is None:
+            raise not_found(model)
+        return obj
+
+    async def check_refs(self, refs: Dict):
+        pending = self._pending_refs(refs)
+        if pending:
+            found = {name for name, _ in await self.db.execute(_refs_stmt(pending))}
+            self._record_refs(pending, found)
+
+    async def create(self, model, data: dict, refs: Optional[Dict] = None):
+        self._dirty.add(model)
+        pending = self._pending_refs(refs)
+        if not _returning(self.db, "insert"):
+            await self.check_refs(pending)
+            obj = model(**data)
+            self.db.add(obj)
+            await self.db.flush()
+            return obj
+        obj = await self.db.scalar(_insert_stmt(model, data, pending))
+        if obj is None:
+            await self.check_refs(pending)
+        self._known.update(pending.items())
+        return obj
+
+    async def update(self, model, id, data: dict, refs: Optional[Dict] = None):
+        self._dirty.add(model)
+        pending = self._pending_refs(refs)
+        if not _returning(self.db, "update"):
+            obj = await self.get_or_404(model, id)
+            await self.check_refs(pending)
+            for key, value in data.items():
+                setattr(obj, key, value)
+            await self.db.flush()
+            return obj
+        obj = await self.db.scalar(_update_stmt(model, id, data, pending))
+        if obj is None:
+            await self.get_or_404(model, id)
+            await self.check_refs(pending)
+        self._known.update(pending.items())
+        return obj
+
+    async def delete(self, model, id):
+        self._dirty.add(model)
+        self._dirty.update(_cascade_targets(model))
+        try:
+            if _has_collections(model) or not _returning(self.db, "delete"):
+                await self.db.delete(await self.get_or_404(model, id))
+                await self.db.flush()
+                return
+            deleted = await self.db.scalar(_delete_stmt(model, id))
+        except IntegrityError:
+            raise in_use()
+        if deleted is None:
+            raise not_found(model)
+        self._forget(model, id)
+
+    async def commit(self):
+        await self.db.commit()
+        self._invalidate()
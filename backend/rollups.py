@@ -0,0 +1,323 @@
+# backend/rollups.py
+"""
+Agrégats comptables (table compta_rollup) maintenus de façon incrémentale.
+
+Chaque création ou suppression de facture ajoute ou retire ses lignes du
+compartiment (jour, avec_piece, catégorie, fournisseur) correspondant, dans
+la même transaction. La catégorie et le fournisseur sont ceux de la pièce
+au moment de la vente, figés sur la ligne (facture_lignes.categorie,
+fournisseur_id) : recatégoriser une pièce ne déplace pas ses ventes
+passées, et la suppression d'une ancienne facture retire ses montants du
+compartiment où ils ont été ajoutés. Les endpoints de comptabilité lisent ces compartiments
+au lieu de re-sommer toutes les lignes de facture.
+
+Le réalisé des objectifs de CA (objectifs_ca) suit les mêmes deltas : une
+requête UPDATE par jour touché, sur les seuls objectifs qui le couvrent.
+
+Reconstruction / vérification :
+    python -m backend.rollups rebuild
+    python -m backend.rollups verify
+"""
+
+import datetime
+import sys
+from collections import defaultdict
+
+from sqlalchemy import Date, and_, case, cast, func, or_, select, update, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Écart toléré entre agrégat stocké et recalculé (cumul de flottants)
+VERIFY_TOLERANCE = 1e-6
+
+
+def _bucket_key(jour, categorie, fournisseur_id):
+    if categorie is None:
+        return (jour, False, '', 0)
+    return (jour, True, categorie, fournisseur_id)
+
+
+def piece_scopes(db: Session, piece_ids) -> dict:
+    """
+    Catégorie et fournisseur actuels des pièces, en une requête IN, à figer
+    sur les lignes de facture créées : {piece_id: (categorie, fournisseur_id)}.
+    """
+    piece_ids = {piece_id for piece_id in piece_ids if piece_id is not None}
+    if not piece_ids:
+        return {}
+    return {
+        piece_id: (categorie or '', fournisseur_id or 0)
+        for piece_id, categorie, fournisseur_id in db.execute(
+            select(models.Piece.id, models.Piece.category, models.Piece.fournisseur_id)
+            .where(models.Piece.id.in_(piece_ids))
+        )
+    }
+
+
+def record_lignes(db: Session, jour: datetime.date, lignes, sign: int = 1):
+    """
+    Répercute des lignes de facture sur les agrégats du jour `jour`.
+    `lignes` : itérable de (quantite, prix_unitaire_ht, categorie,
+    fournisseur_id), le périmètre étant celui figé sur la ligne.
+    `sign` vaut 1 à la création, -1 à la suppression.
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for quantite, prix, categorie, fournisseur_id in lignes:
+        delta = deltas[_bucket_key(jour, categorie, fournisseur_id)]
+        delta[0] += sign * (quantite or 0.0) * (prix or 0.0)
+        delta[1] += sign
+    apply_deltas(db, deltas)
+
+
+def record_facture(db: Session, facture: models.Facture, sign: int = 1):
+    """
+    Répercute toutes les lignes d'une facture sur les agrégats : la
+    suppression retire chaque ligne du compartiment où elle a été ajoutée.
+    """
+    record_lignes(
+        db,
+        facture.date_creation.date(),
+        [(l.quantite, l.prix_unitaire_ht, l.categorie, l.fournisseur_id) for l in facture.lignes],
+        sign
+    )
+
+
+def apply_deltas(db: Session, deltas):
+    """
+    Ajoute chaque delta {clé: [total_ht, nb_lignes]} à son compartiment,
+    par upsert quand le moteur le permet.
+    """
+    table = models.ComptaRollup.__table__
+    dialect = db.get_bind().dialect.name
+    for (jour, avec_piece, categorie, fournisseur_id), (total, count) in deltas.items():
+        values = dict(
+            jour=jour, avec_piece=avec_piece, categorie=categorie,
+            fournisseur_id=fournisseur_id, total_ht=total, nb_lignes=count
+        )
+        if dialect in ("sqlite", "postgresql"):
+            upsert = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(**values)
+            db.execute(upsert.on_conflict_do_update(
+                index_elements=["jour", "avec_piece", "categorie", "fournisseur_id"],
+                set_={
+                    "total_ht": table.c.total_ht + upsert.excluded.total_ht,
+                    "nb_lignes": table.c.nb_lignes + upsert.excluded.nb_lignes,
+                }
+            ))
+            continue
+        result = db.execute(
+            update(table)
+            .where(
+                table.c.jour == jour,
+                table.c.avec_piece == avec_piece,
+                table.c.categorie == categorie,
+                table.c.fournisseur_id == fournisseur_id
+            )
+            .values(total_ht=table.c.total_ht + total, nb_lignes=table.c.nb_lignes + count)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**values))
+    apply_objectifs(db, deltas)
+
+
+def _objectif_scope(objectif, categorie, fournisseur_id):
+    # Objectif sans catégorie / fournisseur : tout le CA compte
+    return and_(
+        or_(objectif.categorie.is_(None), objectif.categorie == categorie),
+        or_(objectif.fournisseur_id.is_(None), objectif.fournisseur_id == fournisseur_id),
+    )
+
+
+def apply_objectifs(db: Session, deltas):
+    """
+    Ajoute les deltas {clé: [total_ht, nb_lignes]} au réalisé des objectifs
+    qui couvrent leur jour et leur périmètre : une requête par jour.
+    """
+    objectif = models.ObjectifCA
+    by_day = defaultdict(list)
+    for (jour, _, categorie, fournisseur_id), (total, _) in deltas.items():
+        if total:
+            by_day[jour].append((categorie, fournisseur_id, total))
+    for jour, items in by_day.items():
+        increment = sum(
+            case((_objectif_scope(objectif, categorie, fournisseur_id), total), else_=0.0)
+            for categorie, fournisseur_id, total in items
+        )
+        db.execute(
+            update(objectif)
+            .where(objectif.date_fin >= jour, objectif.date_debut <= jour)
+            .values(realise=objectif.realise + increment)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def objectif_realise(objectif=models.ObjectifCA):
+    """
+    Sous-requête corrélée : CA de la période et du périmètre de l'objectif,
+    recalculé depuis les agrégats journaliers.
+    """
+    rollup = models.ComptaRollup
+    return (
+        select(func.coalesce(func.sum(rollup.total_ht), 0.0))
+        .where(
+            rollup.jour >= objectif.date_debut,
+            rollup.jour <= objectif.date_fin,
+            _objectif_scope(objectif, rollup.categorie, rollup.fournisseur_id),
+        )
+        .scalar_subquery()
+    )
+
+
+def refresh_objectifs(db: Session, ids=None):
+    """
+    Recalcule le réalisé des objectifs `ids` (tous si None) depuis les
+    agrégats : à la création ou modification d'un objectif, et après rebuild.
+    """
+    stmt = update(models.ObjectifCA).values(realise=objectif_realise())
+    if ids is not None:
+        stmt = stmt.where(models.ObjectifCA.id.in_(ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+
+def _day(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+
+def compute_buckets(db: Session):
+    """
+    Recalcule tous les compartiments à partir des lignes de facture (O(lignes)).
+    """
+    ligne = models.FactureLigne
+    montant = func.sum(ligne.quantite * ligne.prix_unitaire_ht)
+    jour = _day(db, models.Facture.date_creation)
+    avec_piece = ligne.categorie.isnot(None)
+    rows = db.execute(
+        select(
+            jour, avec_piece,
+            func.coalesce(ligne.categorie, ''),
+            func.coalesce(ligne.fournisseur_id, 0),
+            montant, func.count()
+        )
+        .select_from(ligne)
+        .join(models.Facture, models.Facture.id == ligne.facture_id)
+        .group_by(jour, avec_piece, ligne.categorie, ligne.fournisseur_id)
+    )
+    buckets = defaultdict(lambda: [0.0, 0])
+    for jour_value, has_piece, categorie, fournisseur_id, total, count in rows:
+        if isinstance(jour_value, str):
+            jour_value = datetime.date.fromisoformat(jour_value[:10])
+        elif isinstance(jour_value, datetime.datetime):
+            jour_value = jour_value.date()
+        bucket = buckets[(jour_value, bool(has_piece), categorie, fournisseur_id)]
+        bucket[0] += total or 0.0
+        bucket[1] += count
+    return buckets
+
+
+def fill_scopes(db: Session) -> int:
+    """
+    Fige la catégorie et le fournisseur actuels de leur pièce sur les lignes
+    qui ne les portent pas encore (lignes antérieures à cette colonne).
+    Renvoie le nombre de lignes complétées.
+    """
+    ligne, piece = models.FactureLigne, models.Piece
+    result = db.execute(
+        update(ligne)
+        .where(ligne.categorie.is_(None), ligne.piece_id.in_(select(piece.id)))
+        .values(
+            categorie=select(func.coalesce(piece.category, '')).where(piece.id == ligne.piece_id).scalar_subquery(),
+            fournisseur_id=select(func.coalesce(piece.fournisseur_id, 0)).where(piece.id == ligne.piece_id).scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def rebuild(db: Session) -> int:
+    """
+    Vide et reconstruit la table d'agrégats. Renvoie le nombre de compartiments.
+    """
+    buckets = compute_buckets(db)
+    db.execute(delete(models.ComptaRollup))
+    if buckets:
+        db.execute(insert(models.ComptaRollup), [
+            dict(
+                jour=jour, avec_piece=avec_piece, categorie=categorie,
+                fournisseur_id=fournisseur_id, total_ht=total, nb_lignes=count
+            )
+            for (jour, avec_piece, categorie, fournisseur_id), (total, count) in buckets.items()
+        ])
+    refresh_objectifs(db)
+    db.commit()
+    return len(buckets)
+
+
+def verify(db: Session):
+    """
+    Compare les agrégats stockés au recalcul complet.
+    Renvoie la liste des compartiments divergents (clé, stocké, attendu).
+    """
+    expected = compute_buckets(db)
+    stored = {
+        (r.jour, r.avec_piece, r.categorie, r.fournisseur_id): (r.total_ht, r.nb_lignes)
+        for r in db.query(models.ComptaRollup)
+    }
+    mismatches = []
+    for key in set(expected) | set(stored):
+        got = stored.get(key, (0.0, 0))
+        want = tuple(expected.get(key, (0.0, 0)))
+        if got[1] != want[1] or abs(got[0] - want[0]) > VERIFY_TOLERANCE:
+            mismatches.append((key, got, want))
+    # Réalisé des objectifs contre les agrégats stockés
+    for objectif_id, got, want in db.execute(
+        select(models.ObjectifCA.id, models.ObjectifCA.realise, objectif_realise())
+    ):
+        if abs(got - want) > VERIFY_TOLERANCE:
+            mismatches.append((("objectif", objectif_id), got, want))
+    return mismatches
+
+
+def ensure_rollups(engine):
+    """
+    Au démarrage : fige le périmètre des lignes qui ne l'ont pas, puis
+    remplit la table d'agrégats si elle est vide alors que des lignes de
+    facture existent (base antérieure aux agrégats).
+    """
+    with Session(engine) as db:
+        fill_scopes(db)
+        if db.query(models.ComptaRollup.id).first() is None \
+                and db.query(models.FactureLigne.id).first() is not None:
+            rebuild(db)
+
+
+def main(argv=None):
+    from .database import SessionLocal, engine, sync_schema
+
+    args = sys.argv[1:] if argv is None else argv
+    command = args[0] if args else "verify"
+    sync_schema(engine)
+    db = SessionLocal()
+    try:
+        fill_scopes(db)
+        if command == "rebuild":
+            print(f"{rebuild(db)} compartiments reconstruits")
+        elif command == "verify":
+            mismatches = verify(db)
+            for key, got, want in mismatches:
+                print(f"{key} : stocké {got}, attendu {want}")
+            print(f"{len(mismatches)} compartiment(s) divergent(s)")
+            return 1 if mismatches else 0
+        else:
+            print("usage : python -m backend.rollups [rebuild|verify]")
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
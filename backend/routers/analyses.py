@@ -0,0 +1,75 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, photos, schemas
+from ..inference import INFERENCE, cached_result
+from ..repository import get_async_db, not_found
+
+router = APIRouter()
+
+ANALYSE_NON_TROUVEE = "Analyse non trouvée"
+
+def _job(job) -> dict:
+    return {
+        "id": job.id,
+        "photo_id": job.photo_id,
+        "statut": job.statut,
+        "date_creation": job.date_creation,
+        "resultat": job.resultat,
+        "erreur": job.erreur,
+    }
+
+async def _photo_sha256(db: AsyncSession, photo_id: int) -> str:
+    sha256 = await db.scalar(select(models.Photo.sha256).where(models.Photo.id == photo_id))
+    if sha256 is None:
+        raise not_found(models.Photo)
+    return sha256
+
+@router.post(
+    "/",
+    response_model=schemas.AnalyseJob,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def create_analyse(
+    analyse_in: schemas.AnalyseCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Demande l'analyse des dégâts d'une photo. Renvoie aussitôt une tâche
+    (déjà terminée si ce fichier a déjà été analysé) à suivre sur
+    GET /api/analyses/jobs/{id} ou par l'événement photo.analysee.
+    """
+    sha256 = await _photo_sha256(db, analyse_in.photo_id)
+    # Le modèle travaille en 224 px : la miniature suffit et se décode bien
+    # plus vite que l'original
+    path = photos.variant_path(sha256, "miniature")
+    if not os.path.exists(path):
+        path = photos.object_path(sha256)
+    job = await INFERENCE.analyse(db, analyse_in.photo_id, sha256, path)
+    return _job(job)
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=schemas.AnalyseJob
+)
+async def read_job(job_id: str):
+    job = INFERENCE.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=ANALYSE_NON_TROUVEE)
+    return _job(job)
+
+@router.get(
+    "/photos/{photo_id}",
+    response_model=schemas.AnalyseResultat
+)
+async def read_photo_analyse(photo_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Résultat de l'analyse d'une photo par le modèle en service.
+    """
+    resultat = await cached_result(db, await _photo_sha256(db, photo_id), INFERENCE.model)
+    if resultat is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=ANALYSE_NON_TROUVEE)
+    return resultat
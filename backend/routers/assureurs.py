@@ -1,19 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, status
 from typing import List, Optional
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..pagination import PageParams, paginate
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=schemas.AssureurRead,
@@ -21,15 +14,13 @@ def get_db():
 )
 def create_assureur(
     assureur_in: schemas.AssureurCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Crée un nouvel assureur.
     """
-    assureur = models.Assureur(**assureur_in.dict())
-    db.add(assureur)
-    db.commit()
-    db.refresh(assureur)
+    assureur = repo.create(models.Assureur, assureur_in.dict())
+    repo.commit()
     return assureur
 
 @router.get(
@@ -37,16 +28,18 @@ def create_assureur(
     response_model=List[schemas.AssureurRead]
 )
 def list_assureurs(
+    response: Response,
     q: Optional[str] = Query(None, description="Recherche par nom d'assureur"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    repo: Repository = Depends(get_repo)
 ):
     """
     Retourne tous les assureurs, filtrés facultativement par nom.
     """
-    query = db.query(models.Assureur)
+    query = repo.db.query(models.Assureur)
     if q:
         query = query.filter(models.Assureur.nom.ilike(f"%{q}%"))
-    return query.all()
+    return paginate(query, models.Assureur.id, schemas.AssureurRead, page, response)
 
 @router.get(
     "/{assureur_id}",
@@ -54,18 +47,12 @@ def list_assureurs(
 )
 def get_assureur(
     assureur_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Récupère un assureur par son ID.
     """
-    assureur = db.query(models.Assureur).get(assureur_id)
-    if not assureur:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Assureur non trouvé"
-        )
-    return assureur
+    return repo.get_or_404(models.Assureur, assureur_id)
 
 @router.put(
     "/{assureur_id}",
@@ -74,21 +61,13 @@ def get_assureur(
 def update_assureur(
     assureur_id: int,
     data: schemas.AssureurCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour un assureur existant.
     """
-    assureur = db.query(models.Assureur).get(assureur_id)
-    if not assureur:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Assureur non trouvé"
-        )
-    for key, value in data.dict().items():
-        setattr(assureur, key, value)
-    db.commit()
-    db.refresh(assureur)
+    assureur = repo.update(models.Assureur, assureur_id, data.dict())
+    repo.commit()
     return assureur
 
 @router.delete(
@@ -97,17 +76,11 @@ def update_assureur(
 )
 def delete_assureur(
     assureur_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Supprime un assureur par son ID.
     """
-    assureur = db.query(models.Assureur).get(assureur_id)
-    if not assureur:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Assureur non trouvé"
-        )
-    db.delete(assureur)
-    db.commit()
+    repo.delete(models.Assureur, assureur_id)
+    repo.commit()
     return None
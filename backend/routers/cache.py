@@ -0,0 +1,23 @@
+from fastapi import APIRouter, status
+
+from ..cache import REFERENCE_CACHE
+
+router = APIRouter()
+
+@router.get("/")
+def cache_stats():
+    """
+    Statistiques du cache des données de référence (hits/misses par modèle).
+    """
+    return REFERENCE_CACHE.stats()
+
+@router.delete(
+    "/",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+def clear_cache():
+    """
+    Vide le cache des données de référence.
+    """
+    REFERENCE_CACHE.clear()
+    return None
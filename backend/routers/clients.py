@@ -1,35 +1,93 @@
 # backend/routers/clients.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from .. import schemas
-from .. import models
-from ..database import SessionLocal
+from .. import dedup, models
+from ..events import publish
+from ..pagination import PageParams, paginate_async
+from ..repository import AsyncRepository, get_async_db, get_async_repo, get_db, not_found
+from ..search import filter_match, rank_match
+from ..serialization import rows_response
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:   yield db
-    finally: db.close()
+# Colonnes utilisées par la recherche en mode dégradé (hors FTS5)
+SEARCH_COLUMNS = [models.Client.nom, models.Client.prenom, models.Client.email]
 
 @router.post("/", response_model=schemas.ClientRead)
-def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
-    db_client = models.Client(**client.dict())
-    db.add(db_client); db.commit(); db.refresh(db_client)
+async def create_client(client: schemas.ClientCreate, ignorer_doublons: bool = Query(False),
+                        repo: AsyncRepository = Depends(get_async_repo)):
+    """
+    Crée un client. Si des clients existants lui ressemblent (même
+    téléphone, même e-mail ou nom approchant dans le même code postal),
+    renvoie 409 avec les correspondances ; ignorer_doublons=true force la
+    création.
+    """
+    data = client.dict()
+    if not ignorer_doublons:
+        found = await repo.db.run_sync(dedup.candidates, data)
+        if found:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "Client probablement déjà enregistré", "correspondances": found}
+            )
+    db_client = await repo.create(models.Client, {**data, **dedup.client_keys(data)})
+    await repo.commit()
     return db_client
 
+@router.post("/correspondances", response_model=List[schemas.ClientCorrespondance])
+async def match_client(client: schemas.ClientCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Clients existants qui ressemblent à celui-ci, sans le créer.
+    """
+    return await db.run_sync(dedup.candidates, client.dict())
+
+@router.get("/doublons", response_model=schemas.ClientDoublonRapport)
+async def report_doublons(seuil: float = Query(dedup.DEDUP_SEUIL, ge=0.5, le=1.0),
+                          db: Session = Depends(get_db)):
+    """
+    Groupes de clients en double dans toute la base, avec la fiche proposée
+    comme principale.
+    """
+    return await run_in_threadpool(dedup.rapport, db, seuil)
+
+@router.post("/{client_id}/fusion", response_model=schemas.ClientFusionResult)
+async def merge_clients(client_id: int, fusion: schemas.ClientFusion,
+                        repo: AsyncRepository = Depends(get_async_repo)):
+    """
+    Fusionne les doublons dans le client `client_id` : leurs factures,
+    interventions et photos lui sont rattachées, ses champs vides complétés,
+    puis les doublons supprimés.
+    """
+    doublons = [i for i in fusion.doublons if i != client_id]
+    if not doublons:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucun doublon à fusionner")
+    moved = await repo.db.run_sync(dedup.merge, client_id, doublons)
+    if moved is None:
+        raise not_found(models.Client)
+    repo.touch(models.Client, models.Facture, models.PlanningEvent, models.Photo)
+    await repo.commit()
+    principal = await repo.get(models.Client, client_id)
+    publish("client.fusionne", id=client_id, doublons=sorted(set(doublons)))
+    return {"client": principal, **moved}
+
 @router.get("/", response_model=List[schemas.ClientRead])
-def list_clients(q: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(models.Client)
+async def list_clients(response: Response, q: Optional[str] = Query(None),
+                       page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    stmt = select(models.Client)
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            models.Client.nom.ilike(like) |
-            models.Client.prenom.ilike(like) |
-            models.Client.email.ilike(like)
-        )
-    return query.all()
-
-# … et les autres endpoints (GET/{id}, PUT/{id}, DELETE/{id}, /search)
+        stmt = filter_match(stmt, models.Client, SEARCH_COLUMNS, q)
+    return await paginate_async(db, stmt, models.Client.id, schemas.ClientRead, page, response)
+
+@router.get("/search", response_model=List[schemas.ClientRead])
+async def search_clients(q: str = Query(...), limit: int = Query(50, ge=1, le=500),
+                         db: AsyncSession = Depends(get_async_db)):
+    stmt = rank_match(select(models.Client), models.Client, SEARCH_COLUMNS, q)
+    return rows_response((await db.scalars(stmt.limit(limit))).all(), schemas.ClientRead)
+
+# … et les autres endpoints (GET/{id}, PUT/{id}, DELETE/{id})
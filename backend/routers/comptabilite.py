@@ -1,52 +1,95 @@
 # backend/routers/comptabilite.py
 
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, cast, func, literal_column, select
 from typing import List, Optional
-from datetime import datetime
+from datetime import date as date_type, datetime, time, timedelta
 
-from .. import models
-from ..database import SessionLocal
+from .. import models, rollups, schemas
+from ..pagination import PageParams, paginate_async
+from ..repository import AsyncRepository, get_async_db, get_async_repo
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Nombre maximal de périodes d'une série (~13 ans au jour)
+MAX_PERIODES = 5000
+
+
+def _bucket_start(day: date_type, bucket: str) -> date_type:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day: date_type, bucket: str) -> date_type:
+    if bucket == "week":
+        return day + timedelta(days=7)
+    if bucket == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _periodes(start: date_type, end: date_type, bucket: str) -> List[date_type]:
+    periodes, day = [], _bucket_start(start, bucket)
+    while day <= end:
+        periodes.append(day)
+        day = _next_bucket(day, bucket)
+    return periodes
+
+
+def _bucket_sql(dialect: str, column, bucket: str):
+    """
+    Début de période (lundi pour les semaines) calculé par la base.
+    Les modificateurs sont des littéraux et non des paramètres, pour que
+    l'expression du SELECT et celle du GROUP BY soient identiques.
+    """
+    if dialect == "sqlite":
+        modifiers = {
+            "day": (),
+            # 'weekday 0' avance au dimanche suivant (ou reste dimanche), -6 jours : lundi
+            "week": ("'weekday 0'", "'-6 days'"),
+            "month": ("'start of month'",),
+        }[bucket]
+        return func.date(column, *map(literal_column, modifiers))
+    return cast(func.date_trunc(literal_column(f"'{bucket}'"), column), Date)
+
+
+def _as_date(value) -> date_type:
+    if isinstance(value, str):
+        return date_type.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
 
 @router.get("/ca-mensuel")
-def ca_mensuel(db: Session = Depends(get_db)):
+async def ca_mensuel(db: AsyncSession = Depends(get_async_db)):
     """
     Retourne le chiffre d'affaires total du mois en cours.
     """
     now = datetime.utcnow()
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    total = (
-        db.query(func.sum(models.FactureLigne.quantite * models.FactureLigne.prix_unitaire_ht))
-          .join(models.Facture, models.Facture.id == models.FactureLigne.facture_id)
-          .filter(models.Facture.date_creation >= month_start)
-          .scalar()
+    total = await db.scalar(
+        select(func.sum(models.ComptaRollup.total_ht))
+        .where(models.ComptaRollup.jour >= month_start.date())
     ) or 0.0
     return {"total_ca_mensuel": total}
 
 @router.get("/depenses-par-fournisseur")
-def depenses_par_fournisseur(db: Session = Depends(get_db)):
+async def depenses_par_fournisseur(db: AsyncSession = Depends(get_async_db)):
     """
     Retourne, pour chaque fournisseur, le total des dépenses (somme des lignes de factures liées aux pièces fournies).
     """
-    results = (
-        db.query(
+    results = await db.execute(
+        select(
             models.Fournisseur.nom.label("nom_fournisseur"),
-            func.sum(models.FactureLigne.quantite * models.FactureLigne.prix_unitaire_ht).label("total_depense")
+            func.sum(models.ComptaRollup.total_ht).label("total_depense")
         )
-        .join(models.Piece, models.Piece.fournisseur_id == models.Fournisseur.id)
-        .join(models.FactureLigne, models.FactureLigne.piece_id == models.Piece.id)
+        .join(models.ComptaRollup, models.ComptaRollup.fournisseur_id == models.Fournisseur.id)
+        .where(models.ComptaRollup.avec_piece.is_(True))
         .group_by(models.Fournisseur.id)
-        .all()
     )
     return [
         {"nom_fournisseur": nom, "total_depense": total or 0.0}
@@ -54,31 +97,265 @@ def depenses_par_fournisseur(db: Session = Depends(get_db)):
     ]
 
 @router.get("/ca-par-categorie")
-def ca_par_categorie(db: Session = Depends(get_db)):
+async def ca_par_categorie(db: AsyncSession = Depends(get_async_db)):
     """
     Retourne, pour chaque catégorie de pièce, le chiffre d'affaires généré.
     """
-    results = (
-        db.query(
-            models.Piece.category.label("categorie"),
-            func.sum(models.FactureLigne.quantite * models.FactureLigne.prix_unitaire_ht).label("total_ca")
+    results = await db.execute(
+        select(
+            models.ComptaRollup.categorie.label("categorie"),
+            func.sum(models.ComptaRollup.total_ht).label("total_ca")
         )
-        .join(models.FactureLigne, models.FactureLigne.piece_id == models.Piece.id)
-        .group_by(models.Piece.category)
-        .all()
+        .where(models.ComptaRollup.avec_piece.is_(True))
+        .group_by(models.ComptaRollup.categorie)
     )
     return [
-        {"categorie": categorie, "total_ca": total or 0.0}
+        {"categorie": categorie or None, "total_ca": total or 0.0}
         for categorie, total in results
     ]
 
+@router.get("/ca-series")
+async def ca_series(
+    start: Optional[date_type] = Query(None, alias="from", description="Premier jour (YYYY-MM-DD), par défaut le 1er du mois de `to`"),
+    end: Optional[date_type] = Query(None, alias="to", description="Dernier jour inclus (YYYY-MM-DD), par défaut aujourd'hui"),
+    bucket: str = Query("day", regex="^(day|week|month)$", description="Période : day, week (lundi) ou month"),
+    group_by: Optional[str] = Query(None, regex="^(client|categorie|fournisseur)$"),
+    top: Optional[int] = Query(None, ge=1, le=1000, description="Garder les `top` séries au plus gros total"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Chiffre d'affaires HT par période (jour, semaine ou mois), éventuellement
+    ventilé par client, catégorie ou fournisseur, en une seule requête
+    groupée. Les périodes sans facture valent 0 ; la première période
+    commence au lundi ou au 1er du mois précédant `from`, mais ne compte
+    que les factures à partir de `from`.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end.replace(day=1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="`from` doit précéder `to`"
+        )
+    periodes = _periodes(start, end, bucket)
+    if len(periodes) > MAX_PERIODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Série limitée à {MAX_PERIODES} périodes"
+        )
+
+    dialect = db.bind.dialect.name
+    if group_by == "client":
+        # Le client n'est pas dans les agrégats : lignes de facture sur la
+        # plage de dates (index ix_factures_date_creation)
+        periode = _bucket_sql(dialect, models.Facture.date_creation, bucket)
+        stmt = (
+            select(
+                periode.label("periode"),
+                models.Facture.client_id.label("groupe_id"),
+                models.Client.nom.label("groupe"),
+                func.sum(models.FactureLigne.quantite * models.FactureLigne.prix_unitaire_ht)
+            )
+            .select_from(models.Facture)
+            .join(models.FactureLigne, models.FactureLigne.facture_id == models.Facture.id)
+            .outerjoin(models.Client, models.Client.id == models.Facture.client_id)
+            .where(
+                models.Facture.date_creation >= datetime.combine(start, time.min),
+                models.Facture.date_creation < datetime.combine(end + timedelta(days=1), time.min)
+            )
+            .group_by(periode, models.Facture.client_id, models.Client.nom)
+        )
+    else:
+        # Compartiments journaliers déjà agrégés (rollups.py)
+        rollup = models.ComptaRollup
+        periode = _bucket_sql(dialect, rollup.jour, bucket)
+        groupes = {
+            "categorie": (rollup.categorie, rollup.categorie),
+            "fournisseur": (rollup.fournisseur_id, models.Fournisseur.nom),
+            None: (literal_column("NULL"), literal_column("'total'")),
+        }[group_by]
+        stmt = (
+            select(periode.label("periode"), *groupes, func.sum(rollup.total_ht))
+            .where(rollup.jour >= start, rollup.jour <= end)
+            .group_by(periode, *(groupes if group_by is not None else ()))
+        )
+        if group_by == "fournisseur":
+            stmt = stmt.outerjoin(models.Fournisseur, models.Fournisseur.id == rollup.fournisseur_id)
+
+    index = {periode: i for i, periode in enumerate(periodes)}
+    series = {}
+    for periode, groupe_id, groupe, total in await db.execute(stmt):
+        # '' et 0 : lignes sans pièce ou pièce sans catégorie / fournisseur
+        groupe_id = groupe_id or None
+        serie = series.get(groupe_id)
+        if serie is None:
+            serie = series[groupe_id] = {
+                "groupe_id": groupe_id,
+                "groupe": groupe or None,
+                "valeurs": [0.0] * len(periodes),
+            }
+        serie["valeurs"][index[_as_date(periode)]] += total or 0.0
+    if not series and group_by is None:
+        series[None] = {"groupe_id": None, "groupe": "total", "valeurs": [0.0] * len(periodes)}
+
+    result = list(series.values())
+    for serie in result:
+        serie["total"] = sum(serie["valeurs"])
+    result.sort(key=lambda serie: serie["total"], reverse=True)
+    if top is not None:
+        result = result[:top]
+    return {
+        "bucket": bucket,
+        "from": start,
+        "to": end,
+        "group_by": group_by,
+        "periodes": periodes,
+        "series": result,
+    }
+
+def _progression(objectif: models.ObjectifCA, today: date_type) -> dict:
+    """
+    Progression d'un objectif à partir de son réalisé stocké (sans requête).
+    """
+    jours_total = (objectif.date_fin - objectif.date_debut).days + 1
+    jours_ecoules = min(max((today - objectif.date_debut).days + 1, 0), jours_total)
+    return {
+        "objectif": objectif,
+        "realise": objectif.realise,
+        "reste": max(objectif.montant - objectif.realise, 0.0),
+        "taux": objectif.realise / objectif.montant if objectif.montant else None,
+        "jours_ecoules": jours_ecoules,
+        "jours_total": jours_total,
+        "projection": objectif.realise * jours_total / jours_ecoules if jours_ecoules else None,
+    }
+
+async def _save_objectif(repo: AsyncRepository, objectif_id: Optional[int], data: schemas.ObjectifCACreate):
+    refs = {models.Fournisseur: data.fournisseur_id}
+    if objectif_id is None:
+        objectif = await repo.create(models.ObjectifCA, data.dict(), refs=refs)
+    else:
+        objectif = await repo.update(models.ObjectifCA, objectif_id, data.dict(), refs=refs)
+    # Réalisé initial depuis les agrégats journaliers, dans la même
+    # transaction ; ensuite tenu à jour par rollups.apply_objectifs
+    await repo.db.run_sync(rollups.refresh_objectifs, [objectif.id])
+    await repo.commit()
+    await repo.db.refresh(objectif)
+    return objectif
+
+@router.post(
+    "/objectifs",
+    response_model=schemas.ObjectifCARead,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_objectif(
+    objectif_in: schemas.ObjectifCACreate,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Crée un objectif de CA sur une période, global ou limité à une
+    catégorie et/ou un fournisseur.
+    """
+    return await _save_objectif(repo, None, objectif_in)
+
+@router.get(
+    "/objectifs",
+    response_model=List[schemas.ObjectifCARead]
+)
+async def list_objectifs(
+    response: Response,
+    date: Optional[date_type] = Query(None, description="Seulement les objectifs couvrant ce jour"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Liste les objectifs de CA, optionnellement ceux qui couvrent une date.
+    """
+    stmt = select(models.ObjectifCA)
+    if date is not None:
+        stmt = stmt.where(models.ObjectifCA.date_fin >= date, models.ObjectifCA.date_debut <= date)
+    return await paginate_async(db, stmt, models.ObjectifCA.id, schemas.ObjectifCARead, page, response)
+
+@router.get(
+    "/objectifs/{objectif_id}",
+    response_model=schemas.ObjectifCARead
+)
+async def get_objectif(
+    objectif_id: int,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Récupère un objectif de CA par son ID.
+    """
+    return await repo.get_or_404(models.ObjectifCA, objectif_id)
+
+@router.get(
+    "/objectifs/{objectif_id}/progression",
+    response_model=schemas.ObjectifCAProgression
+)
+async def progression_objectif(
+    objectif_id: int,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Progression d'un objectif : réalisé, reste, taux et projection au
+    rythme actuel. Une lecture par clé primaire, quel que soit le nombre
+    de factures.
+    """
+    objectif = await repo.get_or_404(models.ObjectifCA, objectif_id)
+    return _progression(objectif, datetime.utcnow().date())
+
+@router.put(
+    "/objectifs/{objectif_id}",
+    response_model=schemas.ObjectifCARead
+)
+async def update_objectif(
+    objectif_id: int,
+    objectif_in: schemas.ObjectifCACreate,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Met à jour un objectif de CA ; son réalisé est recalculé.
+    """
+    return await _save_objectif(repo, objectif_id, objectif_in)
+
+@router.delete(
+    "/objectifs/{objectif_id}",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_objectif(
+    objectif_id: int,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Supprime un objectif de CA par son ID.
+    """
+    await repo.delete(models.ObjectifCA, objectif_id)
+    await repo.commit()
+    return None
+
 @router.get("/objectif-ca")
-def objectif_ca(
-    date: Optional[str] = Query(None, description="Date (YYYY-MM-DD) pour récupérer l'objectif de CA")
+async def objectif_ca(
+    date: Optional[date_type] = Query(None, description="Date (YYYY-MM-DD) pour récupérer l'objectif de CA"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Renvoie l'objectif de chiffre d'affaires pour une date donnée.
-    (Implémentation vide pour l'instant, renvoie null si pas d'objectif défini.)
+    Renvoie l'objectif de chiffre d'affaires global couvrant une date (le
+    plus court s'ils sont imbriqués : jour, puis semaine, puis mois...) et
+    sa progression ; objectif_ca vaut null si aucun n'est défini.
     """
-    # TODO: récupérer l'objectif depuis une table dédiée si nécessaire
-    return {"objectif_ca": None}
+    date = date or datetime.utcnow().date()
+    objectif = await db.scalar(
+        select(models.ObjectifCA)
+        .where(
+            models.ObjectifCA.date_fin >= date,
+            models.ObjectifCA.date_debut <= date,
+            models.ObjectifCA.categorie.is_(None),
+            models.ObjectifCA.fournisseur_id.is_(None)
+        )
+        .order_by(models.ObjectifCA.date_debut.desc(), models.ObjectifCA.date_fin, models.ObjectifCA.id.desc())
+        .limit(1)
+    )
+    if objectif is None:
+        return {"objectif_ca": None}
+    progression = schemas.ObjectifCAProgression(**_progression(objectif, date))
+    return dict(progression.dict(), objectif_ca=objectif.montant)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from ..events import EVENT_BUS
+
+router = APIRouter()
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    types: Optional[str] = Query(None, description="Familles d'événements, séparées par des virgules (facture,planning,piece)"),
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Flux Server-Sent Events des événements métier (factures, planning,
+    pièces), à la place du rechargement périodique des écrans.
+    """
+    subscription = EVENT_BUS.subscribe(
+        types=[t.strip() for t in types.split(",") if t.strip()] if types else None,
+        last_event_id=last_event_id
+    )
+    return StreamingResponse(
+        EVENT_BUS.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+def events_stats():
+    """
+    Abonnés et compteurs du bus (publiés, envoyés, regroupés, resync).
+    """
+    return EVENT_BUS.stats()
@@ -1,21 +1,14 @@
 # backend/routers/experts.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, status
 from typing import List, Optional
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..pagination import PageParams, paginate
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=schemas.ExpertRead,
@@ -23,15 +16,13 @@ def get_db():
 )
 def create_expert(
     expert_in: schemas.ExpertCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Crée un nouvel expert.
     """
-    expert = models.Expert(**expert_in.dict())
-    db.add(expert)
-    db.commit()
-    db.refresh(expert)
+    expert = repo.create(models.Expert, expert_in.dict())
+    repo.commit()
     return expert
 
 @router.get(
@@ -39,16 +30,18 @@ def create_expert(
     response_model=List[schemas.ExpertRead]
 )
 def list_experts(
+    response: Response,
     q: Optional[str] = Query(None, description="Recherche par nom d'expert"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    repo: Repository = Depends(get_repo)
 ):
     """
     Retourne tous les experts, filtrés facultativement par nom.
     """
-    query = db.query(models.Expert)
+    query = repo.db.query(models.Expert)
     if q:
         query = query.filter(models.Expert.nom.ilike(f"%{q}%"))
-    return query.all()
+    return paginate(query, models.Expert.id, schemas.ExpertRead, page, response)
 
 @router.get(
     "/{expert_id}",
@@ -56,18 +49,12 @@ def list_experts(
 )
 def get_expert(
     expert_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Récupère un expert par son ID.
     """
-    expert = db.query(models.Expert).get(expert_id)
-    if not expert:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expert non trouvé"
-        )
-    return expert
+    return repo.get_or_404(models.Expert, expert_id)
 
 @router.put(
     "/{expert_id}",
@@ -76,21 +63,13 @@ def get_expert(
 def update_expert(
     expert_id: int,
     expert_in: schemas.ExpertCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour un expert existant.
     """
-    expert = db.query(models.Expert).get(expert_id)
-    if not expert:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expert non trouvé"
-        )
-    for key, value in expert_in.dict().items():
-        setattr(expert, key, value)
-    db.commit()
-    db.refresh(expert)
+    expert = repo.update(models.Expert, expert_id, expert_in.dict())
+    repo.commit()
     return expert
 
 @router.delete(
@@ -99,17 +78,11 @@ def update_expert(
 )
 def delete_expert(
     expert_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Supprime un expert par son ID.
     """
-    expert = db.query(models.Expert).get(expert_id)
-    if not expert:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expert non trouvé"
-        )
-    db.delete(expert)
-    db.commit()
+    repo.delete(models.Expert, expert_id)
+    repo.commit()
     return None
@@ -1,182 +1,303 @@
 # backend/routers/factures.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from fastapi.responses import FileResponse
-import io
-from reportlab.pdfgen import canvas
+from fastapi.responses import FileResponse, HTMLResponse
+from datetime import date, datetime, time
 
-from .. import models, schemas
-from ..database import SessionLocal
+from .. import bulk, models, numerotation, pdf, rollups, schemas, stock
+from ..cache import etag_matches
+from ..events import publish
+from ..loading import FACTURE_PDF, FACTURE_READ
+from ..repository import AsyncRepository, get_async_db, get_async_repo, get_db, not_found
+from ..search import rank_factures
+from ..serialization import rows_response
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=schemas.FactureRead,
     status_code=status.HTTP_201_CREATED
 )
-def create_facture(
+async def create_facture(
     facture_in: schemas.FactureCreate,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
-    Crée une nouvelle facture avec ses lignes.
+    Crée une nouvelle facture avec ses lignes. Sans numero_facture, la
+    facture reçoit le numéro suivant de la séquence de l'année.
     """
-    # Vérifier que le client existe
-    client = db.query(models.Client).get(facture_in.client_id)
-    if not client:
+    db = repo.db
+    if facture_in.numero_facture is not None and numerotation.is_reserved(facture_in.numero_facture):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Client non trouvé"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ce format de numéro est réservé à la numérotation automatique"
         )
-    # Créer l'entité Facture
+    # Vérifier que le client existe
+    await repo.check_refs({models.Client: facture_in.client_id})
+    # Créer l'entité Facture et ses lignes (chargées en mémoire pour la réponse)
     facture = models.Facture(
         numero_facture=facture_in.numero_facture,
         client_id=facture_in.client_id,
-        informations_complementaires=facture_in.informations_complementaires
+        informations_complementaires=facture_in.informations_complementaires,
+        date_creation=datetime.utcnow()
     )
-    db.add(facture)
-    db.commit()
-    db.refresh(facture)
-
-    # Ajouter les lignes
-    for ligne_in in facture_in.lignes:
-        ligne = models.FactureLigne(
-            facture_id=facture.id,
+    # Catégorie et fournisseur des pièces, figés sur les lignes (rollups.py)
+    scopes = await db.run_sync(rollups.piece_scopes, [l.piece_id for l in facture_in.lignes])
+    if any(l.piece_id is not None and l.piece_id not in scopes for l in facture_in.lignes):
+        raise not_found(models.Piece)
+    facture.lignes = [
+        models.FactureLigne(
             description=ligne_in.description,
             quantite=ligne_in.quantite,
             prix_unitaire_ht=ligne_in.prix_unitaire_ht,
-            piece_id=ligne_in.piece_id
+            piece_id=ligne_in.piece_id,
+            categorie=scopes.get(ligne_in.piece_id, (None, None))[0],
+            fournisseur_id=scopes.get(ligne_in.piece_id, (None, None))[1]
         )
-        db.add(ligne)
-    db.commit()
-    db.refresh(facture)
-
+        for ligne_in in facture_in.lignes
+    ]
+    async with numerotation.SEQUENCE_LOCK:
+        if facture_in.numero_facture is None:
+            # Numéro réservé dans cette transaction : rendu si elle échoue
+            annee = facture.date_creation.year
+            facture.annee = annee
+            facture.sequence = await db.run_sync(numerotation.allocate, annee)
+            facture.numero_facture = numerotation.format_numero(annee, facture.sequence)
+        db.add(facture)
+        await db.flush()
+        await db.run_sync(rollups.record_facture, facture)
+        await db.run_sync(stock.record_ventes, [(l.id, l.piece_id, l.quantite) for l in facture.lignes])
+        await db.commit()
+    publish(
+        "facture.created",
+        id=facture.id, numero_facture=facture.numero_facture, client_id=facture.client_id,
+        date=facture.date_creation,
+        total_ht=sum((l.quantite or 0.0) * (l.prix_unitaire_ht or 0.0) for l in facture_in.lignes)
+    )
     return facture
 
+@router.post(
+    "/bulk",
+    response_model=schemas.FactureBulkResult
+)
+async def create_factures_bulk(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Crée des factures en masse à partir d'un tableau JSON de FactureCreate
+    ou d'un flux NDJSON (Content-Type: application/x-ndjson), en une seule
+    transaction. Les erreurs sont rapportées ligne par ligne.
+    Le flux NDJSON est importé par lots au fil de sa lecture : la mémoire
+    ne dépend pas de la taille du corps.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    if not ndjson:
+        try:
+            raw_rows = bulk.parse_json_array(await request.body())
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+    # Validation et insertion, surtout du calcul : session synchrone dans le pool de threads
+    async with numerotation.SEQUENCE_LOCK:
+        importer = bulk.BulkImport(db)
+        try:
+            if ndjson:
+                async for batch in _ndjson_batches(request):
+                    await run_in_threadpool(importer.add, batch)
+            else:
+                await run_in_threadpool(importer.add, raw_rows)
+            result = await run_in_threadpool(importer.finish)
+        except Exception:
+            # Y compris une déconnexion du client en cours d'envoi : rien n'est créé
+            await run_in_threadpool(db.rollback)
+            raise
+    if result["created"]:
+        publish("facture.imported", created=result["created"])
+    return result
+
+async def _ndjson_batches(request: Request):
+    """
+    Éléments décodés du flux NDJSON, par lots de BULK_CHUNK_SIZE.
+    """
+    batch = []
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        batch.extend(_ndjson_rows(lines))
+        while len(batch) >= bulk.BULK_CHUNK_SIZE:
+            yield batch[:bulk.BULK_CHUNK_SIZE]
+            batch = batch[bulk.BULK_CHUNK_SIZE:]
+    batch.extend(_ndjson_rows([pending]))
+    if batch:
+        yield batch
+
+def _ndjson_rows(lines):
+    for line in lines:
+        try:
+            row = bulk.parse_ndjson_line(line)
+        except ValueError as exc:
+            row = exc
+        if row is not None:
+            yield row
+
 @router.get(
     "/search",
     response_model=List[schemas.FactureRead]
 )
-def search_factures(
+async def search_factures(
     q: str = Query(..., description="Recherche par numéro ou nom client"),
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Recherche de factures par numéro ou nom de client (insensible à la casse).
-    """
-    like = f"%{q}%"
-    return (
-        db.query(models.Facture)
-          .join(models.Client)
-          .filter(
-              models.Facture.numero_facture.ilike(like) |
-              models.Client.nom.ilike(like)
-          )
-          .all()
-    )
+    Recherche de factures par numéro ou nom de client (insensible à la casse
+    et aux accents), triées par pertinence.
+    """
+    stmt = select(models.Facture).options(*FACTURE_READ)
+    rows = (await db.scalars(rank_factures(stmt, q).limit(limit))).all()
+    return rows_response(rows, schemas.FactureRead)
+
+@router.get(
+    "/numerotation/audit",
+    response_model=List[schemas.NumerotationAudit]
+)
+async def audit_numerotation(db: AsyncSession = Depends(get_async_db)):
+    """
+    Contrôle des séquences de numérotation par année : trous, doublons et
+    cohérence avec le compteur.
+    """
+    return await db.run_sync(numerotation.audit)
 
 @router.get(
     "/{facture_id}",
     response_model=schemas.FactureRead
 )
-def get_facture(
+async def get_facture(
     facture_id: int,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
     Récupère une facture par son ID.
     """
-    facture = db.query(models.Facture).get(facture_id)
-    if not facture:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Facture non trouvée"
+    return await repo.get_or_404(models.Facture, facture_id, options=FACTURE_READ)
+
+@router.post("/pdf/prerender")
+async def prerender_pdfs(
+    start_date: date = Query(..., description="Date de début (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Date de fin incluse (YYYY-MM-DD)"),
+    engine: str = Query("canvas", regex="^(canvas|template)$", description="Moteur de rendu PDF"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Pré-génère en parallèle les PDF de toutes les factures d'une période.
+    """
+    _check_engine(engine)
+    factures = (await db.scalars(
+        select(models.Facture)
+        .options(*FACTURE_PDF)
+        .where(
+            models.Facture.date_creation >= datetime.combine(start_date, time.min),
+            models.Facture.date_creation <= datetime.combine(end_date, time.max)
         )
-    return facture
+    )).all()
+    snapshots = [pdf.facture_snapshot(f) for f in factures]
+    rendered, cached = await run_in_threadpool(pdf.prerender, snapshots, engine)
+    return {"factures": len(factures), "rendues": rendered, "en_cache": cached}
 
 @router.get(
     "/{facture_id}/pdf",
     response_class=FileResponse
 )
-def facture_pdf(
+async def facture_pdf(
     facture_id: int,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    engine: str = Query("canvas", regex="^(canvas|template)$", description="Moteur de rendu PDF"),
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
-    Génère et renvoie le PDF de la facture.
+    Renvoie le PDF de la facture, rendu hors du thread de requête et mis en
+    cache sur disque selon l'empreinte de son contenu (ETag).
+    engine=canvas dessine avec reportlab, engine=template convertit
+    templates/facture_template.html avec WeasyPrint.
     """
-    facture = db.query(models.Facture).get(facture_id)
-    if not facture:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Facture non trouvée"
-        )
+    _check_engine(engine)
+    facture = await repo.get_or_404(models.Facture, facture_id, options=FACTURE_PDF)
 
-    # Création du PDF en mémoire
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf)
-    c.setFont("Helvetica", 12)
-    y = 800
-    c.drawString(50, y, f"Facture : {facture.numero_facture}")
-    y -= 30
-    c.drawString(50, y, f"Client : {facture.client.nom} {facture.client.prenom or ''}")
-    y -= 30
-    c.drawString(50, y, f"Date : {facture.date_creation.strftime('%Y-%m-%d %H:%M:%S')}")
-    y -= 40
-
-    # Lignes de facture
-    total = 0.0
-    for ligne in facture.lignes:
-        line_text = f"{ligne.description} x{ligne.quantite} @ {ligne.prix_unitaire_ht:.2f}€"
-        c.drawString(50, y, line_text)
-        total += ligne.quantite * ligne.prix_unitaire_ht
-        y -= 20
-        if y < 50:
-            c.showPage()
-            c.setFont("Helvetica", 12)
-            y = 800
-
-    # Total
-    y -= 20
-    c.drawString(50, y, f"Total HT : {total:.2f}€")
-
-    c.showPage()
-    c.save()
-    buf.seek(0)
+    snapshot = pdf.facture_snapshot(facture)
+    digest = pdf.content_hash(snapshot, engine)
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "private, max-age=0, must-revalidate"}
+    if etag_matches(if_none_match, digest):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
+    path, _ = await run_in_threadpool(pdf.ensure_pdf, snapshot, engine)
     return FileResponse(
-        buf,
+        path,
         media_type="application/pdf",
-        filename=f"facture_{facture.numero_facture}.pdf"
+        filename=f"facture_{facture.numero_facture}.pdf",
+        headers=headers
     )
 
+@router.get(
+    "/{facture_id}/html",
+    response_class=HTMLResponse
+)
+async def facture_html(
+    facture_id: int,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Renvoie la facture rendue en HTML avec le gabarit facture_template.html.
+    """
+    _check_engine("html")
+    facture = await repo.get_or_404(models.Facture, facture_id, options=FACTURE_PDF)
+    return HTMLResponse(pdf.render_html(pdf.facture_snapshot(facture)))
+
+def _check_engine(engine):
+    if not pdf.engine_available(engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Moteur de rendu '{engine}' indisponible sur ce serveur"
+        )
+
 @router.delete(
     "/{facture_id}",
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_facture(
+async def delete_facture(
     facture_id: int,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
-    Supprime une facture et ses lignes par son ID.
+    Supprime une facture, ses lignes et ses photos (ON DELETE CASCADE) par
+    son ID. Une facture numérotée automatiquement ne peut être supprimée
+    que si elle est la dernière de son année.
     """
-    facture = db.query(models.Facture).get(facture_id)
-    if not facture:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Facture non trouvée"
+    facture = await repo.get_or_404(models.Facture, facture_id, options=FACTURE_READ)
+    async with numerotation.SEQUENCE_LOCK:
+        if facture.sequence is not None and not await repo.db.run_sync(
+            numerotation.release, facture.annee, facture.sequence
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Seule la dernière facture numérotée de l'année peut être supprimée : émettre un avoir"
+            )
+        await repo.db.run_sync(rollups.record_facture, facture, -1)
+        await repo.db.run_sync(
+            stock.record_ventes,
+            [(l.id, l.piece_id, l.quantite) for l in facture.lignes],
+            facture.numero_facture
         )
-    db.delete(facture)
-    db.commit()
+        await repo.db.delete(facture)
+        await repo.db.commit()
+    publish("facture.deleted", id=facture_id, date=facture.date_creation)
     return None
@@ -1,79 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response
 from typing import List, Optional
 from .. import models, schemas
-from ..database import SessionLocal
+from ..cache import cached_response
+from ..pagination import PageParams, page_rows, paginate
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.FournisseurRead)
-def create_fournisseur(f: schemas.FournisseurCreate, db: Session = Depends(get_db)):
+def create_fournisseur(f: schemas.FournisseurCreate, repo: Repository = Depends(get_repo)):
     """
     Crée un nouveau fournisseur.
     """
-    obj = models.Fournisseur(**f.dict())
-    db.add(obj)
-    db.commit()
-    db.refresh(obj)
+    obj = repo.create(models.Fournisseur, f.dict())
+    repo.commit()
     return obj
 
 @router.get("/", response_model=List[schemas.FournisseurRead])
 def list_fournisseurs(
+    request: Request,
+    response: Response,
     q: Optional[str] = Query(None, description="Recherche par nom de fournisseur"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    repo: Repository = Depends(get_repo)
 ) -> List[models.Fournisseur]:
     """
     Liste tous les fournisseurs, optionnellement filtrés par nom (insensible à la casse).
     """
-    query = db.query(models.Fournisseur)
+    query = repo.db.query(models.Fournisseur)
     if q:
         query = query.filter(models.Fournisseur.nom.ilike(f"%{q}%"))
-    return query.all()
+    if page.format == "ndjson":
+        return paginate(query, models.Fournisseur.id, schemas.FournisseurRead, page, response)
+    return cached_response(
+        request, models.Fournisseur, schemas.FournisseurRead,
+        lambda scratch: page_rows(query, models.Fournisseur.id, page, scratch)
+    )
 
 @router.get("/{fournisseur_id}", response_model=schemas.FournisseurRead)
-def get_fournisseur(fournisseur_id: int, db: Session = Depends(get_db)):
+def get_fournisseur(fournisseur_id: int, request: Request, repo: Repository = Depends(get_repo)):
     """
     Récupère un fournisseur par son ID.
     """
-    f = db.query(models.Fournisseur).get(fournisseur_id)
-    if not f:
-        raise HTTPException(status_code=404, detail="Fournisseur non trouvé")
-    return f
+    return cached_response(
+        request, models.Fournisseur, schemas.FournisseurRead,
+        lambda scratch: repo.get_or_404(models.Fournisseur, fournisseur_id)
+    )
 
 @router.put("/{fournisseur_id}", response_model=schemas.FournisseurRead)
 def update_fournisseur(
     fournisseur_id: int,
     data: schemas.FournisseurCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour un fournisseur existant.
     """
-    f = db.query(models.Fournisseur).get(fournisseur_id)
-    if not f:
-        raise HTTPException(status_code=404, detail="Fournisseur non trouvé")
-    for key, value in data.dict().items():
-        setattr(f, key, value)
-    db.commit()
-    db.refresh(f)
+    f = repo.update(models.Fournisseur, fournisseur_id, data.dict())
+    repo.commit()
     return f
 
 @router.delete("/{fournisseur_id}")
-def delete_fournisseur(fournisseur_id: int, db: Session = Depends(get_db)):
+def delete_fournisseur(fournisseur_id: int, repo: Repository = Depends(get_repo)):
     """
     Supprime un fournisseur par son ID.
     """
-    f = db.query(models.Fournisseur).get(fournisseur_id)
-    if not f:
-        raise HTTPException(status_code=404, detail="Fournisseur non trouvé")
-    db.delete(f)
-    db.commit()
+    repo.delete(models.Fournisseur, fournisseur_id)
+    repo.commit()
     return {"message": "Fournisseur supprimé"}
@@ -1,20 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, status
 from typing import List
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..cache import cached_response, request_key
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
-# Dependency pour obtenir une session DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=schemas.MainDoeuvreRead,
@@ -22,15 +14,13 @@ def get_db():
 )
 def create_main_doeuvre(
     md_in: schemas.MainDoeuvreCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Crée une nouvelle ligne de main-d'œuvre.
     """
-    md = models.MainDoeuvre(**md_in.dict())
-    db.add(md)
-    db.commit()
-    db.refresh(md)
+    md = repo.create(models.MainDoeuvre, md_in.dict())
+    repo.commit()
     return md
 
 @router.post(
@@ -39,15 +29,21 @@ def create_main_doeuvre(
 )
 def search_main_doeuvre(
     md_in: schemas.MainDoeuvreCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    repo: Repository = Depends(get_repo)
 ):
     """
     Recherche de main-d'œuvre par description (insensible à la casse).
     """
-    return (
-        db.query(models.MainDoeuvre)
-          .filter(models.MainDoeuvre.description.ilike(f"%{md_in.description}%"))
-          .all()
+    # Critère dans le corps (POST) : la clé de cache doit l'inclure
+    return cached_response(
+        request, models.MainDoeuvre, schemas.MainDoeuvreRead,
+        lambda scratch: (
+            repo.db.query(models.MainDoeuvre)
+              .filter(models.MainDoeuvre.description.ilike(f"%{md_in.description}%"))
+              .all()
+        ),
+        key=(request_key(request), md_in.description.lower())
     )
 
 @router.put(
@@ -57,21 +53,13 @@ def search_main_doeuvre(
 def update_main_doeuvre(
     md_id: int,
     md_in: schemas.MainDoeuvreCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour une entrée main-d'œuvre existante.
     """
-    md = db.query(models.MainDoeuvre).get(md_id)
-    if not md:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Main-d'œuvre non trouvée"
-        )
-    md.description = md_in.description
-    md.taux_horaire = md_in.taux_horaire
-    db.commit()
-    db.refresh(md)
+    md = repo.update(models.MainDoeuvre, md_id, md_in.dict())
+    repo.commit()
     return md
 
 @router.delete(
@@ -80,17 +68,11 @@ def update_main_doeuvre(
 )
 def delete_main_doeuvre(
     md_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Supprime une entrée main-d'œuvre par son ID.
     """
-    md = db.query(models.MainDoeuvre).get(md_id)
-    if not md:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Main-d'œuvre non trouvée"
-        )
-    db.delete(md)
-    db.commit()
+    repo.delete(models.MainDoeuvre, md_id)
+    repo.commit()
     return None
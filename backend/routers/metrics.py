@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Response, status
+
+from ..metrics import CONTENT_TYPE, METRICS
+
+router = APIRouter()
+
+@router.get(
+    "",
+    response_class=Response
+)
+def metrics():
+    """
+    Latences, requêtes SQL et requêtes lentes par route, au format Prometheus.
+    """
+    return Response(content=METRICS.render(), media_type=CONTENT_TYPE)
+
+@router.get("/slow-queries")
+def slow_queries():
+    """
+    Dernières requêtes SQL lentes (les plus récentes d'abord), avec leur plan.
+    """
+    return METRICS.slow_queries()
+
+@router.delete(
+    "",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+def reset_metrics():
+    """
+    Remet les compteurs à zéro.
+    """
+    METRICS.reset()
+    return None
@@ -0,0 +1,137 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from .. import models, photos, schemas
+from ..pagination import PageParams, paginate_async
+from ..repository import AsyncRepository, get_async_db, get_async_repo, not_found
+
+router = APIRouter()
+
+VARIANTES = ("fichier",) + tuple(photos.VARIANTES)
+
+@router.post(
+    "/",
+    response_model=List[schemas.PhotoRead],
+    status_code=status.HTTP_201_CREATED
+)
+async def upload_photos(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    client_id: Optional[int] = None,
+    facture_id: Optional[int] = None,
+    planning_event_id: Optional[int] = None,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Envoie une ou plusieurs photos (multipart/form-data, un fichier par
+    partie) rattachées à un client, une facture et/ou une intervention.
+    Le corps est lu en flux : il n'est jamais chargé entièrement en mémoire.
+    """
+    links = {"client_id": client_id, "facture_id": facture_id, "planning_event_id": planning_event_id}
+    refs = {
+        model: links[key]
+        for model, key in ((models.Client, "client_id"), (models.Facture, "facture_id"),
+                           (models.PlanningEvent, "planning_event_id"))
+        if links[key] is not None
+    }
+    if not refs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Une photo doit être rattachée à un client, une facture ou une intervention"
+        )
+    # Avant de lire le corps : une référence absente ne coûte pas l'envoi
+    await repo.check_refs(refs)
+    stored = await photos.receive_multipart(request.stream(), request.headers.get("content-type"))
+    created = []
+    for item in stored:
+        created.append(await repo.create(models.Photo, {
+            "sha256": item.sha256,
+            "media_type": item.media_type,
+            "taille": item.taille,
+            "largeur": item.largeur,
+            "hauteur": item.hauteur,
+            "nom_fichier": item.nom_fichier,
+            **links,
+        }))
+    await repo.commit()
+    for sha256 in {item.sha256 for item in stored}:
+        background_tasks.add_task(photos.ensure_variants, sha256)
+    return created
+
+@router.get(
+    "/",
+    response_model=List[schemas.PhotoRead]
+)
+async def list_photos(
+    response: Response,
+    client_id: Optional[int] = None,
+    facture_id: Optional[int] = None,
+    planning_event_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Photos, filtrées par client, facture ou intervention.
+    """
+    stmt = select(models.Photo)
+    if client_id is not None:
+        stmt = stmt.where(models.Photo.client_id == client_id)
+    if facture_id is not None:
+        stmt = stmt.where(models.Photo.facture_id == facture_id)
+    if planning_event_id is not None:
+        stmt = stmt.where(models.Photo.planning_event_id == planning_event_id)
+    return await paginate_async(db, stmt, models.Photo.id, schemas.PhotoRead, page, response)
+
+@router.get(
+    "/{photo_id}",
+    response_model=schemas.PhotoRead
+)
+async def read_photo(photo_id: int, repo: AsyncRepository = Depends(get_async_repo)):
+    return await repo.get_or_404(models.Photo, photo_id)
+
+@router.get(
+    "/{photo_id}/{variante}",
+    responses={
+        200: {"content": {"image/jpeg": {}}},
+        206: {"description": "Partie du fichier (en-tête Range)"},
+    }
+)
+async def photo_file(
+    photo_id: int,
+    request: Request,
+    variante: str = Path(..., regex=f"^({'|'.join(VARIANTES)})$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Fichier original (fichier) ou variante JPEG (miniature, web) d'une photo.
+    Une variante manquante est calculée à la demande.
+    """
+    row = (await db.execute(
+        select(models.Photo.sha256, models.Photo.media_type, models.Photo.nom_fichier)
+        .where(models.Photo.id == photo_id)
+    )).first()
+    if row is None:
+        raise not_found(models.Photo)
+    if variante == "fichier":
+        return photos.file_response(
+            request, photos.object_path(row.sha256), row.media_type, row.sha256, row.nom_fichier
+        )
+    await photos.ensure_variants(row.sha256)
+    return photos.file_response(
+        request, photos.variant_path(row.sha256, variante), "image/jpeg", f"{row.sha256}-{variante}"
+    )
+
+@router.delete(
+    "/{photo_id}",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def delete_photo(photo_id: int, repo: AsyncRepository = Depends(get_async_repo)):
+    """
+    Supprime la photo. Le fichier reste stocké tant qu'une autre photo le
+    référence ; les fichiers orphelins sont retirés par
+    `python -m backend.photos gc`.
+    """
+    await repo.delete(models.Photo, photo_id)
+    await repo.commit()
@@ -1,148 +1,199 @@
 # backend/routers/pieces.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from .. import models, schemas
-from ..database import SessionLocal
+from .. import models, pricing, schemas
+from ..events import publish
+from ..pagination import NEXT_CURSOR, PageParams, paginate_async
+from ..repository import AsyncRepository, get_async_db, get_async_repo
+from ..search import filter_match, rank_match
+from ..serialization import FastJSONResponse, dumps, rows_response
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Colonnes utilisées par la recherche en mode dégradé (hors FTS5)
+SEARCH_COLUMNS = [models.Piece.designation, models.Piece.ref]
 
 @router.post(
     "/",
     response_model=schemas.PieceRead,
     status_code=status.HTTP_201_CREATED
 )
-def create_piece(
+async def create_piece(
     piece_in: schemas.PieceCreate,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
     Crée une nouvelle pièce. Vérifie que le fournisseur existe.
     """
-    if not db.query(models.Fournisseur).get(piece_in.fournisseur_id):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fournisseur non trouvé"
-        )
-    piece = models.Piece(**piece_in.dict())
-    db.add(piece)
-    db.commit()
-    db.refresh(piece)
+    piece = await repo.create(
+        models.Piece, piece_in.dict(),
+        refs={models.Fournisseur: piece_in.fournisseur_id}
+    )
+    await repo.commit()
+    publish("piece.updated", id=piece.id, action="created")
     return piece
 
 @router.get(
     "/",
     response_model=List[schemas.PieceRead]
 )
-def list_pieces(
+async def list_pieces(
+    response: Response,
     q: Optional[str] = Query(None, description="Recherche par désignation ou référence"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Liste toutes les pièces, optionnellement filtrées par désignation ou ref.
     """
-    query = db.query(models.Piece)
+    stmt = select(models.Piece)
     if q:
-        like = f"%{q}%"
-        query = query.filter(
-            models.Piece.designation.ilike(like) |
-            models.Piece.ref.ilike(like)
+        stmt = filter_match(stmt, models.Piece, SEARCH_COLUMNS, q)
+    return await paginate_async(db, stmt, models.Piece.id, schemas.PieceRead, page, response)
+
+@router.api_route(
+    "/search",
+    methods=["GET", "POST"],
+    response_model=List[schemas.PieceRead]
+)
+async def search_pieces(
+    q: Optional[str] = Query(None, description="Recherche libre (désignation, référence, catégorie)"),
+    designation: Optional[str] = None,
+    ref: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500, description="Nombre maximum de résultats par page"),
+    offset: int = Query(0, ge=0, description="Curseur : valeur X-Next-Cursor de la page précédente"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recherche de pièces par désignation et/ou référence, triée par pertinence.
+
+    Renvoie les `limit` meilleurs résultats (50 par défaut). S'il en reste,
+    l'en-tête X-Next-Cursor donne la valeur d'`offset` de la page suivante :
+    le tri par score ne permet pas de curseur keyset sur l'ID.
+    """
+    stmt = rank_match(
+        select(models.Piece), models.Piece, SEARCH_COLUMNS,
+        q=q, designation=designation, ref=ref
+    )
+    rows = (await db.scalars(stmt.offset(offset).limit(limit + 1))).all()
+    headers = {NEXT_CURSOR: str(offset + limit)} if len(rows) > limit else None
+    return rows_response(rows[:limit], schemas.PieceRead, headers=headers)
+
+async def _current_pricing(db: AsyncSession) -> pricing.Pricing:
+    """
+    Résultat du moteur de prix, en ne rechargeant que la table de remises
+    ou le catalogue qui a changé depuis le dernier calcul.
+    """
+    pricer = pricing.PRICING
+    current = pricer.current()
+    if current is not None:
+        return current
+    generations = pricer.generations()
+    reload_table, reload_catalogue = pricer.needs()
+    remise_rows = catalogue_rows = None
+    if reload_table:
+        remise_rows = (await db.execute(select(*pricing.REMISE_COLUMNS))).all()
+    if reload_catalogue:
+        catalogue_rows = (
+            await db.execute(select(*pricing.CATALOGUE_COLUMNS).order_by(models.Piece.id))
+        ).all()
+    # Calcul NumPy hors de la boucle d'événements
+    return await run_in_threadpool(pricer.refresh, generations, remise_rows, catalogue_rows)
+
+@router.get(
+    "/pricing",
+    response_model=List[schemas.PiecePricing]
+)
+async def pieces_pricing(
+    response: Response,
+    fournisseur_id: Optional[int] = None,
+    category: Optional[str] = None,
+    remise_only: bool = Query(False, description="Seulement les pièces qui bénéficient d'une remise"),
+    taux_marge_max: Optional[float] = Query(None, description="Taux de marge maximal (0.2 = 20 %)"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Prix d'achat net (remises fournisseur appliquées) et marge de chaque
+    pièce, filtrés par fournisseur, catégorie, remise ou taux de marge.
+    """
+    result = await _current_pricing(db)
+    indices = result.select(
+        fournisseur_id=fournisseur_id, category=category,
+        remise_only=remise_only, taux_marge_max=taux_marge_max, after=page.after
+    )
+
+    if page.format == "ndjson":
+        if page.limit is not None:
+            indices = indices[:page.limit]
+        return StreamingResponse(
+            (dumps(result.row(i)) + b"\n" for i in indices),
+            media_type="application/x-ndjson"
         )
-    return query.all()
+
+    rows = [result.row(i) for i in indices[:page.size]]
+    headers = {NEXT_CURSOR: str(rows[-1]["id"])} if len(indices) > page.size else None
+    return FastJSONResponse(rows, headers=headers)
 
 @router.get(
     "/{piece_id}",
     response_model=schemas.PieceRead
 )
-def get_piece(
+async def get_piece(
     piece_id: int,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
     Récupère une pièce par son ID.
     """
-    piece = db.query(models.Piece).get(piece_id)
-    if not piece:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pièce non trouvée"
-        )
-    return piece
+    return await repo.get_or_404(models.Piece, piece_id)
 
 @router.put(
     "/{piece_id}",
     response_model=schemas.PieceRead
 )
-def update_piece(
+async def update_piece(
     piece_id: int,
     piece_in: schemas.PieceCreate,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
     Met à jour une pièce existante. Vérifie aussi le fournisseur.
     """
-    piece = db.query(models.Piece).get(piece_id)
-    if not piece:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pièce non trouvée"
-        )
-    if not db.query(models.Fournisseur).get(piece_in.fournisseur_id):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fournisseur non trouvé"
-        )
-    for key, value in piece_in.dict().items():
-        setattr(piece, key, value)
-    db.commit()
-    db.refresh(piece)
+    piece = await repo.update(
+        models.Piece, piece_id, piece_in.dict(),
+        refs={models.Fournisseur: piece_in.fournisseur_id}
+    )
+    await repo.commit()
+    publish("piece.updated", id=piece.id, action="updated")
     return piece
 
 @router.delete(
     "/{piece_id}",
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_piece(
+async def delete_piece(
     piece_id: int,
-    db: Session = Depends(get_db)
+    repo: AsyncRepository = Depends(get_async_repo)
 ):
     """
-    Supprime une pièce par son ID.
+    Supprime une pièce par son ID. Les lignes de facture qui la citent la
+    perdent (description et catégorie restent), ses mouvements de stock
+    sont supprimés avec elle.
     """
-    piece = db.query(models.Piece).get(piece_id)
-    if not piece:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pièce non trouvée"
-        )
-    db.delete(piece)
-    db.commit()
+    await repo.db.execute(
+        update(models.FactureLigne)
+        .where(models.FactureLigne.piece_id == piece_id)
+        .values(piece_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await repo.delete(models.Piece, piece_id)
+    await repo.commit()
+    publish("piece.updated", id=piece_id, action="deleted")
     return None
-
-@router.post(
-    "/search",
-    response_model=List[schemas.PieceRead]
-)
-def search_pieces(
-    designation: Optional[str] = None,
-    ref: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    """
-    Recherche de pièces par désignation et/ou référence.
-    """
-    query = db.query(models.Piece)
-    if designation:
-        query = query.filter(models.Piece.designation.ilike(f"%{designation}%"))
-    if ref:
-        query = query.filter(models.Piece.ref.ilike(f"%{ref}%"))
-    return query.all()
@@ -0,0 +1,290 @@
+# backend/routers/planning.py
+
+import time as clock
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+
+from .. import models, scheduling, schemas
+from ..events import publish
+from ..intervals import IntervalTree
+from ..repository import Repository, get_db, get_repo
+from ..serialization import rows_response
+
+router = APIRouter()
+
+def _fin(event):
+    return event.start_datetime + timedelta(minutes=event.duree_minutes or 0)
+
+def events_in_range(db: Session, start: datetime, end: datetime, technician_name: Optional[str] = None):
+    """
+    Événements qui chevauchent [start, end).
+
+    Une intervention dure au plus DUREE_MAX_MINUTES : seuls les événements
+    commençant dans [start - DUREE_MAX_MINUTES, end) peuvent chevaucher la
+    plage. La requête reste donc un parcours borné de l'index
+    (start_datetime, technician_name), jamais de la table entière.
+    """
+    lower = start - timedelta(minutes=schemas.DUREE_MAX_MINUTES)
+    query = (
+        db.query(models.PlanningEvent)
+          .options(selectinload(models.PlanningEvent.client))
+          .filter(
+              models.PlanningEvent.start_datetime >= lower,
+              models.PlanningEvent.start_datetime < end
+          )
+    )
+    if technician_name:
+        query = query.filter(models.PlanningEvent.technician_name == technician_name)
+    events = query.order_by(models.PlanningEvent.start_datetime).all()
+    return [e for e in events if _fin(e) > start]
+
+def find_conflicts(db: Session, event_in: schemas.PlanningEventCreate, exclude_id: Optional[int] = None):
+    """
+    Événements du même technicien qui chevauchent l'intervention proposée.
+
+    Une seule plage est testée : le filtre linéaire sur les quelques
+    événements renvoyés par la requête bornée suffit. Construire un
+    IntervalTree coûterait O(k log k) pour une seule requête ; il ne sert
+    que quand une même construction répond à de nombreuses requêtes
+    (/conflits).
+    """
+    if not event_in.technician_name:
+        return []
+    start = event_in.start_datetime
+    end = start + timedelta(minutes=event_in.duree_minutes)
+    events = events_in_range(db, start, end, event_in.technician_name)
+    return [e for e in events if e.id != exclude_id]
+
+def lock_planning(db: Session, *technician_names: Optional[str]):
+    """
+    Prend, jusqu'au commit, le verrou d'écriture du planning des techniciens
+    donnés : la recherche de chevauchements et l'écriture qui suit ne peuvent
+    pas s'intercaler avec celles d'une autre requête, même d'un autre worker.
+    SQLite : BEGIN IMMEDIATE (verrou en écriture de la base, les autres
+    écrivains attendent dans busy_timeout). PostgreSQL : verrou consultatif
+    de transaction par technicien.
+    """
+    names = sorted({name for name in technician_names if name})
+    if not names:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        connection = db.connection()
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+    elif dialect == "postgresql":
+        for name in names:
+            db.execute(select(func.pg_advisory_xact_lock(func.hashtext(name))))
+
+def _check_conflicts(db: Session, event_in: schemas.PlanningEventCreate, exclude_id: Optional[int] = None):
+    lock_planning(db, event_in.technician_name)
+    conflicts = find_conflicts(db, event_in, exclude_id)
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"{event_in.technician_name} est déjà planifié sur ce créneau "
+                f"(intervention(s) {', '.join(str(e.id) for e in conflicts)})"
+            )
+        )
+
+@router.post(
+    "/",
+    response_model=schemas.PlanningEventRead,
+    status_code=status.HTTP_201_CREATED
+)
+def create_event(
+    event_in: schemas.PlanningEventCreate,
+    repo: Repository = Depends(get_repo)
+):
+    """
+    Planifie une intervention. Refuse un double créneau pour un technicien.
+    """
+    repo.check_refs({models.Client: event_in.client_id})
+    _check_conflicts(repo.db, event_in)
+    event = repo.create(models.PlanningEvent, event_in.dict())
+    repo.commit()
+    publish("planning.changed", id=event.id, action="created", date=event.start_datetime.date())
+    return event
+
+@router.get(
+    "/",
+    response_model=List[schemas.PlanningEventRead]
+)
+def list_events(
+    start_date: date = Query(..., description="Premier jour (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Dernier jour inclus (YYYY-MM-DD)"),
+    technician_name: Optional[str] = Query(None, description="Filtrer par technicien"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retourne les interventions qui chevauchent la période, triées par date.
+    """
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date or start_date, time.min) + timedelta(days=1)
+    return rows_response(events_in_range(db, start, end, technician_name), schemas.PlanningEventRead)
+
+@router.get(
+    "/conflits",
+    response_model=List[schemas.PlanningConflict]
+)
+def list_conflicts(
+    start_date: date = Query(..., description="Premier jour (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Dernier jour inclus (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Liste les doubles réservations de techniciens sur la période
+    (arbre d'intervalles par technicien).
+    """
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date or start_date, time.min) + timedelta(days=1)
+    by_technician = {}
+    for event in events_in_range(db, start, end):
+        if event.technician_name:
+            by_technician.setdefault(event.technician_name, []).append(event)
+
+    conflicts = []
+    for technician_name, events in by_technician.items():
+        tree = IntervalTree((e.start_datetime, _fin(e), e.id) for e in events)
+        for event in events:
+            for other_id in tree.overlapping(event.start_datetime, _fin(event)):
+                if other_id > event.id:
+                    conflicts.append({
+                        "technician_name": technician_name,
+                        "event_id": event.id,
+                        "conflit_avec_id": other_id
+                    })
+    return conflicts
+
+@router.post(
+    "/optimiser",
+    response_model=schemas.PlanningOptimisationResult
+)
+def optimise_planning(
+    params: schemas.PlanningOptimisationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Affecte un technicien aux interventions non planifiées de la période
+    (compétence requise, horaires de travail, créneaux déjà occupés),
+    en équilibrant la charge. Les affectations sont enregistrées en une
+    seule transaction, sauf si dry_run.
+    """
+    start = datetime.combine(params.start_date, time.min)
+    end = datetime.combine(params.end_date or params.start_date, time.min) + timedelta(days=1)
+    techniciens = db.query(models.Technicien).all()
+    if not params.dry_run:
+        # Créneaux lus puis affectés sans qu'une autre écriture s'intercale
+        lock_planning(db, *(scheduling.technicien_label(t) for t in techniciens))
+    events = events_in_range(db, start, end)
+
+    techs = {}
+    for technicien in techniciens:
+        name = scheduling.technicien_label(technicien)
+        techs[name] = scheduling.Tech(
+            name=name,
+            competences=scheduling.parse_competences(technicien.competences),
+            heure_debut=technicien.heure_debut or time(8, 0),
+            heure_fin=technicien.heure_fin or time(18, 0)
+        )
+
+    jobs = []
+    for event in events:
+        if not event.technician_name:
+            if event.start_datetime >= start:
+                jobs.append(scheduling.Job(
+                    id=event.id,
+                    start=event.start_datetime,
+                    end=_fin(event),
+                    competence=event.competence_requise
+                ))
+        elif event.technician_name in techs:
+            # Créneau déjà occupé : compte dans l'agenda et la charge du technicien
+            tech = techs[event.technician_name]
+            tech.agenda.setdefault(event.start_datetime.date(), []).append(
+                (event.start_datetime, _fin(event), -event.id)
+            )
+            tech.charge += event.duree_minutes
+    for tech in techs.values():
+        for day in tech.agenda.values():
+            day.sort()
+
+    t0 = clock.perf_counter()
+    assignment, unassigned, loads = scheduling.schedule(jobs, list(techs.values()))
+    elapsed = (clock.perf_counter() - t0) * 1000
+
+    if assignment and not params.dry_run:
+        db.execute(
+            update(models.PlanningEvent),
+            [{"id": event_id, "technician_name": name} for event_id, name in assignment.items()]
+        )
+        db.commit()
+        publish(
+            "planning.changed", action="optimise",
+            start_date=params.start_date, end_date=params.end_date or params.start_date,
+            affectations=len(assignment)
+        )
+
+    return {
+        "affectations": [
+            {"event_id": event_id, "technician_name": name}
+            for event_id, name in sorted(assignment.items())
+        ],
+        "non_planifiees": sorted(unassigned),
+        "charges": loads,
+        "duree_ms": round(elapsed, 1)
+    }
+
+@router.get(
+    "/{event_id}",
+    response_model=schemas.PlanningEventRead
+)
+def get_event(
+    event_id: int,
+    repo: Repository = Depends(get_repo)
+):
+    """
+    Récupère une intervention par son ID.
+    """
+    return repo.get_or_404(models.PlanningEvent, event_id)
+
+@router.put(
+    "/{event_id}",
+    response_model=schemas.PlanningEventRead
+)
+def update_event(
+    event_id: int,
+    event_in: schemas.PlanningEventCreate,
+    repo: Repository = Depends(get_repo)
+):
+    """
+    Met à jour une intervention existante. Refuse un double créneau.
+    """
+    _check_conflicts(repo.db, event_in, exclude_id=event_id)
+    event = repo.update(
+        models.PlanningEvent, event_id, event_in.dict(),
+        refs={models.Client: event_in.client_id}
+    )
+    repo.commit()
+    publish("planning.changed", id=event.id, action="updated", date=event.start_datetime.date())
+    return event
+
+@router.delete(
+    "/{event_id}",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+def delete_event(
+    event_id: int,
+    repo: Repository = Depends(get_repo)
+):
+    """
+    Supprime une intervention et ses photos (ON DELETE CASCADE) par son ID.
+    """
+    repo.delete(models.PlanningEvent, event_id)
+    repo.commit()
+    publish("planning.changed", id=event_id, action="deleted")
+    return None
@@ -1,19 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, status
 from typing import List
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..cache import cached_response
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/fournisseurs/{fournisseur_id}/remises",
     response_model=schemas.RemiseFournisseurRead,
@@ -22,24 +15,17 @@ def get_db():
 def add_remise(
     fournisseur_id: int,
     data: schemas.RemiseFournisseurCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Ajoute une remise pour une catégorie de pièce associée à un fournisseur.
     """
-    fournisseur = db.query(models.Fournisseur).get(fournisseur_id)
-    if not fournisseur:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Fournisseur non trouvé"
-        )
-    remise = models.RemiseFournisseur(
-        fournisseur_id=fournisseur_id,
-        **data.dict()
+    remise = repo.create(
+        models.RemiseFournisseur,
+        dict(data.dict(), fournisseur_id=fournisseur_id),
+        refs={models.Fournisseur: fournisseur_id}
     )
-    db.add(remise)
-    db.commit()
-    db.refresh(remise)
+    repo.commit()
     return remise
 
 @router.get(
@@ -48,16 +34,20 @@ def add_remise(
 )
 def list_remises(
     fournisseur_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    repo: Repository = Depends(get_repo)
 ):
     """
     Liste toutes les remises d'un fournisseur.
     """
-    return (
-        db
-        .query(models.RemiseFournisseur)
-        .filter_by(fournisseur_id=fournisseur_id)
-        .all()
+    return cached_response(
+        request, models.RemiseFournisseur, schemas.RemiseFournisseurRead,
+        lambda scratch: (
+            repo.db
+            .query(models.RemiseFournisseur)
+            .filter_by(fournisseur_id=fournisseur_id)
+            .all()
+        )
     )
 
 @router.put(
@@ -67,21 +57,13 @@ def list_remises(
 def update_remise(
     remise_id: int,
     data: schemas.RemiseFournisseurCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour une remise existante.
     """
-    remise = db.query(models.RemiseFournisseur).get(remise_id)
-    if not remise:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Remise non trouvée"
-        )
-    remise.piece_category = data.piece_category
-    remise.remise_pourcentage = data.remise_pourcentage
-    db.commit()
-    db.refresh(remise)
+    remise = repo.update(models.RemiseFournisseur, remise_id, data.dict())
+    repo.commit()
     return remise
 
 @router.delete(
@@ -90,17 +72,11 @@ def update_remise(
 )
 def delete_remise(
     remise_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Supprime une remise par son ID.
     """
-    remise = db.query(models.RemiseFournisseur).get(remise_id)
-    if not remise:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Remise non trouvée"
-        )
-    db.delete(remise)
-    db.commit()
+    repo.delete(models.RemiseFournisseur, remise_id)
+    repo.commit()
     return None
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from .. import models, schemas, stock
+from ..events import publish
+from ..pagination import PageParams, paginate_async
+from ..repository import AsyncRepository, get_async_db, get_async_repo
+from ..serialization import rows_response
+
+router = APIRouter()
+
+@router.post(
+    "/mouvements",
+    response_model=schemas.MouvementStockRead,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_mouvement(
+    mouvement_in: schemas.MouvementStockCreate,
+    repo: AsyncRepository = Depends(get_async_repo)
+):
+    """
+    Enregistre une entrée, une sortie ou un ajustement de stock et met à
+    jour le stock de la pièce dans la même transaction.
+    """
+    data = mouvement_in.dict()
+    data["quantite"] = stock.signed(mouvement_in.type, mouvement_in.quantite)
+    mouvement = await repo.create(
+        models.MouvementStock, data,
+        refs={models.Piece: mouvement_in.piece_id}
+    )
+    await repo.db.run_sync(stock.apply_deltas, {mouvement.piece_id: mouvement.quantite})
+    await repo.commit()
+    publish("piece.updated", id=mouvement.piece_id, action="stock")
+    return mouvement
+
+@router.get(
+    "/mouvements",
+    response_model=List[schemas.MouvementStockRead]
+)
+async def list_mouvements(
+    response: Response,
+    piece_id: Optional[int] = Query(None, description="Mouvements d'une seule pièce"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Journal des mouvements de stock, du plus ancien au plus récent.
+    """
+    stmt = select(models.MouvementStock)
+    if piece_id is not None:
+        stmt = stmt.where(models.MouvementStock.piece_id == piece_id)
+    return await paginate_async(db, stmt, models.MouvementStock.id, schemas.MouvementStockRead, page, response)
+
+@router.get(
+    "/alertes",
+    response_model=List[schemas.StockAlerte]
+)
+async def stock_alertes(
+    fournisseur_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Pièces dont le stock est au niveau ou sous le seuil d'alerte, les plus
+    en manque d'abord.
+    """
+    rows = (await db.scalars(stock.alertes_stmt(fournisseur_id).limit(limit))).all()
+    return rows_response(rows, schemas.StockAlerte)
@@ -1,19 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from typing import List, Optional
 
 from .. import models, schemas
-from ..database import SessionLocal
+from ..cache import cached_response
+from ..pagination import PageParams, page_rows, paginate
+from ..repository import Repository, get_repo
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post(
     "/",
     response_model=schemas.TechnicienRead,
@@ -21,15 +15,13 @@ def get_db():
 )
 def create_technicien(
     technicien_in: schemas.TechnicienCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Crée un nouveau technicien.
     """
-    technicien = models.Technicien(**technicien_in.dict())
-    db.add(technicien)
-    db.commit()
-    db.refresh(technicien)
+    technicien = repo.create(models.Technicien, technicien_in.dict())
+    repo.commit()
     return technicien
 
 @router.get(
@@ -37,16 +29,24 @@ def create_technicien(
     response_model=List[schemas.TechnicienRead]
 )
 def list_techniciens(
+    request: Request,
+    response: Response,
     q: Optional[str] = Query(None, description="Recherche par nom du technicien"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    repo: Repository = Depends(get_repo)
 ):
     """
     Retourne tous les techniciens, filtrés facultativement par nom.
     """
-    query = db.query(models.Technicien)
+    query = repo.db.query(models.Technicien)
     if q:
         query = query.filter(models.Technicien.nom.ilike(f"%{q}%"))
-    return query.all()
+    if page.format == "ndjson":
+        return paginate(query, models.Technicien.id, schemas.TechnicienRead, page, response)
+    return cached_response(
+        request, models.Technicien, schemas.TechnicienRead,
+        lambda scratch: page_rows(query, models.Technicien.id, page, scratch)
+    )
 
 @router.get(
     "/{technicien_id}",
@@ -54,18 +54,16 @@ def list_techniciens(
 )
 def get_technicien(
     technicien_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    repo: Repository = Depends(get_repo)
 ):
     """
     Récupère un technicien par son ID.
     """
-    technicien = db.query(models.Technicien).get(technicien_id)
-    if not technicien:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Technicien non trouvé"
-        )
-    return technicien
+    return cached_response(
+        request, models.Technicien, schemas.TechnicienRead,
+        lambda scratch: repo.get_or_404(models.Technicien, technicien_id)
+    )
 
 @router.put(
     "/{technicien_id}",
@@ -74,21 +72,13 @@ def get_technicien(
 def update_technicien(
     technicien_id: int,
     data: schemas.TechnicienCreate,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Met à jour un technicien existant.
     """
-    technicien = db.query(models.Technicien).get(technicien_id)
-    if not technicien:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Technicien non trouvé"
-        )
-    for key, value in data.dict().items():
-        setattr(technicien, key, value)
-    db.commit()
-    db.refresh(technicien)
+    technicien = repo.update(models.Technicien, technicien_id, data.dict())
+    repo.commit()
     return technicien
 
 @router.delete(
@@ -97,17 +87,11 @@ def update_technicien(
 )
 def delete_technicien(
     technicien_id: int,
-    db: Session = Depends(get_db)
+    repo: Repository = Depends(get_repo)
 ):
     """
     Supprime un technicien par son ID.
     """
-    technicien = db.query(models.Technicien).get(technicien_id)
-    if not technicien:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Technicien non trouvé"
-        )
-    db.delete(technicien)
-    db.commit()
+    repo.delete(models.Technicien, technicien_id)
+    repo.commit()
     return None
@@ -0,0 +1,177 @@
+# backend/scheduling.py
+
+import time as clock
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import datetime, time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Budget de temps de la recherche locale (secondes)
+LOCAL_SEARCH_BUDGET = 0.3
+
+
+@dataclass
+class Job:
+    id: int
+    start: datetime
+    end: datetime
+    competence: Optional[str] = None
+
+    @property
+    def minutes(self) -> float:
+        return (self.end - self.start).total_seconds() / 60
+
+
+@dataclass
+class Tech:
+    name: str
+    competences: FrozenSet[str] = frozenset()
+    heure_debut: time = time(8, 0)
+    heure_fin: time = time(18, 0)
+    # Créneaux déjà occupés (interventions existantes), par jour : [(début, fin, job_id)]
+    agenda: Dict = field(default_factory=dict)
+    charge: float = 0.0
+
+
+def technicien_label(technicien) -> str:
+    """
+    Nom sous lequel un technicien apparaît dans PlanningEvent.technician_name.
+    """
+    return f"{technicien.prenom} {technicien.nom}".strip()
+
+
+def parse_competences(value: Optional[str]) -> FrozenSet[str]:
+    return frozenset(c.strip().lower() for c in (value or "").split(",") if c.strip())
+
+
+class Planner:
+    """
+    Affectation de techniciens à des interventions à horaire fixe.
+
+    1. Glouton : les interventions les plus contraintes (peu de techniciens
+       compétents, longue durée) d'abord, chacune au technicien compétent,
+       disponible et le moins chargé.
+    2. Recherche locale : déplacements du technicien le plus chargé vers un
+       moins chargé, puis éjection (libérer un créneau en déplaçant une
+       intervention) pour placer celles restées sans technicien.
+    """
+
+    def __init__(self, techs: List[Tech]):
+        self.techs = {t.name: t for t in techs}
+        self.assignment: Dict[int, str] = {}
+        self.jobs: Dict[int, Job] = {}
+
+    # -- contraintes ---------------------------------------------------------
+
+    def _skilled(self, tech: Tech, job: Job) -> bool:
+        return not job.competence or job.competence.lower() in tech.competences
+
+    def _in_hours(self, tech: Tech, job: Job) -> bool:
+        if job.end.date() != job.start.date() and job.end.time() != time(0, 0):
+            return False
+        end_time = job.end.time() if job.end.date() == job.start.date() else time.max
+        return tech.heure_debut <= job.start.time() and end_time <= tech.heure_fin
+
+    def _blocking(self, tech: Tech, job: Job) -> List[int]:
+        """Interventions de `tech` qui chevauchent `job` (agenda trié par début)."""
+        day = tech.agenda.get(job.start.date(), [])
+        # Créneaux qui commencent avant la fin de `job`. Les réservations
+        # existantes peuvent se chevaucher entre elles : les fins ne sont pas
+        # croissantes, tous sont testés (quelques créneaux par jour).
+        return [job_id for _, end, job_id in day[:bisect_left(day, (job.end,))] if end > job.start]
+
+    def _free(self, tech: Tech, job: Job) -> bool:
+        return not self._blocking(tech, job)
+
+    # -- mutations -----------------------------------------------------------
+
+    def _add(self, tech: Tech, job: Job):
+        insort(tech.agenda.setdefault(job.start.date(), []), (job.start, job.end, job.id))
+        tech.charge += job.minutes
+        self.assignment[job.id] = tech.name
+
+    def _remove(self, tech: Tech, job: Job):
+        tech.agenda[job.start.date()].remove((job.start, job.end, job.id))
+        tech.charge -= job.minutes
+        del self.assignment[job.id]
+
+    # -- résolution ----------------------------------------------------------
+
+    def solve(self, jobs: List[Job], budget: float = LOCAL_SEARCH_BUDGET) -> Tuple[Dict[int, str], List[int]]:
+        """
+        Renvoie ({job_id: technicien}, [job_id sans technicien]).
+        """
+        self.jobs = {j.id: j for j in jobs}
+        eligible = {
+            j.id: [t for t in self.techs.values() if self._skilled(t, j) and self._in_hours(t, j)]
+            for j in jobs
+        }
+        order = sorted(jobs, key=lambda j: (len(eligible[j.id]), -j.minutes, j.start))
+        unassigned = []
+        for job in order:
+            for tech in sorted(eligible[job.id], key=lambda t: t.charge):
+                if self._free(tech, job):
+                    self._add(tech, job)
+                    break
+            else:
+                unassigned.append(job.id)
+
+        deadline = clock.perf_counter() + budget
+        unassigned = self._eject(unassigned, eligible, deadline)
+        self._balance(eligible, deadline)
+        return dict(self.assignment), unassigned
+
+    def _balance(self, eligible, deadline):
+        improved = True
+        while improved and clock.perf_counter() < deadline:
+            improved = False
+            for tech in sorted(self.techs.values(), key=lambda t: -t.charge):
+                for job_id in [i for i, name in self.assignment.items() if name == tech.name]:
+                    job = self.jobs[job_id]
+                    for other in sorted(eligible[job_id], key=lambda t: t.charge):
+                        # Déplacement utile seulement s'il réduit la somme des carrés des charges
+                        if other.charge + job.minutes >= tech.charge:
+                            break
+                        if self._free(other, job):
+                            self._remove(tech, job)
+                            self._add(other, job)
+                            improved = True
+                            break
+                if improved or clock.perf_counter() >= deadline:
+                    break
+
+    def _eject(self, unassigned, eligible, deadline):
+        remaining = []
+        for job_id in unassigned:
+            job = self.jobs[job_id]
+            placed = False
+            for tech in eligible[job_id]:
+                if clock.perf_counter() >= deadline:
+                    break
+                blocking = self._blocking(tech, job)
+                if len(blocking) != 1 or blocking[0] not in self.jobs:
+                    continue
+                other_job = self.jobs[blocking[0]]
+                for target in eligible[other_job.id]:
+                    if target is tech or not self._free(target, other_job):
+                        continue
+                    self._remove(tech, other_job)
+                    self._add(target, other_job)
+                    self._add(tech, job)
+                    placed = True
+                    break
+                if placed:
+                    break
+            if not placed:
+                remaining.append(job_id)
+        return remaining
+
+
+def schedule(jobs: List[Job], techs: List[Tech], budget: float = LOCAL_SEARCH_BUDGET):
+    """
+    Calcule une affectation réalisable et équilibrée.
+    Renvoie ({job_id: technicien}, [job_id sans technicien], {technicien: minutes}).
+    """
+    planner = Planner(techs)
+    assignment, unassigned = planner.solve(jobs, budget)
+    return assignment, unassigned, {t.name: t.charge for t in techs}
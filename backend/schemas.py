@@ -1,142 +1,5 @@
-# File: backend/__init__.py
-# This file can be empty to mark the package
-
-# File: backend/database.py
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./ia_gestion.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# File: backend/models.py
-import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
-from .database import Base
-
-class Client(Base):
-    __tablename__ = 'clients'
-    id = Column(Integer, primary_key=True, index=True)
-    nom = Column(String, index=True)
-    prenom = Column(String, nullable=True)
-    telephone = Column(String, nullable=True)
-    email = Column(String, nullable=True)
-    adresse = Column(String, nullable=True)
-    code_postal = Column(String, nullable=True)
-    ville = Column(String, nullable=True)
-    pays = Column(String, nullable=True)
-    factures = relationship('Facture', back_populates='client')
-    planning_events = relationship('PlanningEvent', back_populates='client')
-
-class Fournisseur(Base):
-    __tablename__ = 'fournisseurs'
-    id = Column(Integer, primary_key=True, index=True)
-    nom = Column(String, index=True)
-    contact_person = Column(String, nullable=True)
-    telephone = Column(String, nullable=True)
-    email = Column(String, nullable=True)
-    adresse = Column(String, nullable=True)
-    delai_livraison_moyen = Column(Integer, nullable=True)
-    pieces = relationship('Piece', back_populates='fournisseur')
-    remises = relationship('RemiseFournisseur', back_populates='fournisseur')
-
-class RemiseFournisseur(Base):
-    __tablename__ = 'remises_fournisseur'
-    id = Column(Integer, primary_key=True, index=True)
-    fournisseur_id = Column(Integer, ForeignKey('fournisseurs.id'))
-    piece_category = Column(String, nullable=False)
-    remise_pourcentage = Column(Float, nullable=False)
-    fournisseur = relationship('Fournisseur', back_populates='remises')
-
-class Assureur(Base):
-    __tablename__ = 'assureurs'
-    id = Column(Integer, primary_key=True, index=True)
-    nom = Column(String, index=True)
-    contact_person = Column(String, nullable=True)
-    telephone = Column(String, nullable=True)
-    email = Column(String, nullable=True)
-    adresse = Column(String, nullable=True)
-    delai_paiement_moyen = Column(Integer, nullable=True)
-
-class Expert(Base):
-    __tablename__ = 'experts'
-    id = Column(Integer, primary_key=True, index=True)
-    nom = Column(String, index=True)
-    contact_person = Column(String, nullable=True)
-    telephone = Column(String, nullable=True)
-    email = Column(String, nullable=True)
-    adresse = Column(String, nullable=True)
-    delai_reponse_moyen = Column(Integer, nullable=True)
-
-class Technicien(Base):
-    __tablename__ = 'techniciens'
-    id = Column(Integer, primary_key=True, index=True)
-    nom = Column(String, index=True)
-    prenom = Column(String)
-    adresse = Column(String)
-    code_postal = Column(String)
-    ville = Column(String)
-    date_naissance = Column(DateTime)
-    email = Column(String)
-    telephone = Column(String)
-    numero_technicien = Column(String, unique=True, index=True)
-
-class Piece(Base):
-    __tablename__ = 'pieces'
-    id = Column(Integer, primary_key=True, index=True)
-    designation = Column(String, index=True)
-    ref = Column(String, nullable=True, index=True)
-    prix_achat = Column(Float, nullable=True)
-    prix_vente = Column(Float, nullable=False)
-    category = Column(String, nullable=True)
-    fournisseur_id = Column(Integer, ForeignKey('fournisseurs.id'))
-    fournisseur = relationship('Fournisseur', back_populates='pieces')
-
-class MainDoeuvre(Base):
-    __tablename__ = 'maindoeuvre'
-    id = Column(Integer, primary_key=True, index=True)
-    description = Column(String, index=True)
-    taux_horaire = Column(Float, nullable=False)
-
-class PlanningEvent(Base):
-    __tablename__ = 'planning'
-    id = Column(Integer, primary_key=True, index=True)
-    client_id = Column(Integer, ForeignKey('clients.id'))
-    start_datetime = Column(DateTime, default=datetime.datetime.utcnow)
-    work_description = Column(Text)
-    technician_name = Column(String)
-    car_registration = Column(String)
-    client = relationship('Client', back_populates='planning_events')
-
-class Facture(Base):
-    __tablename__ = 'factures'
-    id = Column(Integer, primary_key=True, index=True)
-    numero_facture = Column(String, unique=True, index=True)
-    client_id = Column(Integer, ForeignKey('clients.id'))
-    date_creation = Column(DateTime, default=datetime.datetime.utcnow)
-    informations_complementaires = Column(Text, nullable=True)
-    client = relationship('Client', back_populates='factures')
-    lignes = relationship('FactureLigne', back_populates='facture', cascade='all, delete')
-
-class FactureLigne(Base):
-    __tablename__ = 'facture_lignes'
-    id = Column(Integer, primary_key=True, index=True)
-    facture_id = Column(Integer, ForeignKey('factures.id'))
-    description = Column(Text)
-    quantite = Column(Float)
-    prix_unitaire_ht = Column(Float)
-    piece_id = Column(Integer, ForeignKey('pieces.id'), nullable=True)
-    facture = relationship('Facture', back_populates='lignes')
-
-# File: backend/schemas.py
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, conint, validator
+from typing import Optional, List, Dict
 import datetime
 
 class ClientBase(BaseModel):
@@ -157,6 +20,41 @@ class ClientRead(ClientBase):
     class Config:
         orm_mode = True
 
+class ClientCorrespondance(BaseModel):
+    client_id: int
+    # Pour reconnaître la fiche sans la relire
+    nom: Optional[str]
+    prenom: Optional[str]
+    telephone: Optional[str]
+    # Probabilité (0 à 1) qu'il s'agisse du même client
+    score: float
+    # Éléments concordants : nom, phonetique, telephone, email, code_postal
+    motifs: List[str]
+
+class ClientDoublonGroupe(BaseModel):
+    # Fiche la plus complète du groupe, proposée pour la fusion
+    principal_id: int
+    doublon_ids: List[int]
+    # Score de la paire la moins ressemblante du groupe
+    score: float
+    motifs: List[str]
+
+class ClientDoublonRapport(BaseModel):
+    groupes: List[ClientDoublonGroupe]
+    clients: int
+    comparaisons: int
+    # Blocs trop grands (nom très courant), non parcourus
+    blocs_ignores: int
+
+class ClientFusion(BaseModel):
+    doublons: List[int]
+
+class ClientFusionResult(BaseModel):
+    client: ClientRead
+    factures: int
+    interventions: int
+    photos: int
+
 class FournisseurBase(BaseModel):
     nom: str
     contact_person: Optional[str]
@@ -228,6 +126,9 @@ class TechnicienBase(BaseModel):
     email: str
     telephone: str
     numero_technicien: str
+    competences: Optional[str] = None
+    heure_debut: datetime.time = datetime.time(8, 0)
+    heure_fin: datetime.time = datetime.time(18, 0)
 
 class TechnicienCreate(TechnicienBase):
     pass
@@ -244,15 +145,31 @@ class PieceBase(BaseModel):
     prix_vente: float
     category: Optional[str]
     fournisseur_id: int
+    # Seuil d'alerte de stock (aucune alerte si absent)
+    stock_minimum: Optional[float] = None
 
 class PieceCreate(PieceBase):
     pass
 
 class PieceRead(PieceBase):
     id: int
+    stock_disponible: float = 0.0
     class Config:
         orm_mode = True
 
+class PiecePricing(BaseModel):
+    id: int
+    designation: str
+    ref: Optional[str]
+    category: Optional[str]
+    fournisseur_id: Optional[int]
+    prix_achat: Optional[float]
+    remise_pourcentage: float
+    prix_achat_net: Optional[float]
+    prix_vente: float
+    marge: Optional[float]
+    taux_marge: Optional[float]
+
 class MainDoeuvreBase(BaseModel):
     description: str
     taux_horaire: float
@@ -265,11 +182,17 @@ class MainDoeuvreRead(MainDoeuvreBase):
     class Config:
         orm_mode = True
 
+# Durée maximale d'une intervention : borne la recherche par plage de dates
+DUREE_MAX_MINUTES = 12 * 60
+
 class PlanningEventBase(BaseModel):
     client_id: int
     start_datetime: datetime.datetime
+    duree_minutes: conint(ge=1, le=DUREE_MAX_MINUTES) = 60
     work_description: str
-    technician_name: str
+    # Vide tant que l'intervention n'est pas affectée (voir /planning/optimiser)
+    technician_name: Optional[str] = None
+    competence_requise: Optional[str] = None
     car_registration: str
 
 class PlanningEventCreate(PlanningEventBase):
@@ -277,9 +200,30 @@ class PlanningEventCreate(PlanningEventBase):
 
 class PlanningEventRead(PlanningEventBase):
     id: int
+    client: Optional[ClientRead]
     class Config:
         orm_mode = True
 
+class PlanningConflict(BaseModel):
+    technician_name: str
+    event_id: int
+    conflit_avec_id: int
+
+class PlanningOptimisationRequest(BaseModel):
+    start_date: datetime.date
+    end_date: Optional[datetime.date]
+    dry_run: bool = False
+
+class PlanningAffectation(BaseModel):
+    event_id: int
+    technician_name: str
+
+class PlanningOptimisationResult(BaseModel):
+    affectations: List[PlanningAffectation]
+    non_planifiees: List[int]
+    charges: Dict[str, float]
+    duree_ms: float
+
 class FactureLigneBase(BaseModel):
     description: str
     quantite: float
@@ -301,7 +245,9 @@ class FactureBase(BaseModel):
     lignes: List[FactureLigneCreate]
 
 class FactureCreate(FactureBase):
-    pass
+    # Absent : numéro suivant de la séquence de l'année, attribué par le
+    # serveur
+    numero_facture: Optional[str] = None
 
 class FactureRead(FactureBase):
     id: int
@@ -310,29 +256,143 @@ class FactureRead(FactureBase):
     class Config:
         orm_mode = True
 
-# File: backend/main.py
-from fastapi import FastAPI
-from .database import engine, Base
-from .routers import (
-    clients, fournisseurs, remises_fournisseur,
-    assureurs, experts, techniciens,
-    pieces, maindoeuvre, planning,
-    factures, comptabilite
-)
-
-app = FastAPI(title="IA Gestion API")
-# Create all tables once
-Base.metadata.create_all(bind=engine)
-
-# Include routers
-app.include_router(clients.router, prefix="/api/clients", tags=["clients"])
-app.include_router(fournisseurs.router, prefix="/api/fournisseurs", tags=["fournisseurs"])
-app.include_router(remises_fournisseur.router, prefix="/api/remises", tags=["remises_fournisseur"])
-app.include_router(assureurs.router, prefix="/api/assureurs", tags=["assureurs"])
-app.include_router(experts.router, prefix="/api/experts", tags=["experts"])
-app.include_router(techniciens.router, prefix="/api/techniciens", tags=["techniciens"])
-app.include_router(pieces.router, prefix="/api/pieces", tags=["pieces"])
-app.include_router(maindoeuvre.router, prefix="/api/maindoeuvre", tags=["maindoeuvre"])
-app.include_router(planning.router, prefix="/api/planning", tags=["planning"])
-app.include_router(factures.router, prefix="/api/factures", tags=["factures"])
-app.include_router(comptabilite.router, prefix="/api/comptabilite", tags=["comptabilite"])
+class FactureBulkError(BaseModel):
+    index: int
+    numero_facture: Optional[str]
+    detail: str
+
+class FactureBulkResult(BaseModel):
+    created: int
+    errors: List[FactureBulkError]
+
+class NumerotationTrou(BaseModel):
+    debut: int
+    fin: int
+
+class NumerotationAudit(BaseModel):
+    annee: int
+    # Dernier numéro attribué selon le compteur
+    compteur: int
+    factures: int
+    premier: Optional[int]
+    dernier: Optional[int]
+    trous: List[NumerotationTrou]
+    doublons: List[int]
+    conforme: bool
+
+class ObjectifCABase(BaseModel):
+    libelle: Optional[str] = None
+    date_debut: datetime.date
+    date_fin: datetime.date
+    montant: float
+    # Périmètre : aucun des deux = CA global
+    categorie: Optional[str] = None
+    fournisseur_id: Optional[int] = None
+
+    @validator("date_fin")
+    def fin_apres_debut(cls, date_fin, values):
+        if "date_debut" in values and date_fin < values["date_debut"]:
+            raise ValueError("date_fin doit être postérieure ou égale à date_debut")
+        return date_fin
+
+class ObjectifCACreate(ObjectifCABase):
+    pass
+
+class ObjectifCARead(ObjectifCABase):
+    id: int
+    realise: float
+    class Config:
+        orm_mode = True
+
+class ObjectifCAProgression(BaseModel):
+    objectif: ObjectifCARead
+    realise: float
+    reste: float
+    taux: Optional[float]
+    jours_ecoules: int
+    jours_total: int
+    # CA attendu en fin de période au rythme actuel
+    projection: Optional[float]
+
+TYPES_MOUVEMENT = ("entree", "sortie", "ajustement")
+
+class MouvementStockBase(BaseModel):
+    piece_id: int
+    type: str
+    # Entrée et sortie : quantité positive ; ajustement : écart signé
+    # (inventaire)
+    quantite: float
+    commentaire: Optional[str] = None
+
+    @validator("type")
+    def type_connu(cls, type):
+        if type not in TYPES_MOUVEMENT:
+            raise ValueError(f"type doit être l'un de : {', '.join(TYPES_MOUVEMENT)}")
+        return type
+
+    @validator("quantite")
+    def quantite_valide(cls, quantite, values):
+        if values.get("type") == "ajustement":
+            if quantite == 0:
+                raise ValueError("un ajustement ne peut pas être nul")
+        elif quantite <= 0:
+            raise ValueError("la quantité doit être positive")
+        return quantite
+
+class MouvementStockCreate(MouvementStockBase):
+    pass
+
+class MouvementStockRead(BaseModel):
+    id: int
+    piece_id: int
+    type: str
+    # Signée : négative pour une sortie
+    quantite: float
+    date: datetime.datetime
+    facture_ligne_id: Optional[int]
+    commentaire: Optional[str]
+    class Config:
+        orm_mode = True
+
+class StockAlerte(BaseModel):
+    id: int
+    designation: str
+    ref: Optional[str]
+    fournisseur_id: Optional[int]
+    stock_disponible: float
+    stock_minimum: float
+    class Config:
+        orm_mode = True
+
+class PhotoRead(BaseModel):
+    id: int
+    sha256: str
+    media_type: str
+    taille: int
+    largeur: Optional[int]
+    hauteur: Optional[int]
+    nom_fichier: Optional[str]
+    date_creation: datetime.datetime
+    client_id: Optional[int]
+    facture_id: Optional[int]
+    planning_event_id: Optional[int]
+    class Config:
+        orm_mode = True
+
+class AnalyseCreate(BaseModel):
+    photo_id: int
+
+class AnalyseResultat(BaseModel):
+    modele: str
+    # Probabilité par type de dégât
+    scores: Dict[str, float]
+    degats: bool
+
+class AnalyseJob(BaseModel):
+    id: str
+    photo_id: int
+    # en_attente, termine ou erreur
+    statut: str
+    date_creation: datetime.datetime
+    resultat: Optional[AnalyseResultat] = None
+    erreur: Optional[str] = None
@@ -0,0 +1,210 @@
+# backend/search.py
+
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import func, literal_column, or_, and_, select, table, column, union_all
+from sqlalchemy.exc import OperationalError
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Index plein texte FTS5 par table : colonnes indexées et poids bm25.
+# Tables "external content" : le texte n'est pas dupliqué, seuls les
+# index inversés sont stockés ; des triggers les tiennent à jour.
+FTS_INDEXES = {
+    "pieces_fts": {
+        "table": "pieces",
+        "columns": ("designation", "ref", "category"),
+        "weights": (10.0, 8.0, 1.0),
+    },
+    "clients_fts": {
+        "table": "clients",
+        "columns": ("nom", "prenom", "email", "telephone", "ville"),
+        "weights": (10.0, 5.0, 3.0, 3.0, 1.0),
+    },
+    "factures_fts": {
+        "table": "factures",
+        "columns": ("numero_facture", "informations_complementaires"),
+        "weights": (10.0, 1.0),
+    },
+}
+
+# remove_diacritics 2 : é/è/ê sont repliés sur e, "ecrou" trouve "écrou".
+# prefix : index de préfixes de 2 et 3 caractères pour la recherche à la frappe.
+FTS_OPTIONS = "tokenize = \"unicode61 remove_diacritics 2\", prefix = '2 3'"
+
+_fts_enabled = False
+
+
+def init_search(engine):
+    """
+    Crée les tables FTS5 et leurs triggers de synchronisation (idempotent).
+    Un index nouvellement créé est reconstruit à partir des données existantes.
+    Sans SQLite ou sans FTS5, la recherche retombe sur ILIKE.
+    """
+    global _fts_enabled
+    if engine.dialect.name != "sqlite":
+        _fts_enabled = False
+        return
+    try:
+        with engine.begin() as conn:
+            for name, spec in FTS_INDEXES.items():
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+                ).first()
+                for statement in _fts_ddl(name, spec):
+                    conn.exec_driver_sql(statement)
+                if not exists:
+                    conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+    except OperationalError as exc:
+        logger.warning("FTS5 indisponible, recherche en mode ILIKE : %s", exc)
+        _fts_enabled = False
+        return
+    _fts_enabled = True
+
+
+def _fts_ddl(name, spec):
+    src = spec["table"]
+    cols = ", ".join(spec["columns"])
+    new_vals = ", ".join(f"new.{c}" for c in spec["columns"])
+    old_vals = ", ".join(f"old.{c}" for c in spec["columns"])
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+        f"{cols}, content = '{src}', content_rowid = 'id', {FTS_OPTIONS})",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {src} BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {src} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        # Réindexe seulement si une colonne indexée change : pas pour les
+        # écritures de stock_disponible ou des clés de déduplication.
+        # Recréé à chaque démarrage : remplace l'ancien trigger sur toute
+        # mise à jour des bases existantes.
+        f"DROP TRIGGER IF EXISTS {name}_au",
+        f"CREATE TRIGGER {name}_au AFTER UPDATE OF {cols} ON {src} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def _tokens(q: str):
+    return re.findall(r"\w+", q or "")
+
+
+def match_expression(q: str, column: Optional[str] = None) -> Optional[str]:
+    """
+    Traduit la saisie utilisateur en requête FTS5 : chaque mot devient un
+    préfixe entre guillemets ("plaq"* "av"*), les mots sont combinés en ET.
+    Avec `column`, la recherche est limitée à cette colonne de l'index.
+    """
+    tokens = _tokens(q)
+    if not tokens:
+        return None
+    expr = " ".join(f'"{t}"*' for t in tokens)
+    if column:
+        return f"{column} : ({expr})"
+    return expr
+
+
+def _match(name, expr):
+    return literal_column(name).op("MATCH")(expr)
+
+
+def _ranked_ids(name, expr):
+    fts = table(name, column("rowid"))
+    weights = FTS_INDEXES[name]["weights"]
+    return (
+        select(
+            fts.c.rowid.label("id"),
+            func.bm25(literal_column(name), *weights).label("score")
+        )
+        .where(_match(name, expr))
+    )
+
+
+def _ilike_filter(q, columns):
+    return and_(*[
+        or_(*[col.ilike(f"%{token}%") for col in columns])
+        for token in _tokens(q)
+    ])
+
+
+def _criteria(model, columns, q, fields):
+    """
+    Combine la recherche libre `q` (sur `columns`) et les recherches par
+    colonne `fields` en une expression FTS5 et son équivalent ILIKE.
+    """
+    exprs, clauses = [], []
+    if _tokens(q):
+        exprs.append(match_expression(q))
+        clauses.append(_ilike_filter(q, columns))
+    for name, value in fields.items():
+        if _tokens(value):
+            exprs.append(match_expression(value, name))
+            clauses.append(_ilike_filter(value, [getattr(model, name)]))
+    if not exprs:
+        return None, None
+    return " AND ".join(exprs), and_(*clauses)
+
+
+def filter_match(query, model, columns, q: Optional[str] = None, **fields):
+    """
+    Restreint `query` aux lignes de `model` correspondant à la recherche, sans
+    imposer d'ordre (compatible avec la pagination keyset sur l'ID).
+    `columns` sert au mode dégradé ILIKE.
+    """
+    expr, fallback = _criteria(model, columns, q, fields)
+    if expr is None:
+        return query
+    if not _fts_enabled:
+        return query.filter(fallback)
+    name = f"{model.__tablename__}_fts"
+    fts = table(name, column("rowid"))
+    return query.filter(model.id.in_(select(fts.c.rowid).where(_match(name, expr))))
+
+
+def rank_match(query, model, columns, q: Optional[str] = None, **fields):
+    """
+    Restreint `query` aux lignes correspondant à la recherche, triées par
+    pertinence bm25 (par ID en mode dégradé ILIKE).
+    """
+    expr, fallback = _criteria(model, columns, q, fields)
+    if expr is None:
+        return query
+    if not _fts_enabled:
+        return query.filter(fallback).order_by(model.id)
+    ranked = _ranked_ids(f"{model.__tablename__}_fts", expr).subquery()
+    # L'ID départage les scores égaux : l'ordre reste stable d'une page à l'autre
+    return query.join(ranked, ranked.c.id == model.id).order_by(ranked.c.score, model.id)
+
+
+def rank_factures(query, q: str):
+    """
+    Recherche de factures par numéro ou par nom du client, triées par bm25 :
+    les correspondances sur le numéro et sur le client sont fusionnées et
+    chaque facture garde son meilleur score.
+    """
+    expr = match_expression(q)
+    if expr is None:
+        return query
+    if not _fts_enabled:
+        return (
+            # Jointure externe : une facture sans client reste trouvable par son numéro
+            query.outerjoin(models.Client, models.Client.id == models.Facture.client_id)
+                 .filter(_ilike_filter(q, [models.Facture.numero_facture, models.Client.nom]))
+                 .order_by(models.Facture.id.desc())
+        )
+    by_client = _ranked_ids("clients_fts", expr).subquery()
+    hits = union_all(
+        _ranked_ids("factures_fts", expr),
+        select(models.Facture.id.label("id"), by_client.c.score)
+        .join(by_client, by_client.c.id == models.Facture.client_id)
+    ).subquery()
+    best = (
+        select(hits.c.id, func.min(hits.c.score).label("score"))
+        .group_by(hits.c.id)
+        .subquery()
+    )
+    return query.join(best, best.c.id == models.Facture.id).order_by(best.c.score)
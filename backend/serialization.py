@@ -0,0 +1,89 @@
+# backend/serialization.py
+"""
+Sérialisation JSON rapide des listes d'objets ORM.
+
+Le chemin standard de FastAPI valide chaque ligne renvoyée contre le
+response_model (pydantic orm_mode), la repasse dans jsonable_encoder puis
+dans json.dumps. Pour des lignes qui sortent de la base, cette validation
+ne vérifie rien : rows_response() lit directement les attributs listés par
+le schéma (sous-schémas et listes de sous-schémas compris) et encode avec
+orjson, qui gère nativement datetime, date et time.
+
+Le response_model des endpoints reste déclaré pour la documentation
+OpenAPI ; renvoyer une Response fait sauter la validation.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encodée avec orjson (json de la bibliothèque standard à
+    défaut).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _is_model(type_) -> bool:
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema) -> Callable[[Any], dict]:
+    """
+    Fonction objet ORM -> dict pour `schema`, construite une fois par schéma.
+    Les schémas dont un champ n'est ni simple ni une liste retombent sur
+    schema.from_orm().
+    """
+    fields = []
+    for field in schema.__fields__.values():
+        nested = row_serializer(field.type_) if _is_model(field.type_) else None
+        if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST) or (nested is None and field.shape == SHAPE_LIST):
+            return lambda row: schema.from_orm(row).dict()
+        fields.append((field.name, field.alias, field.default, field.shape, nested))
+
+    def serialize(row) -> dict:
+        data = {}
+        for name, alias, default, shape, nested in fields:
+            value = getattr(row, alias, default)
+            if nested is not None and value is not None:
+                value = [nested(v) for v in value] if shape == SHAPE_LIST else nested(value)
+            data[name] = value
+        return data
+
+    return serialize
+
+
+def serialize_rows(rows: Iterable, schema) -> list:
+    serialize = row_serializer(schema)
+    return [serialize(row) for row in rows]
+
+
+def rows_response(rows: Iterable, schema, headers: Optional[dict] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    Réponse JSON d'une liste d'objets ORM, sans validation pydantic ligne
+    à ligne.
+    """
+    return FastJSONResponse(serialize_rows(rows, schema), status_code=status_code, headers=headers)
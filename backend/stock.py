@@ -0,0 +1,196 @@
+# backend/stock.py
+"""
+Stock des pièces : journal des mouvements (mouvements_stock) et quantité
+disponible matérialisée (pieces.stock_disponible).
+
+Chaque mouvement est ajouté au journal et son delta appliqué au compteur
+de la pièce dans la même transaction : lire le stock d'une pièce est une
+lecture de colonne. Les ventes (lignes de facture avec pièce) sortent du
+stock à la création de la facture, et y rentrent à sa suppression
+(mouvement d'annulation : le journal n'est jamais modifié, sauf le lien
+des sorties vers les lignes supprimées, remis à NULL par la clé étrangère
+ON DELETE SET NULL pour qu'il ne désigne pas la ligne d'une autre facture
+qui reprendrait son ID).
+
+Les alertes de seuil (stock_disponible <= stock_minimum) sont lues sur
+l'index ix_pieces_stock_ecart, sans parcourir le catalogue.
+
+Le journal fait foi : rebuild() recalcule tous les compteurs en une
+requête, verify() liste les écarts.
+    python -m backend.stock rebuild
+    python -m backend.stock verify
+"""
+
+import datetime
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Écart toléré entre compteur et journal (cumul de flottants)
+VERIFY_TOLERANCE = 1e-6
+
+SIGNS = {"entree": 1, "sortie": -1, "ajustement": 1}
+
+
+def signed(type: str, quantite: float) -> float:
+    return SIGNS[type] * quantite
+
+
+def record_mouvements(db: Session, mouvements: List[dict]):
+    """
+    Ajoute des mouvements au journal (executemany) et applique leurs deltas
+    aux compteurs. Chaque mouvement : piece_id, type, quantite (signée),
+    et facultativement facture_ligne_id, commentaire, date.
+    """
+    if not mouvements:
+        return
+    now = datetime.datetime.utcnow()
+    db.execute(insert(models.MouvementStock), [
+        {"facture_ligne_id": None, "commentaire": None, "date": now, **m} for m in mouvements
+    ])
+    deltas = defaultdict(float)
+    for m in mouvements:
+        deltas[m["piece_id"]] += m["quantite"]
+    apply_deltas(db, deltas)
+
+
+def apply_deltas(db: Session, deltas: Dict[int, float]):
+    """
+    Ajoute chaque delta {piece_id: quantité} au stock de sa pièce, en une
+    requête UPDATE exécutée pour toutes les pièces (executemany).
+    """
+    deltas = [{"pid": piece_id, "delta": delta} for piece_id, delta in deltas.items() if delta]
+    if not deltas:
+        return
+    piece = models.Piece.__table__
+    db.execute(
+        update(piece)
+        .where(piece.c.id == bindparam("pid"))
+        .values(stock_disponible=piece.c.stock_disponible + bindparam("delta")),
+        deltas
+    )
+
+
+def record_ventes(db: Session, lignes: Iterable[Tuple[int, Optional[int], float]], annulation: Optional[str] = None):
+    """
+    Sort du stock les pièces vendues sur des lignes de facture
+    (ligne_id, piece_id, quantite). Avec `annulation` (numéro de facture
+    supprimée), les remet en stock à la place ; la suppression des lignes
+    détache ensuite leurs sorties (ON DELETE SET NULL).
+    """
+    mouvements = []
+    for ligne_id, piece_id, quantite in lignes:
+        if piece_id is None or not quantite:
+            continue
+        if annulation is None:
+            mouvements.append({
+                "piece_id": piece_id, "type": "sortie", "quantite": -quantite,
+                "facture_ligne_id": ligne_id,
+            })
+        else:
+            # La ligne va être supprimée : le lien n'est pas gardé
+            mouvements.append({
+                "piece_id": piece_id, "type": "entree", "quantite": quantite,
+                "commentaire": f"Annulation facture {annulation}",
+            })
+    record_mouvements(db, mouvements)
+
+
+def record_factures(db: Session, facture_ids: Iterable[int]):
+    """
+    Sorties de stock de toutes les lignes des factures `facture_ids`
+    (import en masse, où les ID de ligne ne sont connus qu'après insertion).
+    """
+    ligne = models.FactureLigne
+    record_ventes(db, db.execute(
+        select(ligne.id, ligne.piece_id, ligne.quantite)
+        .where(ligne.facture_id.in_(list(facture_ids)), ligne.piece_id.isnot(None))
+    ).all())
+
+
+def alertes_stmt(fournisseur_id: Optional[int] = None):
+    """
+    Pièces sous leur seuil, les plus en manque d'abord (parcours de
+    ix_pieces_stock_ecart).
+    """
+    stmt = (
+        select(models.Piece)
+        .where(models.STOCK_ECART <= 0)
+        .order_by(models.STOCK_ECART, models.Piece.id)
+    )
+    if fournisseur_id is not None:
+        stmt = stmt.where(models.Piece.fournisseur_id == fournisseur_id)
+    return stmt
+
+
+def ledger_totals():
+    """
+    Sous-requête corrélée : somme du journal pour la pièce courante.
+    """
+    mouvement = models.MouvementStock
+    return (
+        select(func.coalesce(func.sum(mouvement.quantite), 0.0))
+        .where(mouvement.piece_id == models.Piece.id)
+        .scalar_subquery()
+    )
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recalcule tous les compteurs depuis le journal. Renvoie le nombre de
+    pièces.
+    """
+    result = db.execute(
+        update(models.Piece)
+        .values(stock_disponible=ledger_totals())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def verify(db: Session):
+    """
+    Compare les compteurs au journal. Renvoie les pièces divergentes
+    (piece_id, stocké, attendu).
+    """
+    return [
+        (piece_id, got, want)
+        for piece_id, got, want in db.execute(
+            select(models.Piece.id, models.Piece.stock_disponible, ledger_totals())
+        )
+        if abs(got - want) > VERIFY_TOLERANCE
+    ]
+
+
+def main(argv=None):
+    from .database import SessionLocal, engine, sync_schema
+
+    args = sys.argv[1:] if argv is None else argv
+    command = args[0] if args else "verify"
+    sync_schema(engine)
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"{rebuild(db)} compteurs de stock reconstruits")
+        elif command == "verify":
+            mismatches = verify(db)
+            for piece_id, got, want in mismatches:
+                print(f"pièce {piece_id} : stocké {got}, journal {want}")
+            print(f"{len(mismatches)} pièce(s) divergente(s)")
+            return 1 if mismatches else 0
+        else:
+            print("usage : python -m backend.stock [rebuild|verify]")
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# benchmarks/db_concurrency.py
+"""
+Débit lectures/écritures concurrentes sur un fichier SQLite : configuration
+d'origine (journal rollback, sans pragmas) contre make_engine (WAL,
+synchronous=NORMAL, mmap, cache, busy_timeout, QueuePool).
+Chaque lecteur/écrivain est un processus, comme des workers uvicorn.
+
+    python -m benchmarks.db_concurrency [lecteurs] [écrivains] [secondes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, selectinload
+
+from backend import database, models
+
+NB_CLIENTS = 200
+NB_FACTURES = 5000
+
+
+def legacy_engine(url):
+    # Configuration d'origine de database.py
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def build_engine(config, url):
+    return legacy_engine(url) if config == "origine" else database.make_engine(url)
+
+
+def seed(config, path):
+    url = f"sqlite:///{path}"
+    engine = build_engine(config, url)
+    database.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(models.Client(nom=f"Client {i}") for i in range(NB_CLIENTS))
+        db.flush()
+        for i in range(NB_FACTURES):
+            facture = models.Facture(numero_facture=f"SEED-{i}", client_id=1 + i % NB_CLIENTS)
+            facture.lignes = [
+                models.FactureLigne(description="Main d'oeuvre", quantite=1, prix_unitaire_ht=55.0),
+                models.FactureLigne(description="Pièce", quantite=2, prix_unitaire_ht=18.5),
+            ]
+            db.add(facture)
+        db.commit()
+    engine.dispose()
+    return url
+
+
+def reader(config, url, duration):
+    engine = build_engine(config, url)
+    ops = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            with Session(engine) as db:
+                # Dernières factures avec leurs lignes, puis un total comptable
+                db.query(models.Facture).options(selectinload(models.Facture.lignes)) \
+                  .order_by(models.Facture.id.desc()).limit(50).all()
+                db.query(func.sum(models.FactureLigne.quantite * models.FactureLigne.prix_unitaire_ht)).scalar()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    return "lecture", ops, errors
+
+
+def writer(config, url, duration, worker_id):
+    engine = build_engine(config, url)
+    ops = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            # Même séquence que create_facture : client, facture, commit, lignes, commit
+            with Session(engine) as db:
+                client = db.get(models.Client, 1 + ops % NB_CLIENTS)
+                facture = models.Facture(numero_facture=f"W{worker_id}-{ops}-{errors}", client_id=client.id)
+                db.add(facture)
+                db.commit()
+                db.add(models.FactureLigne(
+                    facture_id=facture.id, description="Vidange", quantite=1, prix_unitaire_ht=79.0
+                ))
+                db.commit()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    return "écriture", ops, errors
+
+
+def run(config, nb_readers, nb_writers, duration):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = seed(config, os.path.join(tmp, "bench.db"))
+        with ProcessPoolExecutor(max_workers=nb_readers + nb_writers) as pool:
+            futures = [pool.submit(reader, config, url, duration) for _ in range(nb_readers)]
+            futures += [pool.submit(writer, config, url, duration, i) for i in range(nb_writers)]
+            results = [f.result() for f in futures]
+    totals = {}
+    for kind, ops, errors in results:
+        done, failed = totals.get(kind, (0, 0))
+        totals[kind] = (done + ops, failed + errors)
+    for kind, (ops, errors) in totals.items():
+        print(f"{config:<8} {kind:<9} {ops / duration:9.1f} op/s   {errors} 'database is locked'")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    nb_readers = int(args[0]) if args else 4
+    nb_writers = int(args[1]) if len(args) > 1 else 2
+    duration = float(args[2]) if len(args) > 2 else 5.0
+    print(f"{nb_readers} lecteurs, {nb_writers} écrivains, {duration:.0f} s")
+    for config in ("origine", "wal"):
+        run(config, nb_readers, nb_writers, duration)
+
+
+if __name__ == "__main__":
+    main()
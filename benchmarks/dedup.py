@@ -0,0 +1,200 @@
+# benchmarks/dedup.py
+"""
+Déduplication des clients sur une base synthétique : des clients uniques
+et des doublons bruités (faute de frappe, nom homophone, téléphone ou
+e-mail écrit autrement, nom et prénom inversés, code postal absent).
+
+Mesure le calcul des clés, le rapport complet (rapport()), la
+vérification à la création (candidates(), p50/p99) et la qualité
+(précision et rappel par paire de doublons).
+
+    python -m benchmarks.dedup [clients]
+"""
+
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from itertools import combinations
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backend import database, dedup, models
+
+NOMS = [
+    "Martin", "Bernard", "Thomas", "Petit", "Robert", "Richard", "Durand", "Dubois", "Moreau", "Laurent",
+    "Simon", "Michel", "Lefebvre", "Leroy", "Roux", "David", "Bertrand", "Morel", "Fournier", "Girard",
+    "Bonnet", "Dupont", "Lambert", "Fontaine", "Rousseau", "Vincent", "Muller", "Lefevre", "Faure", "Andre",
+    "Mercier", "Blanc", "Guerin", "Boyer", "Garnier", "Chevalier", "Francois", "Legrand", "Gauthier", "Garcia",
+    "Perrin", "Robin", "Clement", "Morin", "Nicolas", "Henry", "Roussel", "Mathieu", "Gautier", "Masson",
+    "Marchand", "Duval", "Denis", "Dumont", "Marie", "Lemaire", "Noel", "Meyer", "Dufour", "Meunier",
+    "Brun", "Blanchard", "Giraud", "Joly", "Riviere", "Lucas", "Brunet", "Gaillard", "Barbier", "Arnaud",
+    "Martinez", "Gerard", "Roche", "Renard", "Schmitt", "Roy", "Leroux", "Colin", "Vidal", "Caron",
+]
+PRENOMS = [
+    "Jean", "Pierre", "Michel", "André", "Philippe", "Alain", "Bernard", "Jacques", "Daniel", "Christian",
+    "Marie", "Nathalie", "Isabelle", "Sylvie", "Catherine", "Françoise", "Christine", "Monique", "Valérie",
+    "Sophie", "Nicolas", "Julien", "Thomas", "Lucas", "Hugo", "Léa", "Manon", "Camille", "Chloé", "Emma",
+    "Louis", "Gabriel", "Arthur", "Jules", "Paul", "Inès", "Sarah", "Laura", "Julie", "Céline",
+]
+HOMOPHONES = {"t": "d", "d": "t", "s": "x", "ph": "f", "y": "i", "ai": "e", "au": "o", "c": "k"}
+NB_CODES_POSTAUX = 5000
+PART_DOUBLONS = 0.1
+NB_VERIFICATIONS = 1000
+
+
+def _typo(rng, word):
+    i = rng.randrange(1, len(word))
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1 and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice("aeiou") + word[i:]
+
+
+def _homophone(rng, word):
+    options = [k for k in HOMOPHONES if k in word.lower()]
+    if not options:
+        return word
+    key = rng.choice(options)
+    lower = word.lower()
+    i = lower.rindex(key)
+    return (word[:i] + HOMOPHONES[key] + word[i + len(key):]).capitalize()
+
+
+def _phone_format(rng, digits):
+    # digits : 0612345678
+    return rng.choice([
+        " ".join(digits[i:i + 2] for i in range(0, 10, 2)),
+        ".".join(digits[i:i + 2] for i in range(0, 10, 2)),
+        "+33 " + digits[1] + " " + " ".join(digits[i:i + 2] for i in range(2, 10, 2)),
+        "+33" + digits[1:],
+        "0033" + digits[1:],
+    ]) if rng.random() < 0.9 else digits
+
+
+def unique_client(rng, i):
+    nom, prenom = rng.choice(NOMS), rng.choice(PRENOMS)
+    client = {
+        "nom": nom, "prenom": prenom,
+        "code_postal": f"{rng.randrange(NB_CODES_POSTAUX) * 19 + 1000:05d}",
+        "ville": "Ville", "telephone": None, "email": None,
+    }
+    if rng.random() < 0.8:
+        client["telephone"] = f"0{rng.choice('67')}{i:08d}"
+    if rng.random() < 0.6:
+        client["email"] = f"{dedup.fold(prenom).replace(' ', '')}.{nom.lower()}{i}@exemple.fr"
+    return client
+
+
+def noisy_copy(rng, client):
+    copy = dict(client)
+    for _ in range(rng.randint(1, 2)):
+        kind = rng.randrange(6)
+        if kind == 0:
+            copy["nom"] = _typo(rng, copy["nom"])
+        elif kind == 1:
+            copy["nom"] = _homophone(rng, copy["nom"])
+        elif kind == 2 and copy["telephone"]:
+            copy["telephone"] = _phone_format(rng, client["telephone"])
+        elif kind == 3 and copy["email"]:
+            copy["email"] = copy["email"].upper()
+        elif kind == 4:
+            copy["nom"], copy["prenom"] = copy["prenom"], copy["nom"]
+        else:
+            copy["code_postal"] = None
+            copy["ville"] = None
+    return copy
+
+
+def generate(count: int, rng):
+    """
+    Clients à insérer (dans l'ordre des id) et groupes de vrais doublons
+    (listes d'id).
+    """
+    clients, truth = [], []
+    originals = []
+    while len(clients) < count:
+        if originals and rng.random() < PART_DOUBLONS:
+            source_id = rng.choice(originals)
+            clients.append(noisy_copy(rng, clients[source_id - 1]))
+            truth[source_id].append(len(clients))
+        else:
+            clients.append(unique_client(rng, len(clients)))
+            originals.append(len(clients))
+            truth.extend([None] * (len(clients) + 1 - len(truth)))
+            truth[len(clients)] = [len(clients)]
+    return clients, [group for group in truth if group and len(group) > 1]
+
+
+def pairs(groups):
+    return {pair for group in groups for pair in combinations(sorted(group), 2)}
+
+
+def seed(engine, clients, batch: int = 20000):
+    with Session(engine) as db:
+        for i in range(0, len(clients), batch):
+            db.execute(insert(models.Client), clients[i:i + batch])
+        db.commit()
+
+
+def _maxrss() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    count = int(args[0]) if args else 500_000
+    rng = random.Random(0)
+    clients, truth = generate(count, rng)
+    probes = [
+        noisy_copy(rng, rng.choice(clients)) if i % 2 else unique_client(rng, count + i)
+        for i in range(NB_VERIFICATIONS)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.make_engine(f"sqlite:///{os.path.join(tmp, 'dedup.db')}")
+        database.Base.metadata.create_all(bind=engine)
+        seed(engine, clients)
+        print(f"{count} clients, {len(truth)} groupes de vrais doublons "
+              f"(mémoire après génération {_maxrss():.0f} Mo)")
+
+        with Session(engine) as db:
+            start = time.perf_counter()
+            dedup.fill_keys(db)
+            print(f"  clés calculées          {time.perf_counter() - start:6.1f} s")
+
+            start = time.perf_counter()
+            result = dedup.rapport(db)
+            elapsed = time.perf_counter() - start
+            print(f"  rapport                 {elapsed:6.1f} s  ({result['comparaisons']} comparaisons "
+                  f"au lieu de {count * (count - 1) // 2}, {result['blocs_ignores']} bloc(s) ignoré(s))")
+
+            found = pairs([g["principal_id"]] + g["doublon_ids"] for g in result["groupes"])
+            expected = pairs(truth)
+            correct = len(found & expected)
+            print(f"  précision {correct / max(1, len(found)):.3f}  rappel {correct / max(1, len(expected)):.3f}  "
+                  f"({len(result['groupes'])} groupes trouvés)")
+
+            latencies = []
+            for probe in probes:
+                start = time.perf_counter()
+                dedup.candidates(db, probe)
+                latencies.append(time.perf_counter() - start)
+            print(f"  vérification à la création  p50 {percentile(latencies, 0.50) * 1000:.2f} ms  "
+                  f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+        engine.dispose()
+    print(f"  mémoire max {_maxrss():.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/export.py
+"""
+Débit de l'export colonnaire (lignes/s) : export complet d'une base
+synthétique, puis export incrémental après l'ajout de nouvelles factures.
+
+    python -m benchmarks.export [factures] [parquet|arrow]
+"""
+
+import datetime
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from backend import database, export, models
+
+NB_CLIENTS = 500
+NB_PIECES = 2000
+LIGNES_PAR_FACTURE = 4
+
+
+def add_factures(engine, first: int, count: int, rng, batch: int = 5000):
+    start = datetime.datetime(2023, 1, 1)
+    for offset in range(first, first + count, batch):
+        _add_batch(engine, offset, min(batch, first + count - offset), start, rng)
+
+
+def _add_batch(engine, first, count, start, rng):
+    with Session(engine) as db:
+        for i in range(first, first + count):
+            facture = models.Facture(
+                numero_facture=f"EX-{i:07d}", client_id=1 + i % NB_CLIENTS,
+                date_creation=start + datetime.timedelta(minutes=7 * i)
+            )
+            facture.lignes = [
+                models.FactureLigne(
+                    description="Pièce" if j else "Main-d'œuvre", quantite=1 + j, prix_unitaire_ht=20.0 + j,
+                    piece_id=rng.randint(1, NB_PIECES) if j else None
+                )
+                for j in range(LIGNES_PAR_FACTURE)
+            ]
+            db.add(facture)
+        db.commit()
+
+
+def seed(url: str, nb_factures: int):
+    engine = database.make_engine(url)
+    database.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with Session(engine) as db:
+        db.add_all(models.Fournisseur(nom=f"Fournisseur {i}") for i in range(20))
+        db.add_all(models.Client(nom=f"Client {i}") for i in range(NB_CLIENTS))
+        db.flush()
+        db.add_all(
+            models.Piece(
+                designation=f"Pièce {i}", ref=f"REF-{i}", prix_achat=8.0, prix_vente=10.0 + i % 90,
+                category=f"cat{i % 12}", fournisseur_id=1 + i % 20
+            )
+            for i in range(NB_PIECES)
+        )
+        db.commit()
+    add_factures(engine, 0, nb_factures, rng)
+    return engine, rng
+
+
+def export_process(url, dest, fmt):
+    engine = database.make_engine(url)
+    with Session(engine) as db:
+        start = time.perf_counter()
+        result = export.export_lignes(db, dest, fmt)
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return result, elapsed
+
+
+def run(url, dest, fmt):
+    # Processus séparé : sa mémoire maximale est celle de l'export seul
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(export_process, url, dest, fmt).result()
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    nb_factures = int(args[0]) if args else 50_000
+    fmt = args[1] if len(args) > 1 else "parquet"
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'export.db')}"
+        engine, rng = seed(url, nb_factures)
+        dest = os.path.join(tmp, "exports")
+
+        result, elapsed = run(url, dest, fmt)
+        print(f"complet      {result['lignes']:>8} lignes en {elapsed:6.2f} s : {result['lignes'] / elapsed:>9.0f} lignes/s")
+        add_factures(engine, nb_factures, nb_factures // 50, rng)
+        result, elapsed = run(url, dest, fmt)
+        print(f"incrémental  {result['lignes']:>8} lignes en {elapsed:6.2f} s : {result['lignes'] / elapsed:>9.0f} lignes/s")
+        result, elapsed = run(url, dest, fmt)
+        print(f"sans nouveauté {result['lignes']:>6} lignes en {elapsed:6.3f} s")
+
+        partitions = [d for d in os.listdir(dest) if d.startswith("mois=")]
+        print(f"{len(partitions)} partitions mensuelles, {dir_size(dest) / 1e6:.1f} Mo ({fmt})")
+        print(f"mémoire max de l'export : {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} Mo")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/inference.py
+"""
+Débit de l'analyse des photos (images/s) avec le modèle StubModel :
+- modèle seul, images déjà décodées : un appel par image contre des lots ;
+- de bout en bout (décodage + modèle) : une inférence par demande, comme
+  un appel du modèle dans chaque requête HTTP, contre la file de
+  micro-batching de inference.py (toutes les demandes soumises ensemble).
+
+    python -m benchmarks.inference [images]
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from backend import inference
+
+BATCH_SIZES = (1, 8, 32)
+
+
+def synthetic_photos(root: str, count: int):
+    # Taille d'une miniature (320 px), celle que lit l'analyse
+    paths = []
+    for i in range(count):
+        image = Image.linear_gradient("L").resize((320, 240)).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        x = 7 * i % 180
+        draw.ellipse((x, 40, x + 60 + 11 * i % 80, 180), fill=(i * 37 % 255, 80, 160))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        path = os.path.join(root, f"{i}.jpg")
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+        paths.append(path)
+    return paths
+
+
+def bench_model(model, count: int):
+    rng = np.random.default_rng(0)
+    images = rng.random((count,) + model.input_size + (3,), dtype=np.float32)
+    print(f"Modèle seul ({count} images décodées)")
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            model.predict(images[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"  lots de {batch_size:<3}            {count / elapsed:8.1f} images/s")
+
+
+def bench_unbatched(model, paths):
+    start = time.perf_counter()
+    for path in paths:
+        model.predict(inference.load_image(path, model.input_size)[np.newaxis])
+    return len(paths) / (time.perf_counter() - start)
+
+
+async def _submit_all(queue, paths):
+    return await asyncio.gather(*[queue.submit(str(i), path) for i, path in enumerate(paths)])
+
+
+def bench_queue(model, paths, max_batch: int):
+    queue = inference.InferenceQueue(model, max_batch=max_batch)
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(_submit_all(queue, paths))
+        elapsed = time.perf_counter() - start
+    finally:
+        queue.shutdown()
+    assert len(results) == len(paths)
+    return len(paths) / elapsed, queue.images / queue.batches
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    count = int(args[0]) if args else 256
+    model = inference.StubModel()
+    bench_model(model, count)
+    with tempfile.TemporaryDirectory() as root:
+        paths = synthetic_photos(root, count)
+        print(f"De bout en bout ({count} miniatures 320x240, {inference.INFERENCE_WORKERS} workers)")
+        unbatched = bench_unbatched(model, paths)
+        print(f"  une inférence par demande  {unbatched:8.1f} images/s")
+        for max_batch in BATCH_SIZES:
+            rate, mean_batch = bench_queue(model, paths, max_batch)
+            print(f"  file, lots <= {max_batch:<3}         {rate:8.1f} images/s  "
+                  f"(lot moyen {mean_batch:.1f}, x{rate / unbatched:.1f})")
+
+
+if __name__ == "__main__":
+    main()
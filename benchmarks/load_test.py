@@ -0,0 +1,165 @@
+# benchmarks/load_test.py
+"""
+Test de charge HTTP : N clients concurrents envoient un mélange de
+consultations rapides (pièce, facture, recherche client) et d'agrégats
+comptables, puis les latences p50/p99 sont données par endpoint.
+
+Sans --url, une base temporaire est remplie et l'API est démarrée avec
+uvicorn dans un sous-processus.
+
+    python -m benchmarks.load_test [--clients 200] [--requests 20] [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy.orm import Session
+
+from backend import database, models
+
+NB_CLIENTS = 500
+NB_PIECES = 2000
+NB_FACTURES = 5000
+
+# (libellé, poids, chemin) : majorité de consultations rapides
+WORKLOAD = [
+    ("piece", 4, lambda rng: f"/api/pieces/{rng.randint(1, NB_PIECES)}"),
+    ("facture", 3, lambda rng: f"/api/factures/{rng.randint(1, NB_FACTURES)}"),
+    ("recherche client", 2, lambda rng: f"/api/clients/search?q=Client {rng.randint(1, NB_CLIENTS)}"),
+    ("ca-par-categorie", 1, lambda rng: "/api/comptabilite/ca-par-categorie"),
+    ("depenses-par-fournisseur", 1, lambda rng: "/api/comptabilite/depenses-par-fournisseur"),
+]
+
+
+def seed(url: str):
+    engine = database.make_engine(url)
+    database.Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with Session(engine) as db:
+        db.add_all(models.Fournisseur(nom=f"Fournisseur {i}") for i in range(20))
+        db.add_all(models.Client(nom=f"Client {i}", prenom="Test") for i in range(NB_CLIENTS))
+        db.flush()
+        db.add_all(
+            models.Piece(
+                designation=f"Pièce {i}", ref=f"REF-{i}", prix_vente=10.0 + i % 90,
+                category=f"cat{i % 12}", fournisseur_id=1 + i % 20
+            )
+            for i in range(NB_PIECES)
+        )
+        db.flush()
+        for i in range(NB_FACTURES):
+            facture = models.Facture(numero_facture=f"LT-{i:06d}", client_id=1 + i % NB_CLIENTS)
+            facture.lignes = [
+                models.FactureLigne(
+                    description="Pièce", quantite=1 + j, prix_unitaire_ht=20.0,
+                    piece_id=rng.randint(1, NB_PIECES)
+                )
+                for j in range(3)
+            ]
+            db.add(facture)
+        db.commit()
+    engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(tmp: str) -> (subprocess.Popen, str):
+    db_url = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+    seed(db_url)
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=db_url, PDF_CACHE_DIR=os.path.join(tmp, "pdf_cache"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("le serveur n'a pas démarré")
+
+
+async def client_loop(http, rng, nb_requests, latencies, errors):
+    labels = [w[0] for w in WORKLOAD]
+    weights = [w[1] for w in WORKLOAD]
+    paths = {w[0]: w[2] for w in WORKLOAD}
+    for _ in range(nb_requests):
+        label = rng.choices(labels, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = await http.get(paths[label](rng))
+            if response.status_code >= 500:
+                errors[label] = errors.get(label, 0) + 1
+        except httpx.HTTPError:
+            errors[label] = errors.get(label, 0) + 1
+        latencies.setdefault(label, []).append(time.perf_counter() - start)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(base_url, nb_clients, nb_requests):
+    latencies, errors = {}, {}
+    limits = httpx.Limits(max_connections=nb_clients, max_keepalive_connections=nb_clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        await http.get("/api/comptabilite/ca-mensuel")
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client_loop(http, random.Random(i), nb_requests, latencies, errors)
+            for i in range(nb_clients)
+        ])
+        elapsed = time.perf_counter() - start
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{nb_clients} clients x {nb_requests} requêtes : {total / elapsed:.0f} req/s")
+    print(f"{'endpoint':<26} {'n':>6} {'p50 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+    for label, values in sorted(latencies.items()):
+        print(
+            f"{label:<26} {len(values):>6} {percentile(values, 0.50) * 1000:>9.1f} "
+            f"{percentile(values, 0.99) * 1000:>9.1f} {errors.get(label, 0):>8}"
+        )
+    everything = [v for values in latencies.values() for v in values]
+    print(f"{'total':<26} {len(everything):>6} {percentile(everything, 0.50) * 1000:>9.1f} "
+          f"{percentile(everything, 0.99) * 1000:>9.1f} {sum(errors.values()):>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requêtes par client")
+    parser.add_argument("--url", help="API déjà démarrée (sinon base temporaire + uvicorn)")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        asyncio.run(run(args.url, args.clients, args.requests))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url = start_server(tmp)
+        try:
+            asyncio.run(run(base_url, args.clients, args.requests))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/numerotation.py
+"""
+Test de charge de la numérotation des factures : N postes créent des
+factures sans numéro en même temps (POST /api/factures/), pendant que des
+imports en masse réservent des blocs de numéros. Vérifie ensuite que
+chaque numéro est unique et que l'audit (GET /api/factures/numerotation/audit)
+ne trouve ni trou ni doublon.
+
+Sans --url, une base temporaire est créée et l'API démarrée avec uvicorn
+dans un sous-processus.
+
+    python -m benchmarks.numerotation [--clients 50] [--factures 20] [--imports 2] [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+LIGNES = [{"description": "Main-d'œuvre", "quantite": 1, "prix_unitaire_ht": 45.0, "piece_id": None}]
+FACTURES_PAR_IMPORT = 200
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(tmp: str) -> (subprocess.Popen, str):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'numerotation.db')}",
+        PDF_CACHE_DIR=os.path.join(tmp, "pdf_cache")
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("le serveur n'a pas démarré")
+
+
+async def creator(http, client_id, nb_factures, latencies, numeros, errors):
+    for _ in range(nb_factures):
+        start = time.perf_counter()
+        response = await http.post("/api/factures/", json={"client_id": client_id, "lignes": LIGNES})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 201:
+            numeros.append(response.json()["numero_facture"])
+        else:
+            errors.append(response.status_code)
+
+
+async def importer(http, client_id, errors):
+    response = await http.post(
+        "/api/factures/bulk",
+        json=[{"client_id": client_id, "lignes": LIGNES} for _ in range(FACTURES_PAR_IMPORT)]
+    )
+    if response.status_code != 200 or response.json()["created"] != FACTURES_PAR_IMPORT:
+        errors.append(response.status_code)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(base_url, nb_clients, nb_factures, nb_imports) -> bool:
+    latencies, numeros, errors = [], [], []
+    limits = httpx.Limits(max_connections=nb_clients + nb_imports)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        client_id = (await http.post("/api/clients/", json={"nom": "Client charge"})).json()["id"]
+        before = {a["annee"]: a["compteur"] for a in (await http.get("/api/factures/numerotation/audit")).json()}
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[creator(http, client_id, nb_factures, latencies, numeros, errors) for _ in range(nb_clients)],
+            *[importer(http, client_id, errors) for _ in range(nb_imports)]
+        )
+        elapsed = time.perf_counter() - start
+        audit = (await http.get("/api/factures/numerotation/audit")).json()
+
+    created = len(numeros) + nb_imports * FACTURES_PAR_IMPORT
+    print(f"{nb_clients} postes x {nb_factures} factures + {nb_imports} imports de {FACTURES_PAR_IMPORT}")
+    print(f"  {created / elapsed:.0f} factures/s  p50 {percentile(latencies, 0.50) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  erreurs {len(errors)}")
+    allocated = sum(a["compteur"] - before.get(a["annee"], 0) for a in audit)
+    unique = len(set(numeros)) == len(numeros)
+    print(f"  numéros attribués {allocated} pour {created} factures, uniques : {'oui' if unique else 'NON'}")
+    for entry in audit:
+        print(f"  {entry['annee']} : {entry['factures']} factures, compteur {entry['compteur']}, "
+              f"trous {entry['trous']}, doublons {entry['doublons']}, "
+              f"{'conforme' if entry['conforme'] else 'NON CONFORME'}")
+    return not errors and unique and allocated == created and all(a["conforme"] for a in audit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--factures", type=int, default=20, help="factures par poste")
+    parser.add_argument("--imports", type=int, default=2, help="imports en masse simultanés")
+    parser.add_argument("--url", help="API déjà démarrée (sinon base temporaire + uvicorn)")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        ok = asyncio.run(run(args.url, args.clients, args.factures, args.imports))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            server, base_url = start_server(tmp)
+            try:
+                ok = asyncio.run(run(base_url, args.clients, args.factures, args.imports))
+            finally:
+                server.terminate()
+                server.wait()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/pdf_engines.py
+"""
+Compare les moteurs de rendu de factures sur des données synthétiques.
+
+    python -m benchmarks.pdf_engines [nombre_de_factures]
+"""
+
+import sys
+import time
+from datetime import datetime
+
+from backend import pdf
+
+
+def synthetic_snapshot(i: int, nb_lignes: int = 25) -> dict:
+    return {
+        "numero_facture": f"BENCH-{i:06d}",
+        "date_creation": datetime(2024, 1, 1, 9, 30).isoformat(),
+        "informations_complementaires": "Véhicule restitué lavé.\nGarantie 12 mois.",
+        "client": {
+            "nom": "Dupré", "prenom": "Hélène", "adresse": "3 rue des Lilas",
+            "code_postal": "06000", "ville": "Nice",
+        },
+        "lignes": [
+            {"description": f"Pièce {j}", "quantite": 1 + j % 3, "prix_unitaire_ht": 12.5 + j}
+            for j in range(nb_lignes)
+        ],
+    }
+
+
+def _parse_each_time(snapshot):
+    # Ancien fonctionnement supposé : environnement et gabarit rechargés à chaque requête
+    pdf._template = None
+    return pdf.render_html(snapshot)
+
+
+def bench(label, func, snapshots):
+    start = time.perf_counter()
+    for snapshot in snapshots:
+        func(snapshot)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<38} {elapsed / len(snapshots) * 1000:8.2f} ms/facture  {len(snapshots) / elapsed:8.1f} factures/s")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    count = int(args[0]) if args else 200
+    snapshots = [synthetic_snapshot(i) for i in range(count)]
+
+    bench("canvas (reportlab)", pdf.render_canvas, snapshots)
+    if pdf.engine_available("html"):
+        bench("html, gabarit analysé à chaque fois", _parse_each_time, snapshots)
+        pdf.init_templates()
+        bench("html, gabarit compilé en cache", pdf.render_html, snapshots)
+    else:
+        print("jinja2 non installé : moteur html ignoré")
+    if pdf.engine_available("template"):
+        bench("template -> PDF (WeasyPrint)", pdf.render_template_pdf, snapshots[:max(1, count // 10)])
+    else:
+        print("WeasyPrint indisponible : conversion HTML -> PDF ignorée")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/photos.py
+"""
+Débit du stockage des photos :
+- réception : corps multipart de photos 4032x3024 (12 Mpx) fourni par
+  morceaux de 64 Kio, analysé et écrit sur disque en flux (Mo/s), avec le
+  pic de mémoire Python (tracemalloc) ;
+- variantes (web, miniature) : séquentiel dans un seul processus contre
+  le pool de processus de photos.py (images/s).
+
+    python -m benchmarks.photos [photos]
+"""
+
+import asyncio
+import io
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image
+
+from backend import photos
+
+CHUNK = 64 * 1024
+BOUNDARY = "----benchmark-photos"
+
+
+def synthetic_jpeg(seed: int) -> bytes:
+    # Bruit sur un dégradé : taille proche d'une vraie photo de téléphone
+    rng = random.Random(seed)
+    image = Image.radial_gradient("L").resize((4032, 3024)).convert("RGB")
+    noise = Image.effect_noise((4032, 3024), rng.uniform(30, 60)).convert("RGB")
+    image = Image.blend(image, noise, 0.5)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def multipart_body(files) -> bytes:
+    parts = []
+    for i, data in enumerate(files):
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="f{i}"; filename="photo{i}.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode() + data + b"\r\n"
+        )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunks(body: bytes):
+    for start in range(0, len(body), CHUNK):
+        yield body[start:start + CHUNK]
+
+
+def bench_upload(body: bytes, count: int):
+    content_type = f"multipart/form-data; boundary={BOUNDARY}"
+    tracemalloc.start()
+    start = time.perf_counter()
+    stored = asyncio.run(photos.receive_multipart(chunks(body), content_type))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(stored) == count
+    print(f"Réception : {count} photos, {len(body) / 1e6:.1f} Mo")
+    print(f"  {len(body) / 1e6 / elapsed:8.1f} Mo/s  ({elapsed * 1000:.0f} ms)  pic mémoire {peak / 1e6:.1f} Mo")
+    return stored
+
+
+def targets(sha256: str, suffix: str):
+    return {name: photos.variant_path(sha256, name) + suffix for name in photos.VARIANTES}
+
+
+def bench_variants(stored):
+    sources = [photos.object_path(item.sha256) for item in stored]
+
+    start = time.perf_counter()
+    for item, source in zip(stored, sources):
+        photos.render_variants(source, targets(item.sha256, ".seq"))
+    sequential = time.perf_counter() - start
+
+    executor = photos.get_executor()
+    # Démarrage des processus hors mesure
+    list(executor.map(abs, range(photos.PHOTO_WORKERS)))
+    start = time.perf_counter()
+    list(executor.map(
+        photos.render_variants, sources, [targets(item.sha256, ".pool") for item in stored]
+    ))
+    pooled = time.perf_counter() - start
+    photos.shutdown()
+
+    count = len(stored)
+    print(f"Variantes ({', '.join(photos.VARIANTES)}) : {count} photos")
+    print(f"  séquentiel            {count / sequential:8.1f} images/s")
+    print(f"  pool ({photos.PHOTO_WORKERS} processus)    {count / pooled:8.1f} images/s  (x{sequential / pooled:.1f})")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    count = int(args[0]) if args else 16
+    with tempfile.TemporaryDirectory() as root:
+        photos.PHOTOS_DIR = root
+        # Contenus distincts : pas de déduplication pendant la mesure
+        files = [synthetic_jpeg(seed) for seed in range(count)]
+        stored = bench_upload(multipart_body(files), count)
+        bench_variants(stored)
+
+
+if __name__ == "__main__":
+    main()
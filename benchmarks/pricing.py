@@ -0,0 +1,79 @@
+# benchmarks/pricing.py
+"""
+Mesure le moteur de prix (remises fournisseur) sur un catalogue synthétique,
+comparé à une boucle Python ligne par ligne.
+
+    python -m benchmarks.pricing [pièces] [fournisseurs]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from backend import pricing
+
+CATEGORIES = ["Freinage", "Filtration", "Allumage", "Distribution", "Éclairage", "Pneumatique",
+              "Embrayage", "Échappement", "Suspension", "Climatisation", "Batterie", "Carrosserie"]
+
+
+def synthetic(nb_pieces: int, nb_fournisseurs: int, seed: int = 42):
+    rng = random.Random(seed)
+    pieces = []
+    for i in range(1, nb_pieces + 1):
+        prix_achat = round(rng.uniform(2, 400), 2) if rng.random() < 0.95 else None
+        pieces.append((
+            i, f"Pièce {i}", f"REF-{i}", rng.choice(CATEGORIES + [None]),
+            rng.randint(1, nb_fournisseurs), prix_achat, round((prix_achat or 50) * rng.uniform(1.0, 1.8), 2)
+        ))
+    remises = []
+    for fournisseur_id in range(1, nb_fournisseurs + 1):
+        for category in rng.sample(CATEGORIES, 4):
+            remises.append((len(remises) + 1, fournisseur_id, category.upper(), rng.choice([5, 10, 15, 20])))
+    return pieces, remises
+
+
+def naive(pieces, remises):
+    table = {}
+    for _, fournisseur_id, category, pourcentage in sorted(remises):
+        table[(fournisseur_id, pricing.normalize_category(category))] = pourcentage
+    nets = []
+    for _, _, _, category, fournisseur_id, prix_achat, _ in pieces:
+        remise = table.get((fournisseur_id, pricing.normalize_category(category)), 0.0)
+        nets.append(None if prix_achat is None else round(prix_achat * (1 - remise / 100), 2))
+    return nets
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    nb_pieces = int(args[0]) if args else 500_000
+    nb_fournisseurs = int(args[1]) if len(args) > 1 else 200
+    pieces, remises = synthetic(nb_pieces, nb_fournisseurs)
+
+    catalogue, t_catalogue = timed(pricing.Catalogue, pieces)
+    table, t_table = timed(pricing.DiscountTable, remises)
+    result, t_apply = timed(pricing.Pricing, catalogue, table)
+    selected, t_select = timed(lambda: result.select(remise_only=True, taux_marge_max=0.2))
+    nets, t_naive = timed(naive, pieces, remises)
+
+    expected = np.array([np.nan if n is None else n for n in nets])
+    # Arrondis au demi-centime près : np.round et round() peuvent différer d'un centime
+    assert np.allclose(result.prix_achat_net, expected, atol=0.011, rtol=0, equal_nan=True), \
+        "écart avec la boucle Python"
+    print(f"{nb_pieces} pièces, {len(table)} remises")
+    print(f"  chargement catalogue   {t_catalogue:8.0f} ms (au changement de Piece)")
+    print(f"  table de remises       {t_table:8.1f} ms (au changement de RemiseFournisseur)")
+    print(f"  application NumPy      {t_apply:8.1f} ms")
+    print(f"  filtre                 {t_select:8.1f} ms ({len(selected)} pièces)")
+    print(f"  boucle Python          {t_naive:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
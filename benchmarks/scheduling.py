@@ -0,0 +1,96 @@
+# benchmarks/scheduling.py
+"""
+Mesure l'optimiseur de planning sur une semaine synthétique.
+
+    python -m benchmarks.scheduling [interventions] [techniciens]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from backend import scheduling
+
+COMPETENCES = ["mecanique", "carrosserie", "electricite", "diagnostic", "climatisation"]
+
+
+def synthetic_week(nb_jobs: int, nb_techs: int, seed: int = 42):
+    rng = random.Random(seed)
+    monday = datetime(2024, 1, 8)
+    techs = [
+        scheduling.Tech(
+            name=f"Technicien {i}",
+            competences=frozenset(rng.sample(COMPETENCES, rng.randint(1, 3)))
+        )
+        for i in range(nb_techs)
+    ]
+    jobs = []
+    for i in range(nb_jobs):
+        day = monday + timedelta(days=rng.randrange(5))
+        duree = rng.choice([30, 45, 60, 60, 90, 120])
+        # Départ au quart d'heure, fin au plus tard à 18h
+        latest = (18 * 60 - duree - 8 * 60) // 15
+        start = day + timedelta(minutes=8 * 60 + 15 * rng.randint(0, latest))
+        jobs.append(scheduling.Job(
+            id=i,
+            start=start,
+            end=start + timedelta(minutes=duree),
+            competence=rng.choice(COMPETENCES) if rng.random() < 0.6 else None
+        ))
+    return jobs, techs
+
+
+def check(jobs, techs, assignment):
+    """
+    Vérifie compétences, horaires et absence de chevauchement.
+    """
+    by_tech = {t.name: t for t in techs}
+    jobs_by_id = {j.id: j for j in jobs}
+    planner = scheduling.Planner(techs)
+    slots = {}
+    for job_id, name in assignment.items():
+        job, tech = jobs_by_id[job_id], by_tech[name]
+        assert planner._skilled(tech, job), f"compétence manquante pour {job_id}"
+        assert planner._in_hours(tech, job), f"hors horaires pour {job_id}"
+        slots.setdefault(name, []).append((job.start, job.end))
+    for intervals in slots.values():
+        intervals.sort()
+        for (_, end), (start, _) in zip(intervals, intervals[1:]):
+            assert end <= start, "chevauchement"
+
+
+def peak_concurrency(jobs) -> int:
+    """
+    Nombre maximal d'interventions simultanées : au-delà du nombre de
+    techniciens, certaines ne peuvent pas être planifiées.
+    """
+    events = sorted([(j.start, 1) for j in jobs] + [(j.end, -1) for j in jobs])
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    nb_jobs = int(args[0]) if args else 2000
+    nb_techs = int(args[1]) if len(args) > 1 else 50
+    jobs, techs = synthetic_week(nb_jobs, nb_techs)
+
+    start = time.perf_counter()
+    assignment, unassigned, loads = scheduling.schedule(jobs, techs)
+    elapsed = time.perf_counter() - start
+
+    fresh_jobs, fresh_techs = synthetic_week(nb_jobs, nb_techs)
+    check(fresh_jobs, fresh_techs, assignment)
+    charges = sorted(loads.values())
+    print(f"{nb_jobs} interventions, {nb_techs} techniciens : {elapsed * 1000:.0f} ms")
+    print(f"  affectées        {len(assignment)}")
+    print(f"  non planifiées   {len(unassigned)} (pic de {peak_concurrency(fresh_jobs)} interventions simultanées)")
+    print(f"  charge min/max   {charges[0]:.0f} / {charges[-1]:.0f} min")
+
+
+if __name__ == "__main__":
+    main()
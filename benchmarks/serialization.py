@@ -0,0 +1,113 @@
+# benchmarks/serialization.py
+"""
+Compare la sérialisation standard de FastAPI (validation response_model en
+orm_mode, jsonable_encoder, json) au chemin rapide de serialization.py
+(lecture directe des attributs, orjson) sur des listes de pièces et de
+factures, puis mesure la taille sur le réseau brute, gzip et brotli.
+
+Temps CPU du processus (time.process_time), base SQLite en mémoire.
+
+    python -m benchmarks.serialization [lignes]
+"""
+
+import datetime
+import json
+import random
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, selectinload
+
+from backend import compression, models, schemas, serialization
+from backend.database import Base
+
+LIGNES_PAR_FACTURE = 4
+
+
+def populate(session: Session, nb_rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    session.add(models.Fournisseur(id=1, nom="Fournisseur"))
+    session.add(models.Client(id=1, nom="Client"))
+    session.flush()
+    session.execute(models.Piece.__table__.insert(), [
+        {
+            "id": i, "designation": f"Disque de frein ventilé {i}", "ref": f"REF-{i:06d}",
+            "prix_achat": round(rng.uniform(2, 400), 2), "prix_vente": round(rng.uniform(5, 600), 2),
+            "category": rng.choice(["Freinage", "Filtration", "Allumage", None]), "fournisseur_id": 1,
+        }
+        for i in range(1, nb_rows + 1)
+    ])
+    nb_factures = nb_rows // LIGNES_PAR_FACTURE
+    start = datetime.datetime(2024, 1, 1, 8, 0)
+    session.execute(models.Facture.__table__.insert(), [
+        {"id": i, "numero_facture": f"FA-{i:06d}", "client_id": 1,
+         "date_creation": start + datetime.timedelta(minutes=17 * i)}
+        for i in range(1, nb_factures + 1)
+    ])
+    session.execute(models.FactureLigne.__table__.insert(), [
+        {"facture_id": i // LIGNES_PAR_FACTURE + 1, "description": f"Main-d'œuvre et pièces {i}",
+         "quantite": rng.randint(1, 4), "prix_unitaire_ht": round(rng.uniform(5, 300), 2),
+         "piece_id": rng.randint(1, nb_rows)}
+        for i in range(nb_factures * LIGNES_PAR_FACTURE)
+    ])
+    session.commit()
+
+
+def standard(rows, schema) -> bytes:
+    # Ce que fait FastAPI pour un response_model=List[schema]
+    field = create_response_field(name="response", type_=List[schema])
+    value, errors = field.validate(rows, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(jsonable_encoder(value)).body
+
+
+def fast(rows, schema) -> bytes:
+    return serialization.rows_response(rows, schema).body
+
+
+def cpu(fn, *args):
+    start = time.process_time()
+    result = fn(*args)
+    return result, (time.process_time() - start) * 1000
+
+
+def report(label: str, rows, schema):
+    body_standard, t_standard = cpu(standard, rows, schema)
+    body_fast, t_fast = cpu(fast, rows, schema)
+    assert json.loads(body_standard) == json.loads(body_fast), "sorties différentes"
+    gz, t_gzip = cpu(compression.compress, body_fast, "gzip")
+    print(f"{label} : {len(rows)} objets")
+    print(f"  pydantic + json        {t_standard:8.0f} ms CPU")
+    print(f"  chemin rapide          {t_fast:8.0f} ms CPU  (x{t_standard / max(t_fast, 0.001):.1f})")
+    print(f"  brut                   {len(body_fast) / 1024:8.0f} Kio")
+    print(f"  gzip {compression.GZIP_LEVEL}                 {len(gz) / 1024:8.0f} Kio  {t_gzip:6.0f} ms CPU")
+    if compression.brotli is not None:
+        br, t_brotli = cpu(compression.compress, body_fast, "br")
+        print(f"  brotli {compression.BROTLI_QUALITY}               {len(br) / 1024:8.0f} Kio  {t_brotli:6.0f} ms CPU")
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    nb_rows = int(args[0]) if args else 100_000
+    if serialization.orjson is None:
+        print("orjson absent : le chemin rapide utilise json")
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        populate(session, nb_rows)
+        pieces = session.scalars(select(models.Piece).order_by(models.Piece.id)).all()
+        report("Pièces (PieceRead)", pieces, schemas.PieceRead)
+        factures = session.scalars(
+            select(models.Facture).options(selectinload(models.Facture.lignes)).order_by(models.Facture.id)
+        ).all()
+        report(f"Factures (FactureRead, {LIGNES_PAR_FACTURE} lignes chacune)", factures, schemas.FactureRead)
+
+
+if __name__ == "__main__":
+    main()
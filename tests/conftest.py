@@ -0,0 +1,50 @@
+# tests/conftest.py
+"""
+Configuration commune des tests : la base SQLite, le cache PDF et le
+stockage des photos sont placés dans un répertoire temporaire avant
+l'import de l'application (l'engine est créé à l'import).
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+TMP_DIR = tempfile.mkdtemp(prefix="ia_gestion_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'tests.db')}"
+os.environ["PDF_CACHE_DIR"] = os.path.join(TMP_DIR, "pdf_cache")
+os.environ["PHOTOS_DIR"] = os.path.join(TMP_DIR, "photos")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.main import app  # noqa: E402
+
+LIGNES = [
+    {"description": "Main-d'œuvre", "quantite": 1, "prix_unitaire_ht": 45.0, "piece_id": None},
+    {"description": "Plaquettes", "quantite": 2, "prix_unitaire_ht": 30.0, "piece_id": None},
+]
+
+
+@pytest.fixture(scope="session")
+def http():
+    with TestClient(app) as client:
+        yield client
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client_id(http):
+    """
+    Un nouveau client, au nom unique.
+    """
+    response = http.post("/api/clients/", json={"nom": f"Client {uuid.uuid4().hex[:8]}"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def create_facture(http, client_id, lignes=LIGNES, **fields):
+    response = http.post("/api/factures/", json={"client_id": client_id, "lignes": lignes, **fields})
+    assert response.status_code == 201, response.text
+    return response.json()
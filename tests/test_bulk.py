@@ -0,0 +1,120 @@
+# tests/test_bulk.py
+"""
+Import en masse de factures (backend/bulk.py) : erreurs ligne par ligne,
+import NDJSON par lots et transaction unique.
+"""
+
+import json
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from backend import bulk, models
+from backend.database import SessionLocal
+
+from conftest import LIGNES
+
+
+def _numeros(n):
+    prefixe = f"IMP-{uuid.uuid4().hex[:8]}"
+    return [f"{prefixe}-{i}" for i in range(n)]
+
+
+def _ndjson(rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+
+def _post_ndjson(http, rows):
+    return http.post(
+        "/api/factures/bulk", content=_ndjson(rows),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+
+
+def _existantes(numeros):
+    with SessionLocal() as db:
+        return set(db.scalars(
+            select(models.Facture.numero_facture).where(models.Facture.numero_facture.in_(numeros))
+        ))
+
+
+def test_erreurs_ligne_par_ligne(http, client_id):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur import"}).json()["id"]
+    piece_id = http.post("/api/pieces/", json={
+        "designation": "Ampoule", "prix_vente": 4.0, "fournisseur_id": fournisseur_id
+    }).json()["id"]
+    numeros = _numeros(5)
+    avec_piece = [{"description": "Ampoule", "quantite": 2, "prix_unitaire_ht": 4.0, "piece_id": piece_id}]
+    piece_inconnue = [{"description": "?", "quantite": 1, "prix_unitaire_ht": 1.0, "piece_id": 10 ** 9}]
+
+    response = _post_ndjson(http, [
+        {"numero_facture": numeros[0], "client_id": client_id, "lignes": avec_piece},
+        '{"numero_facture": "tronqué',
+        {"numero_facture": numeros[2], "client_id": 10 ** 9, "lignes": LIGNES},
+        "",
+        {"numero_facture": numeros[3], "client_id": client_id, "lignes": piece_inconnue},
+        {"numero_facture": numeros[4], "client_id": client_id, "lignes": LIGNES},
+    ])
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2
+    # Les lignes vides ne comptent pas dans les positions
+    assert [(e["index"], e["numero_facture"]) for e in result["errors"]] == [
+        (1, None), (2, numeros[2]), (3, numeros[3])
+    ]
+    assert result["errors"][0]["detail"].startswith("JSON invalide")
+    assert result["errors"][1]["detail"] == "Client non trouvé"
+    assert result["errors"][2]["detail"] == "Pièce non trouvée"
+    assert _existantes(numeros) == {numeros[0], numeros[4]}
+
+
+def test_tableau_json_invalide(http):
+    response = http.post("/api/factures/bulk", json={"lignes": []})
+    assert response.status_code == 400
+
+
+def test_ndjson_importe_par_lots(http, client_id, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    lots = []
+    add = bulk.BulkImport.add
+    monkeypatch.setattr(bulk.BulkImport, "add", lambda self, rows: lots.append(len(rows)) or add(self, rows))
+    numeros = _numeros(5)
+
+    response = _post_ndjson(http, [
+        {"numero_facture": numeros[0], "client_id": client_id, "lignes": LIGNES},
+        {"numero_facture": numeros[1], "client_id": client_id, "lignes": LIGNES},
+        {"numero_facture": numeros[2], "client_id": 10 ** 9, "lignes": LIGNES},
+        # Doublon détecté d'un lot à l'autre
+        {"numero_facture": numeros[0], "client_id": client_id, "lignes": LIGNES},
+        {"client_id": client_id, "lignes": LIGNES},
+    ])
+    assert response.status_code == 200, response.text
+    assert lots == [2, 2, 1]
+    result = response.json()
+    assert result["created"] == 3
+    assert [(e["index"], e["detail"]) for e in result["errors"]] == [
+        (2, "Client non trouvé"), (3, "Numéro de facture en double dans le lot")
+    ]
+
+
+def test_tout_ou_rien(http, client_id, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+    record_lignes = bulk.rollups.record_lignes
+    appels = []
+
+    def record_puis_echec(*args):
+        appels.append(args)
+        if len(appels) == 2:
+            raise RuntimeError("panne au second lot")
+        return record_lignes(*args)
+
+    monkeypatch.setattr(bulk.rollups, "record_lignes", record_puis_echec)
+    numeros = _numeros(4)
+
+    with pytest.raises(RuntimeError):
+        _post_ndjson(http, [
+            {"numero_facture": numero, "client_id": client_id, "lignes": LIGNES} for numero in numeros
+        ])
+    # Le premier lot, déjà inséré, est annulé avec le reste
+    assert _existantes(numeros) == set()
@@ -0,0 +1,179 @@
+# tests/test_comptabilite.py
+"""
+Séries de chiffre d'affaires (/ca-series) et objectifs de CA.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend import models, rollups
+from backend.database import SessionLocal
+
+from conftest import create_facture
+
+# Total HT des lignes par défaut de create_facture
+TOTAL_LIGNES = 105.0
+
+
+def _serie(response, groupe_id=None, groupe=None):
+    assert response.status_code == 200, response.text
+    body = response.json()
+    for serie in body["series"]:
+        if (groupe_id is not None and serie["groupe_id"] == groupe_id) or (groupe is not None and serie["groupe"] == groupe):
+            return body["periodes"], serie
+    raise AssertionError(f"série absente : {body['series']}")
+
+
+def _redater(facture_id, jour):
+    """
+    Change la date d'une facture en déplaçant ses lignes dans les agrégats
+    du nouveau jour. Renvoie l'ancienne date.
+    """
+    with SessionLocal() as db:
+        facture = db.get(models.Facture, facture_id)
+        ancienne = facture.date_creation
+        rollups.record_facture(db, facture, sign=-1)
+        facture.date_creation = jour
+        rollups.record_facture(db, facture)
+        db.commit()
+    return ancienne
+
+
+@pytest.fixture
+def dater():
+    """
+    Antidate des factures le temps d'un test : les dates d'origine sont
+    rétablies ensuite (agrégats et filigrane d'export des autres tests).
+    """
+    originales = {}
+
+    def _dater(facture_id, jour):
+        originales.setdefault(facture_id, _redater(facture_id, jour))
+
+    yield _dater
+    for facture_id, jour in originales.items():
+        _redater(facture_id, jour)
+
+
+def _piece(http, category, prix=40.0):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur compta"}).json()["id"]
+    return http.post("/api/pieces/", json={
+        "designation": "Amortisseur", "prix_vente": prix, "category": category, "fournisseur_id": fournisseur_id
+    }).json()["id"]
+
+
+def test_jours_sans_facture_a_zero(http, client_id):
+    create_facture(http, client_id)
+    today = datetime.utcnow().date()
+
+    periodes, serie = _serie(http.get("/api/comptabilite/ca-series", params={
+        "from": str(today - timedelta(days=3)), "to": str(today), "group_by": "client"
+    }), groupe_id=client_id)
+    assert periodes == [str(today - timedelta(days=n)) for n in (3, 2, 1, 0)]
+    assert serie["valeurs"] == [0.0, 0.0, 0.0, TOTAL_LIGNES]
+    assert serie["total"] == TOTAL_LIGNES
+
+
+def test_semaines_et_mois(http, client_id, dater):
+    # Le 14/01/2030 est un lundi
+    for jour in (datetime(2030, 1, 15, 9), datetime(2030, 1, 17, 9), datetime(2030, 1, 21, 10)):
+        dater(create_facture(http, client_id)["id"], jour)
+
+    periodes, serie = _serie(http.get("/api/comptabilite/ca-series", params={
+        "from": "2030-01-16", "to": "2030-01-31", "bucket": "week", "group_by": "client"
+    }), groupe_id=client_id)
+    # Première semaine commencée le lundi, mais factures comptées à partir de `from`
+    assert periodes == ["2030-01-14", "2030-01-21", "2030-01-28"]
+    assert serie["valeurs"] == [TOTAL_LIGNES, TOTAL_LIGNES, 0.0]
+
+    periodes, serie = _serie(http.get("/api/comptabilite/ca-series", params={
+        "from": "2030-01-16", "to": "2030-03-02", "bucket": "month", "group_by": "client"
+    }), groupe_id=client_id)
+    assert periodes == ["2030-01-01", "2030-02-01", "2030-03-01"]
+    assert serie["valeurs"] == [2 * TOTAL_LIGNES, 0.0, 0.0]
+
+
+def test_ventilation_par_client(http, dater):
+    nom = f"Client série {uuid.uuid4().hex[:8]}"
+    client_id = http.post("/api/clients/", json={"nom": nom}).json()["id"]
+    for _ in range(2):
+        dater(create_facture(http, client_id)["id"], datetime(2030, 2, 5, 11))
+
+    periodes, serie = _serie(http.get("/api/comptabilite/ca-series", params={
+        "from": "2030-02-04", "to": "2030-02-06", "group_by": "client"
+    }), groupe_id=client_id)
+    assert serie["groupe"] == nom
+    assert serie["valeurs"] == [0.0, 2 * TOTAL_LIGNES, 0.0]
+
+
+def test_ventilation_par_categorie(http, client_id):
+    categorie = f"cat-{uuid.uuid4().hex[:8]}"
+    piece_id = _piece(http, categorie)
+    create_facture(http, client_id, lignes=[
+        {"description": "Amortisseur", "quantite": 2, "prix_unitaire_ht": 40.0, "piece_id": piece_id}
+    ])
+    today = str(datetime.utcnow().date())
+
+    _, serie = _serie(http.get("/api/comptabilite/ca-series", params={
+        "from": today, "to": today, "group_by": "categorie"
+    }), groupe=categorie)
+    assert serie["valeurs"] == [80.0]
+
+
+def test_progression_et_projection(http, client_id):
+    categorie = f"obj-{uuid.uuid4().hex[:8]}"
+    piece_id = _piece(http, categorie)
+    today = datetime.utcnow().date()
+    response = http.post("/api/comptabilite/objectifs", json={
+        "date_debut": str(today - timedelta(days=9)), "date_fin": str(today + timedelta(days=10)),
+        "montant": 1000.0, "categorie": categorie
+    })
+    assert response.status_code == 201, response.text
+    objectif_id = response.json()["id"]
+    assert response.json()["realise"] == 0.0
+
+    # Réalisé tenu à jour à chaque facture de la catégorie
+    facture = create_facture(http, client_id, lignes=[
+        {"description": "Amortisseur", "quantite": 2.5, "prix_unitaire_ht": 40.0, "piece_id": piece_id}
+    ])
+    progression = http.get(f"/api/comptabilite/objectifs/{objectif_id}/progression").json()
+    assert progression["realise"] == 100.0
+    assert progression["reste"] == 900.0
+    assert progression["taux"] == 0.1
+    assert (progression["jours_ecoules"], progression["jours_total"]) == (10, 20)
+    assert progression["projection"] == 200.0
+
+    assert http.delete(f"/api/factures/{facture['id']}").status_code == 204
+    assert http.get(f"/api/comptabilite/objectifs/{objectif_id}/progression").json()["realise"] == 0.0
+
+
+def test_objectif_cree_apres_les_factures(http, client_id):
+    categorie = f"obj-{uuid.uuid4().hex[:8]}"
+    piece_id = _piece(http, categorie)
+    create_facture(http, client_id, lignes=[
+        {"description": "Amortisseur", "quantite": 1, "prix_unitaire_ht": 40.0, "piece_id": piece_id}
+    ])
+    today = datetime.utcnow().date()
+    response = http.post("/api/comptabilite/objectifs", json={
+        "date_debut": str(today), "date_fin": str(today), "montant": 50.0, "categorie": categorie
+    })
+    assert response.json()["realise"] == 40.0
+
+
+def test_objectif_global_le_plus_court(http):
+    for debut, fin, montant in ((date(2035, 6, 1), date(2035, 6, 30), 3000.0),
+                                (date(2035, 6, 10), date(2035, 6, 10), 100.0)):
+        response = http.post("/api/comptabilite/objectifs", json={
+            "date_debut": str(debut), "date_fin": str(fin), "montant": montant
+        })
+        assert response.status_code == 201, response.text
+
+    jour = http.get("/api/comptabilite/objectif-ca", params={"date": "2035-06-10"}).json()
+    assert jour["objectif_ca"] == 100.0
+    assert jour["jours_total"] == 1
+    mois = http.get("/api/comptabilite/objectif-ca", params={"date": "2035-06-11"}).json()
+    assert mois["objectif_ca"] == 3000.0
+    assert (mois["jours_ecoules"], mois["jours_total"], mois["projection"]) == (11, 30, 0.0)
+    assert http.get("/api/comptabilite/objectif-ca", params={"date": "2036-01-01"}).json() == {"objectif_ca": None}
@@ -0,0 +1,119 @@
+# tests/test_dedup.py
+"""
+Doublons de clients (backend/dedup.py) : vérification à la création,
+rapprochement accents / phonétique, fusion et calcul des clés.
+"""
+
+import uuid
+
+from sqlalchemy import insert, select
+
+from backend import dedup, models
+from backend.database import SessionLocal
+
+from conftest import create_facture
+
+
+def _code_postal():
+    # Un code postal propre au test : les blocs de nom ne voient pas les autres clients
+    return str(10000 + uuid.uuid4().int % 90000)
+
+
+def _telephone():
+    return "06" + str(uuid.uuid4().int % 10 ** 8).zfill(8)
+
+
+def _creer(http, **client):
+    return http.post("/api/clients/", json=client)
+
+
+def test_doublon_refuse_puis_force(http):
+    telephone = _telephone()
+    existant = _creer(http, nom="Martin", prenom="Paul", telephone=telephone).json()
+
+    nouveau = {"nom": "Martin", "prenom": "Paul", "telephone": f"+33 {telephone[1:]}"}
+    response = _creer(http, **nouveau)
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["message"] == "Client probablement déjà enregistré"
+    # Les correspondances suffisent à reconnaître la fiche, sans autre requête
+    assert detail["correspondances"] == [{
+        "client_id": existant["id"], "nom": "Martin", "prenom": "Paul", "telephone": telephone,
+        "score": 1.0, "motifs": ["nom", "phonetique", "telephone"],
+    }]
+
+    response = http.post("/api/clients/", params={"ignorer_doublons": "true"}, json=nouveau)
+    assert response.status_code == 200, response.text
+    assert response.json()["id"] != existant["id"]
+
+
+def test_accents_et_casse(http):
+    code_postal = _code_postal()
+    existant = _creer(http, nom="Lefèvre", prenom="Hélène", code_postal=code_postal).json()
+
+    response = http.post("/api/clients/correspondances", json={
+        "nom": "LEFEVRE", "prenom": "Helene", "code_postal": code_postal
+    })
+    assert [(c["client_id"], c["motifs"]) for c in response.json()] == [
+        (existant["id"], ["nom", "phonetique", "code_postal"])
+    ]
+
+
+def test_meme_prononciation(http):
+    code_postal = _code_postal()
+    existant = _creer(http, nom="Dupont", prenom="Jean", code_postal=code_postal).json()
+
+    response = _creer(http, nom="Dupond", prenom="Jean", code_postal=code_postal)
+    assert response.status_code == 409
+    correspondance, = response.json()["detail"]["correspondances"]
+    assert correspondance["client_id"] == existant["id"]
+    assert "phonetique" in correspondance["motifs"]
+    # Même nom dans une autre ville : pas de rapprochement
+    assert _creer(http, nom="Dupond", prenom="Jean", code_postal=_code_postal()).status_code == 200
+
+
+def test_fusion(http):
+    telephone = _telephone()
+    principal = _creer(http, nom="Bernard", prenom="Luc", telephone=telephone).json()
+    doublon = http.post("/api/clients/", params={"ignorer_doublons": "true"}, json={
+        "nom": "Bernard", "prenom": "Luc", "telephone": telephone, "email": "luc.bernard@example.com"
+    }).json()
+    facture = create_facture(http, doublon["id"])
+    event = http.post("/api/planning/", json={
+        "client_id": doublon["id"], "work_description": "Vidange", "car_registration": "IJ-789-KL",
+        "start_datetime": "2031-04-02T09:00:00", "duree_minutes": 45
+    }).json()
+
+    response = http.post(f"/api/clients/{principal['id']}/fusion", json={"doublons": [doublon["id"]]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["factures"], result["interventions"], result["photos"]) == (1, 1, 0)
+    # Champ vide de la fiche principale complété par le doublon
+    assert result["client"]["email"] == "luc.bernard@example.com"
+
+    assert http.get(f"/api/factures/{facture['id']}").json()["client_id"] == principal["id"]
+    assert http.get(f"/api/planning/{event['id']}").json()["client_id"] == principal["id"]
+    with SessionLocal() as db:
+        assert db.get(models.Client, doublon["id"]) is None
+    response = http.post(f"/api/clients/{principal['id']}/fusion", json={"doublons": [doublon["id"]]})
+    assert response.status_code == 404
+
+
+def test_fill_keys_idempotent():
+    nom = f"Durand {uuid.uuid4().hex[:6]}"
+    with SessionLocal() as db:
+        # Insertion directe, comme une base antérieure à la déduplication
+        client_id = db.execute(
+            insert(models.Client)
+            .values(nom=nom, telephone="01 23 45 67 89", email="A.Durand+garage@Example.com")
+            .returning(models.Client.id)
+        ).scalar_one()
+        db.commit()
+
+        assert dedup.fill_keys(db) >= 1
+        colonnes = (models.Client.telephone_cle, models.Client.email_cle, models.Client.nom_cle)
+        cles = db.execute(select(*colonnes).where(models.Client.id == client_id)).one()
+        assert tuple(cles) == ("123456789", "a.durand@example.com", dedup.phonetic(nom))
+
+        assert dedup.fill_keys(db) == 0
+        assert db.execute(select(*colonnes).where(models.Client.id == client_id)).one() == cles
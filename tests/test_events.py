@@ -0,0 +1,114 @@
+# tests/test_events.py
+"""
+Bus d'événements (backend/events.py) : regroupement, débordement d'un
+abonné lent et reprise par Last-Event-ID.
+"""
+
+import asyncio
+import json
+
+from backend import events
+from backend.events import RESYNC, EventBus
+
+from conftest import LIGNES
+
+
+def _run(coro):
+    return asyncio.run(coro())
+
+
+async def _connecte():
+    return False
+
+
+async def _frames(bus, subscription, n):
+    stream = bus.stream(subscription, _connecte, heartbeat=0.01)
+    frames = [await stream.__anext__() for _ in range(n)]
+    await stream.aclose()
+    return frames
+
+
+def test_regroupement():
+    bus = EventBus(maxsize=10)
+
+    async def scenario():
+        subscription = bus.subscribe()
+        for action in ("created", "updated", "updated"):
+            bus.publish("piece.updated", id=1, action=action)
+        bus.publish("piece.updated", id=2, action="deleted")
+        return subscription.drain()
+
+    drained = _run(scenario)
+    # Le dernier état de la pièce 1, replacé en fin de file
+    assert [(e.data["id"], e.data["action"]) for e in drained] == [(1, "updated"), (2, "deleted")]
+    assert bus.coalesced == 2
+
+
+def test_filtre_par_famille():
+    bus = EventBus()
+
+    async def scenario():
+        subscription = bus.subscribe(types=["facture"])
+        bus.publish("piece.updated", id=1, action="updated")
+        bus.publish("facture.imported", created=3)
+        return subscription.drain()
+
+    assert [e.type for e in _run(scenario)] == ["facture.imported"]
+
+
+def test_debordement_resync():
+    bus = EventBus(maxsize=3)
+
+    async def scenario():
+        subscription = bus.subscribe()
+        for i in range(4):
+            bus.publish("piece.updated", id=i, action="updated")
+        return await _frames(bus, subscription, 2)
+
+    hello, resync = _run(scenario)
+    assert hello.startswith("retry: 3000\n")
+    # File vidée : un seul événement resync, au dernier ID publié
+    assert resync == f"id: 4\nevent: {RESYNC}\ndata: {{}}\n\n"
+    assert bus.dropped == 1
+
+
+def test_reprise_last_event_id():
+    bus = EventBus(history=10)
+    premier = bus.publish("facture.created", id=1)
+    bus.publish("facture.created", id=2)
+    bus.publish("facture.deleted", id=1)
+
+    async def scenario():
+        subscription = bus.subscribe(last_event_id=premier.id)
+        return subscription.start_id, await _frames(bus, subscription, 2)
+
+    start_id, (hello, replay) = _run(scenario)
+    assert start_id == premier.id
+    assert f"id: {premier.id}\n" in hello
+    assert [line for line in replay.splitlines() if line.startswith("event:")] == [
+        "event: facture.created", "event: facture.deleted"
+    ]
+
+
+def test_reprise_hors_historique():
+    bus = EventBus(history=2)
+    premier = bus.publish("facture.created", id=1)
+    for i in range(2, 5):
+        bus.publish("facture.created", id=i)
+
+    async def scenario():
+        # Événements manqués sortis de l'historique, puis ID d'un processus précédent
+        perdus = bus.subscribe(last_event_id=premier.id).drain()
+        futur = bus.subscribe(last_event_id=1000).drain()
+        a_jour = bus.subscribe(last_event_id=bus.last_id()).drain()
+        return perdus, futur, a_jour
+
+    assert _run(scenario) == (None, None, [])
+
+
+def test_import_en_masse_publie(http, client_id):
+    response = http.post("/api/factures/bulk", json=[{"client_id": client_id, "lignes": LIGNES}] * 2)
+    assert response.status_code == 200, response.text
+    dernier = events.EVENT_BUS._history[-1]
+    assert (dernier.type, dernier.data) == ("facture.imported", {"created": 2})
+    assert json.loads(dernier.encode().split("data: ")[1]) == {"created": 2}
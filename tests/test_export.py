@@ -0,0 +1,62 @@
+# tests/test_export.py
+"""
+Export incrémental des lignes de facture (backend/export.py).
+"""
+
+import pytest
+
+from backend import export
+from backend.database import SessionLocal
+
+from conftest import create_facture
+
+pa = pytest.importorskip("pyarrow")
+ds = pytest.importorskip("pyarrow.dataset")
+
+
+def _exported(dest):
+    return ds.dataset(dest, format="parquet", partitioning="hive").to_table().column("numero_facture").to_pylist()
+
+
+def test_id_reutilise_exporte(http, client_id, tmp_path):
+    dest = str(tmp_path)
+    create_facture(http, client_id)
+    derniere = create_facture(http, client_id)
+    with SessionLocal() as db:
+        export.export_lignes(db, dest)
+    assert http.delete(f"/api/factures/{derniere['id']}").status_code == 204
+    remplacante = create_facture(http, client_id, numero_facture="EXPORT-REUTILISE")
+    # SQLite réattribue l'ID de la dernière facture supprimée
+    assert remplacante["id"] == derniere["id"]
+
+    with SessionLocal() as db:
+        result = export.export_lignes(db, dest)
+    assert result["factures"] == 1
+    assert "EXPORT-REUTILISE" in _exported(dest)
+    with SessionLocal() as db:
+        assert export.export_lignes(db, dest)["factures"] == 0
+
+
+def test_categorie_et_fournisseur_figes(http, client_id, tmp_path):
+    dest = str(tmp_path)
+    with SessionLocal() as db:
+        export.export_lignes(db, dest)
+    vendeur = http.post("/api/fournisseurs/", json={"nom": "Fournisseur vente"}).json()["id"]
+    repreneur = http.post("/api/fournisseurs/", json={"nom": "Fournisseur repreneur"}).json()["id"]
+    piece = http.post("/api/pieces/", json={
+        "designation": "Rotule", "prix_vente": 30.0, "category": "Direction", "fournisseur_id": vendeur
+    }).json()
+    facture = create_facture(http, client_id, lignes=[
+        {"description": "Rotule", "quantite": 1, "prix_unitaire_ht": 30.0, "piece_id": piece["id"]}
+    ])
+    # Recatégorisée et changée de fournisseur après la vente
+    http.put(f"/api/pieces/{piece['id']}", json={**piece, "category": "Suspension", "fournisseur_id": repreneur})
+
+    with SessionLocal() as db:
+        export.export_lignes(db, dest)
+    table = ds.dataset(dest, format="parquet", partitioning="hive").to_table(
+        filter=ds.field("facture_id") == facture["id"]
+    ).to_pylist()
+    assert [(r["piece_category"], r["fournisseur_id"], r["fournisseur_nom"]) for r in table] == [
+        ("Direction", vendeur, "Fournisseur vente")
+    ]
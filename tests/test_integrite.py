@@ -0,0 +1,45 @@
+# tests/test_integrite.py
+"""
+Intégrité référentielle (PRAGMA foreign_keys) : références inconnues
+refusées, suppressions encore référencées refusées ou détachées.
+"""
+
+from sqlalchemy import select
+
+from backend import models
+from backend.database import SessionLocal
+
+from conftest import create_facture
+
+
+def test_facture_piece_inconnue(http, client_id):
+    response = http.post("/api/factures/", json={"client_id": client_id, "lignes": [
+        {"description": "Filtre", "quantite": 1, "prix_unitaire_ht": 12.0, "piece_id": 10 ** 9}
+    ]})
+    assert response.status_code == 404
+
+
+def test_suppression_fournisseur_reference(http):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur objectif"}).json()["id"]
+    response = http.post("/api/comptabilite/objectifs", json={
+        "date_debut": "2031-01-01", "date_fin": "2031-01-31", "montant": 1000.0,
+        "fournisseur_id": fournisseur_id
+    })
+    assert response.status_code == 201
+    assert http.delete(f"/api/fournisseurs/{fournisseur_id}").status_code == 409
+    assert http.get(f"/api/fournisseurs/{fournisseur_id}").status_code == 200
+
+
+def test_suppression_piece_vendue(http, client_id):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur disque"}).json()["id"]
+    piece_id = http.post("/api/pieces/", json={
+        "designation": "Disque", "prix_vente": 40.0, "fournisseur_id": fournisseur_id
+    }).json()["id"]
+    facture = create_facture(http, client_id, lignes=[
+        {"description": "Disque", "quantite": 1, "prix_unitaire_ht": 40.0, "piece_id": piece_id}
+    ])
+    assert http.delete(f"/api/pieces/{piece_id}").status_code == 204
+    with SessionLocal() as db:
+        ligne = db.scalar(select(models.FactureLigne).where(models.FactureLigne.facture_id == facture["id"]))
+    assert ligne.piece_id is None
+    assert ligne.description == "Disque"
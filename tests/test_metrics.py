@@ -0,0 +1,17 @@
+# tests/test_metrics.py
+"""
+Journal des requêtes SQL lentes (backend/metrics.py).
+"""
+
+from backend import metrics
+
+
+def test_requetes_lentes_sans_valeurs_des_parametres(http, monkeypatch):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.0)
+    response = http.get("/api/clients/search", params={"q": "Jeanne-Confidentielle"})
+    assert response.status_code == 200
+    monkeypatch.undo()
+    slow = http.get("/metrics/slow-queries")
+    assert slow.status_code == 200
+    assert slow.json()
+    assert "confidentielle" not in slow.text.lower()
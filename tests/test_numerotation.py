@@ -0,0 +1,41 @@
+# tests/test_numerotation.py
+"""
+Numérotation des factures (backend/numerotation.py) sous créations et
+imports simultanés.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import LIGNES
+
+NB_CREATIONS = 40
+NB_IMPORTS = 2
+FACTURES_PAR_IMPORT = 25
+
+
+def test_creations_concurrentes_sans_trou_ni_doublon(http, client_id):
+    def create(_):
+        return http.post("/api/factures/", json={"client_id": client_id, "lignes": LIGNES})
+
+    def import_(_):
+        return http.post(
+            "/api/factures/bulk",
+            json=[{"client_id": client_id, "lignes": LIGNES}] * FACTURES_PAR_IMPORT
+        )
+
+    # Imports soumis au milieu des créations, pour qu'ils s'intercalent
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        pending = [pool.submit(create, i) for i in range(NB_CREATIONS // 2)]
+        pending_imports = [pool.submit(import_, i) for i in range(NB_IMPORTS)]
+        pending += [pool.submit(create, i) for i in range(NB_CREATIONS // 2, NB_CREATIONS)]
+        creations = [f.result() for f in pending]
+        imports = [f.result() for f in pending_imports]
+
+    assert all(r.status_code == 201 for r in creations), [r.text for r in creations if r.status_code != 201]
+    assert all(r.json()["created"] == FACTURES_PAR_IMPORT for r in imports)
+    numeros = [r.json()["numero_facture"] for r in creations]
+    assert len(set(numeros)) == NB_CREATIONS
+
+    audit = http.get("/api/factures/numerotation/audit").json()
+    assert audit
+    assert all(a["conforme"] for a in audit), audit
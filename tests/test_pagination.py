@@ -0,0 +1,105 @@
+# tests/test_pagination.py
+"""
+Pagination par curseur (backend/pagination.py) et pages de la recherche
+de pièces.
+"""
+
+import uuid
+
+import pytest
+
+from backend.pagination import DEFAULT_PAGE_SIZE, NEXT_CURSOR
+
+
+def _fournisseurs(http, nom, n):
+    return [http.post("/api/fournisseurs/", json={"nom": nom}).json()["id"] for _ in range(n)]
+
+
+def _toutes_pages(http, url, **params):
+    ids, pages = [], 0
+    while True:
+        response = http.get(url, params=params)
+        assert response.status_code == 200, response.text
+        ids += [row["id"] for row in response.json()]
+        pages += 1
+        if NEXT_CURSOR not in response.headers:
+            return ids, pages
+        params["after"] = response.headers[NEXT_CURSOR]
+
+
+def test_pages_keyset_dans_l_ordre_des_ids(http):
+    # Noms identiques : seul l'ID départage les lignes
+    nom = f"Pagination {uuid.uuid4().hex[:8]}"
+    crees = _fournisseurs(http, nom, 7)
+
+    ids, pages = _toutes_pages(http, "/api/fournisseurs/", q=nom, limit=3)
+    assert ids == sorted(crees)
+    assert pages == 3
+
+
+def test_taille_de_page_par_defaut(http):
+    nom = f"Defaut {uuid.uuid4().hex[:8]}"
+    crees = _fournisseurs(http, nom, DEFAULT_PAGE_SIZE + 1)
+
+    response = http.get("/api/fournisseurs/", params={"q": nom})
+    assert len(response.json()) == DEFAULT_PAGE_SIZE
+    assert response.headers[NEXT_CURSOR] == str(crees[DEFAULT_PAGE_SIZE - 1])
+    # Le flux ndjson n'est pas limité
+    flux = http.get("/api/fournisseurs/", params={"q": nom, "format": "ndjson"})
+    assert len(flux.text.splitlines()) == DEFAULT_PAGE_SIZE + 1
+
+
+def test_pages_async(http):
+    fournisseur_id = _fournisseurs(http, "Fournisseur pages", 1)[0]
+    designation = f"Joint {uuid.uuid4().hex[:8]}"
+    crees = [
+        http.post("/api/pieces/", json={
+            "designation": designation, "prix_vente": 5.0, "fournisseur_id": fournisseur_id
+        }).json()["id"]
+        for _ in range(5)
+    ]
+
+    ids, pages = _toutes_pages(http, "/api/pieces/", q=designation, limit=2)
+    assert ids == crees
+    assert pages == 3
+
+
+def test_recherche_scores_egaux(http):
+    fournisseur_id = _fournisseurs(http, "Fournisseur recherche", 1)[0]
+    designation = f"Durite {uuid.uuid4().hex[:8]}"
+    crees = [
+        http.post("/api/pieces/", json={
+            "designation": designation, "prix_vente": 8.0, "fournisseur_id": fournisseur_id
+        }).json()["id"]
+        for _ in range(5)
+    ]
+
+    ids = []
+    params = {"q": designation, "limit": 2}
+    while True:
+        response = http.get("/api/pieces/search", params=params)
+        ids += [row["id"] for row in response.json()]
+        if NEXT_CURSOR not in response.headers:
+            break
+        params["offset"] = response.headers[NEXT_CURSOR]
+    # Scores bm25 identiques : ni doublon ni oubli d'une page à l'autre
+    assert ids == crees
+
+
+@pytest.mark.parametrize("params", [
+    {"after": -1},
+    {"after": "abc"},
+    {"limit": 0},
+    {"limit": 1001},
+    {"format": "csv"},
+])
+def test_curseur_invalide(http, params):
+    assert http.get("/api/fournisseurs/", params=params).status_code == 422
+    assert http.get("/api/pieces/", params=params).status_code == 422
+
+
+def test_curseur_apres_la_derniere_ligne(http):
+    dernier = _fournisseurs(http, "Fournisseur dernier", 1)[0]
+    response = http.get("/api/fournisseurs/", params={"after": dernier + 1000})
+    assert response.json() == []
+    assert NEXT_CURSOR not in response.headers
@@ -0,0 +1,67 @@
+# tests/test_pdf.py
+"""
+Rendu des factures (backend/pdf.py).
+"""
+
+import os
+import time
+from datetime import datetime
+
+from backend import models, pdf
+
+from conftest import create_facture
+
+
+def test_snapshot_sans_client():
+    facture = models.Facture(
+        numero_facture="F-SANS-CLIENT", date_creation=datetime(2024, 1, 2),
+        lignes=[models.FactureLigne(description="Vidange", quantite=1, prix_unitaire_ht=50.0)]
+    )
+    snapshot = pdf.facture_snapshot(facture)
+    assert snapshot["client"]["nom"] is None
+    assert pdf.render_canvas(snapshot).startswith(b"%PDF")
+
+
+def test_html_echappe_informations_complementaires(http, client_id):
+    facture = create_facture(
+        http, client_id, informations_complementaires="<script>alert(1)</script>\nRoue <b>avant</b>"
+    )
+    response = http.get(f"/api/factures/{facture['id']}/html")
+    assert response.status_code == 200
+    assert "<script>" not in response.text
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;<br>Roue &lt;b&gt;avant&lt;/b&gt;" in response.text
+
+
+def _fichier(root, nom, taille, age_jours):
+    path = os.path.join(root, nom[:2], f"{nom}.pdf")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"%" * taille)
+    mtime = time.time() - age_jours * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_nettoyage_cache(tmp_path):
+    root = str(tmp_path)
+    perime = _fichier(root, "aa01", 10, age_jours=40)
+    ancien = _fichier(root, "bb02", 100, age_jours=5)
+    recent = _fichier(root, "cc03", 100, age_jours=1)
+
+    assert pdf.collect_garbage(root, max_bytes=1000, max_age_days=30) == 1
+    assert not os.path.exists(perime)
+    # Au-delà de la taille maximale, les moins récemment servis partent d'abord
+    assert pdf.collect_garbage(root, max_bytes=150, max_age_days=30) == 1
+    assert not os.path.exists(ancien)
+    assert os.path.exists(recent)
+
+
+def test_pdf_servi_rafraichi():
+    snapshot = pdf.facture_snapshot(models.Facture(numero_facture="F-CACHE", date_creation=datetime(2024, 1, 2)))
+    path, digest = pdf.ensure_pdf(snapshot)
+    vieux = time.time() - 60 * 86400
+    os.utime(path, (vieux, vieux))
+
+    assert pdf.ensure_pdf(snapshot) == (path, digest)
+    assert pdf.collect_garbage(max_age_days=30) == 0
+    assert os.path.exists(path)
@@ -0,0 +1,46 @@
+# tests/test_photos.py
+"""
+Photos rattachées aux factures et aux interventions.
+"""
+
+import io
+
+import pytest
+
+from conftest import create_facture
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_photos_supprimees_avec_la_facture(http, client_id):
+    facture = create_facture(http, client_id)
+    response = http.post(
+        "/api/photos/", params={"facture_id": facture["id"]},
+        files={"photo": ("aile.jpg", _jpeg(), "image/jpeg")}
+    )
+    assert response.status_code == 201, response.text
+    assert http.delete(f"/api/factures/{facture['id']}").status_code == 204
+    # La facture suivante peut reprendre l'ID : elle n'a aucune photo
+    suivante = create_facture(http, client_id)
+    assert http.get("/api/photos/", params={"facture_id": suivante["id"]}).json() == []
+    assert http.get(f"/api/photos/{response.json()[0]['id']}").status_code == 404
+
+
+def test_photos_supprimees_avec_l_intervention(http, client_id):
+    event = http.post("/api/planning/", json={
+        "client_id": client_id, "work_description": "Carrosserie", "car_registration": "EF-456-GH",
+        "start_datetime": "2031-04-01T14:00:00", "duree_minutes": 30
+    }).json()
+    response = http.post(
+        "/api/photos/", params={"planning_event_id": event["id"]},
+        files={"photo": ("porte.jpg", _jpeg(), "image/jpeg")}
+    )
+    assert response.status_code == 201, response.text
+    assert http.delete(f"/api/planning/{event['id']}").status_code == 204
+    assert http.get(f"/api/photos/{response.json()[0]['id']}").status_code == 404
@@ -0,0 +1,49 @@
+# tests/test_planning.py
+"""
+Planning : refus des doubles créneaux d'un technicien.
+"""
+
+import threading
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException
+
+from backend import schemas
+from backend.database import SessionLocal
+from backend.repository import Repository
+from backend.routers import planning
+
+NB_REQUETES = 8
+
+
+def test_creations_concurrentes_un_seul_creneau(http, client_id):
+    event_in = schemas.PlanningEventCreate(
+        client_id=client_id, work_description="Révision", car_registration="AB-123-CD",
+        technician_name=f"Tech {uuid.uuid4().hex[:8]}",
+        start_datetime=datetime(2031, 3, 4, 9, 0), duree_minutes=60
+    )
+    barrier = threading.Barrier(NB_REQUETES)
+    results = []
+
+    def create():
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            planning.create_event(event_in, Repository(db))
+            results.append(201)
+        except HTTPException as exc:
+            results.append(exc.status_code)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=create) for _ in range(NB_REQUETES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [201] + [409] * (NB_REQUETES - 1)
+    response = http.get("/api/planning/", params={
+        "start_date": "2031-03-04", "technician_name": event_in.technician_name
+    })
+    assert len(response.json()) == 1
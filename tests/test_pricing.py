@@ -0,0 +1,32 @@
+# tests/test_pricing.py
+"""
+Moteur de prix (backend/pricing.py) : rechargement à l'écriture et à
+l'expiration.
+"""
+
+from backend import models, pricing
+from backend.cache import ReferenceCache
+
+REMISES = [(1, 1, "Freinage", 10.0)]
+CATALOGUE = [(1, "Disque", "REF-1", "Freinage", 1, 50.0, 80.0)]
+
+
+def _refreshed(engine):
+    engine.refresh(engine.generations(), REMISES, CATALOGUE)
+    return engine
+
+
+def test_resultat_garde_jusqu_a_une_ecriture():
+    engine = _refreshed(pricing.PricingEngine(cache=ReferenceCache(), ttl=3600))
+    assert engine.current() is not None
+    assert engine.needs() == (False, False)
+    engine.cache.invalidate(models.RemiseFournisseur)
+    assert engine.current() is None
+    assert engine.needs() == (True, False)
+
+
+def test_resultat_expire_apres_ttl():
+    # Écriture reçue par un autre worker : seule l'expiration la rend visible
+    engine = _refreshed(pricing.PricingEngine(cache=ReferenceCache(), ttl=0))
+    assert engine.current() is None
+    assert engine.needs() == (True, True)
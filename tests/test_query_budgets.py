@@ -0,0 +1,63 @@
+# tests/test_query_budgets.py
+"""
+Budgets de requêtes SQL des endpoints de factures et de pièces
+(loading.QUERY_BUDGETS) : le nombre de requêtes ne doit pas dépendre du
+nombre de lignes renvoyées.
+"""
+
+from backend.database import async_engine
+from backend.loading import QUERY_BUDGETS, query_budget
+
+from conftest import create_facture
+
+# Routeurs asynchrones : les requêtes passent par l'engine synchrone sous-jacent
+ENGINE = async_engine.sync_engine
+
+
+def test_get_facture(http, client_id):
+    facture = create_facture(http, client_id)
+    with query_budget(ENGINE, "get_facture"):
+        response = http.get(f"/api/factures/{facture['id']}")
+    assert response.status_code == 200
+    assert len(response.json()["lignes"]) == 2
+
+
+def test_search_factures_many_results(http, client_id):
+    for _ in range(30):
+        create_facture(http, client_id, informations_complementaires="budget recherche")
+    with query_budget(ENGINE, "search_factures"):
+        response = http.get("/api/factures/search", params={"q": "budget recherche", "limit": 100})
+    assert response.status_code == 200
+    factures = response.json()
+    assert len(factures) == 30
+    assert all(len(f["lignes"]) == 2 for f in factures)
+
+
+def test_facture_pdf(http, client_id):
+    facture = create_facture(http, client_id)
+    with query_budget(ENGINE, "facture_pdf"):
+        response = http.get(f"/api/factures/{facture['id']}/pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+
+
+def test_crud_piece(http, client_id):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur budget"}).json()["id"]
+    with query_budget(ENGINE, "create_piece"):
+        response = http.post("/api/pieces/", json={
+            "designation": "Filtre budget", "prix_vente": 9.0, "fournisseur_id": fournisseur_id
+        })
+    assert response.status_code == 201
+    piece = response.json()
+    # Une ligne vendue : le détachement fait partie du budget de suppression
+    create_facture(http, client_id, lignes=[
+        {"description": "Filtre", "quantite": 1, "prix_unitaire_ht": 9.0, "piece_id": piece["id"]}
+    ])
+
+    with query_budget(ENGINE, "update_piece"):
+        response = http.put(f"/api/pieces/{piece['id']}", json={**piece, "prix_vente": 11.0})
+    assert response.status_code == 200
+    with query_budget(ENGINE, "delete_piece") as counter:
+        response = http.delete(f"/api/pieces/{piece['id']}")
+    assert response.status_code == 204
+    assert counter.count == QUERY_BUDGETS["delete_piece"]
@@ -0,0 +1,28 @@
+# tests/test_rollups.py
+"""
+Agrégats comptables : une ligne reste dans le compartiment de la catégorie
+de sa pièce au moment de la vente.
+"""
+
+from sqlalchemy.orm import Session
+
+from backend import rollups
+from backend.database import engine
+
+from conftest import create_facture
+
+
+def test_recategorised_piece_keeps_rollups_consistent(http, client_id):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur rollups"}).json()["id"]
+    piece = {"designation": "Disque rollups", "prix_vente": 50.0, "category": "freinage",
+             "fournisseur_id": fournisseur_id}
+    piece_id = http.post("/api/pieces/", json=piece).json()["id"]
+    lignes = [{"description": "Disque", "quantite": 2, "prix_unitaire_ht": 50.0, "piece_id": piece_id}]
+    facture = create_facture(http, client_id, lignes=lignes)
+
+    response = http.put(f"/api/pieces/{piece_id}", json={**piece, "category": "carrosserie"})
+    assert response.status_code == 200, response.text
+    assert http.delete(f"/api/factures/{facture['id']}").status_code == 204
+
+    with Session(engine) as db:
+        assert rollups.verify(db) == []
@@ -0,0 +1,108 @@
+# tests/test_scheduling.py
+"""
+Affectation des techniciens (backend/scheduling.py) : glouton, équilibrage,
+éjection et budget de la recherche locale.
+"""
+
+import time as clock
+from datetime import datetime, time
+
+from backend import scheduling
+from backend.scheduling import Job, Planner, Tech
+
+
+def _job(job_id, debut, fin, competence=None):
+    return Job(job_id, datetime(2031, 5, 6, *debut), datetime(2031, 5, 6, *fin), competence)
+
+
+def _eligible(planner, jobs):
+    return {j.id: [t for t in planner.techs.values() if planner._skilled(t, j)] for j in jobs}
+
+
+def test_glouton_contraintes_d_abord():
+    carrossier = Tech("Carrossier", competences=frozenset({"carrosserie"}))
+    mecanicien = Tech("Mécanicien")
+    jobs = [_job(1, (9, 0), (10, 0)), _job(2, (9, 0), (10, 0), "Carrosserie")]
+
+    assignment, unassigned, _ = scheduling.schedule(jobs, [carrossier, mecanicien])
+    # L'intervention qui exige une compétence est placée en premier
+    assert assignment == {2: "Carrossier", 1: "Mécanicien"}
+    assert unassigned == []
+
+
+def test_horaires_et_competences():
+    tech = Tech("Tech", heure_debut=time(8, 0), heure_fin=time(12, 0))
+    jobs = [_job(1, (11, 0), (13, 0)), _job(2, (9, 0), (10, 0), "diagnostic")]
+
+    assignment, unassigned, _ = scheduling.schedule(jobs, [tech])
+    assert assignment == {}
+    assert sorted(unassigned) == [1, 2]
+
+
+def test_equilibrage():
+    planner = Planner([Tech("A"), Tech("B")])
+    jobs = [_job(i, (8 + i, 0), (9 + i, 0)) for i in range(4)]
+    planner.jobs = {j.id: j for j in jobs}
+    for job in jobs:
+        planner._add(planner.techs["A"], job)
+
+    planner._balance(_eligible(planner, jobs), clock.perf_counter() + scheduling.LOCAL_SEARCH_BUDGET)
+    assert planner.techs["A"].charge == planner.techs["B"].charge == 120
+
+
+def test_ejection():
+    # Seul A sait faire la carrosserie, mais son créneau est pris par une
+    # intervention que B peut reprendre
+    planner = Planner([Tech("A", competences=frozenset({"carrosserie"})), Tech("B")])
+    libre, carrosserie = _job(1, (9, 0), (10, 0)), _job(2, (9, 0), (10, 0), "carrosserie")
+    planner.jobs = {1: libre, 2: carrosserie}
+    planner._add(planner.techs["A"], libre)
+
+    eligible = _eligible(planner, [libre, carrosserie])
+    remaining = planner._eject([2], eligible, clock.perf_counter() + scheduling.LOCAL_SEARCH_BUDGET)
+    assert remaining == []
+    assert planner.assignment == {1: "B", 2: "A"}
+
+
+def test_budget_epuise():
+    planner = Planner([Tech("A", competences=frozenset({"carrosserie"})), Tech("B")])
+    libre, carrosserie = _job(1, (9, 0), (10, 0)), _job(2, (9, 0), (10, 0), "carrosserie")
+    planner.jobs = {1: libre, 2: carrosserie}
+    planner._add(planner.techs["A"], libre)
+    eligible = _eligible(planner, [libre, carrosserie])
+
+    # Échéance dépassée : ni éjection ni équilibrage
+    deadline = clock.perf_counter()
+    assert planner._eject([2], eligible, deadline) == [2]
+    planner._balance(eligible, deadline)
+    assert planner.assignment == {1: "A"}
+
+
+def test_budget_respecte_sur_un_grand_planning():
+    techs = [Tech(f"T{i}") for i in range(20)]
+    jobs = [
+        Job(i, datetime(2031, 5, 1 + i % 28, 8 + i % 9), datetime(2031, 5, 1 + i % 28, 9 + i % 9))
+        for i in range(3000)
+    ]
+    t0 = clock.perf_counter()
+    assignment, unassigned, charges = scheduling.schedule(jobs, techs, budget=0.05)
+    # Glouton compris : la recherche locale s'arrête à l'échéance
+    assert clock.perf_counter() - t0 < 2.0
+    assert len(assignment) + len(unassigned) == len(jobs)
+    assert sum(charges.values()) == 60 * len(assignment)
+
+
+def test_reservations_existantes_qui_se_chevauchent():
+    tech = Tech("Tech")
+    day = datetime(2031, 5, 6).date()
+    # Double réservation déjà en base : la plus courte finit avant la longue
+    tech.agenda[day] = sorted([
+        (datetime(2031, 5, 6, 9, 0), datetime(2031, 5, 6, 12, 0), -1),
+        (datetime(2031, 5, 6, 10, 0), datetime(2031, 5, 6, 10, 30), -2),
+    ])
+    job = _job(1, (11, 0), (11, 30))
+
+    assert Planner([tech])._blocking(tech, job) == [-1]
+    assignment, unassigned, _ = scheduling.schedule([job], [tech])
+    assert assignment == {}
+    assert unassigned == [1]
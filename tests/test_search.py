@@ -0,0 +1,114 @@
+# tests/test_search.py
+"""
+Recherche plein texte (backend/search.py) : index FTS5 tenus à jour par
+triggers, repli des accents, préfixes, tri bm25 et mode dégradé ILIKE.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from backend import models, search
+from backend.database import SessionLocal, engine
+
+from conftest import create_facture
+
+
+def _mot():
+    # Lettres seules : un seul jeton pour le tokenizer unicode61
+    return "".join(chr(ord("a") + int(c, 16) % 26) for c in uuid.uuid4().hex[:10])
+
+
+@pytest.fixture(scope="module")
+def fournisseur_id(http):
+    return http.post("/api/fournisseurs/", json={"nom": "Fournisseur recherche"}).json()["id"]
+
+
+def _piece(http, fournisseur_id, designation, **fields):
+    response = http.post("/api/pieces/", json={
+        "designation": designation, "prix_vente": 10.0, "fournisseur_id": fournisseur_id, **fields
+    })
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _indexees(mot):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT rowid FROM pieces_fts WHERE pieces_fts MATCH :q"), {"q": mot}
+        ).scalars().all()
+
+
+def _recherche(http, q, **params):
+    response = http.get("/api/pieces/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [row["id"] for row in response.json()]
+
+
+def test_triggers_insertion_modification_suppression(http, fournisseur_id):
+    avant, apres = _mot(), _mot()
+    piece = _piece(http, fournisseur_id, f"Filtre {avant}")
+    assert _indexees(avant) == [piece["id"]]
+
+    response = http.put(f"/api/pieces/{piece['id']}", json={**piece, "designation": f"Filtre {apres}"})
+    assert response.status_code == 200, response.text
+    assert _indexees(avant) == []
+    assert _indexees(apres) == [piece["id"]]
+
+    assert http.delete(f"/api/pieces/{piece['id']}").status_code == 204
+    assert _indexees(apres) == []
+
+
+def test_trigger_limite_aux_colonnes_indexees():
+    with engine.connect() as conn:
+        sql = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'pieces_fts_au'")
+        ).scalar_one()
+    # Une écriture de stock_disponible ne réindexe pas la pièce
+    assert "AFTER UPDATE OF designation, ref, category ON pieces" in sql
+
+
+def test_accents_et_prefixes(http, fournisseur_id):
+    mot = _mot()
+    ecrou = _piece(http, fournisseur_id, f"Écrou {mot}")
+    plaquettes = _piece(http, fournisseur_id, f"Plaquettes {mot}")
+
+    assert _recherche(http, f"ecrou {mot}") == [ecrou["id"]]
+    assert _recherche(http, f"ÉCROU {mot}") == [ecrou["id"]]
+    assert _recherche(http, f"plaq {mot}") == [plaquettes["id"]]
+    assert {ecrou["id"], plaquettes["id"]} <= set(_recherche(http, mot[:5], limit=500))
+
+
+def test_tri_bm25(http, fournisseur_id):
+    mot = _mot()
+    # Créée en premier : l'ordre des ID placerait la catégorie devant
+    categorie = _piece(http, fournisseur_id, "Huile", category=mot)
+    reference = _piece(http, fournisseur_id, "Bougie", ref=mot)
+    designation = _piece(http, fournisseur_id, mot)
+
+    assert _recherche(http, mot) == [designation["id"], reference["id"], categorie["id"]]
+
+
+def test_mode_degrade_ilike(http, fournisseur_id, monkeypatch):
+    mot = _mot()
+    premiere = _piece(http, fournisseur_id, mot, category="Freinage")
+    seconde = _piece(http, fournisseur_id, "Disque", ref=mot.upper())
+    monkeypatch.setattr(search, "_fts_enabled", False)
+
+    # Sous-chaîne insensible à la casse, triée par ID
+    assert _recherche(http, mot[2:8]) == [premiere["id"], seconde["id"]]
+    assert _recherche(http, "", designation=mot) == [premiere["id"]]
+
+
+@pytest.mark.parametrize("fts", [True, False])
+def test_facture_sans_client_trouvee(http, client_id, monkeypatch, fts):
+    facture = create_facture(http, client_id)
+    with SessionLocal() as db:
+        db.get(models.Facture, facture["id"]).client_id = None
+        db.commit()
+    monkeypatch.setattr(search, "_fts_enabled", search._fts_enabled and fts)
+
+    response = http.get("/api/factures/search", params={"q": facture["numero_facture"], "limit": 500})
+    assert response.status_code == 200, response.text
+    assert facture["id"] in [row["id"] for row in response.json()]
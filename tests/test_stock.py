@@ -0,0 +1,24 @@
+# tests/test_stock.py
+"""
+Stock des pièces (backend/stock.py) : sorties liées aux lignes de facture.
+"""
+
+from conftest import create_facture
+
+
+def test_sortie_detachee_de_la_ligne_supprimee(http, client_id):
+    fournisseur_id = http.post("/api/fournisseurs/", json={"nom": "Fournisseur stock"}).json()["id"]
+    piece_id = http.post("/api/pieces/", json={
+        "designation": "Courroie", "prix_vente": 25.0, "fournisseur_id": fournisseur_id
+    }).json()["id"]
+    lignes = [{"description": "Courroie", "quantite": 1, "prix_unitaire_ht": 25.0, "piece_id": piece_id}]
+    supprimee = create_facture(http, client_id, lignes=lignes)
+    assert http.delete(f"/api/factures/{supprimee['id']}").status_code == 204
+    nouvelle = create_facture(http, client_id, lignes=lignes)
+
+    mouvements = http.get("/api/stock/mouvements", params={"piece_id": piece_id}).json()
+    assert [m["type"] for m in mouvements] == ["sortie", "entree", "sortie"]
+    # La nouvelle ligne peut reprendre l'ID de l'ancienne : une seule sortie la désigne
+    ligne_id = nouvelle["lignes"][0]["id"]
+    assert [m["id"] for m in mouvements if m["facture_ligne_id"] == ligne_id] == [mouvements[2]["id"]]
+    assert mouvements[0]["facture_ligne_id"] is None